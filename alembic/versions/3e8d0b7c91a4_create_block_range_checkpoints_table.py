@@ -0,0 +1,40 @@
+"""Create block_range_checkpoints table
+
+Revision ID: 3e8d0b7c91a4
+Revises: f2cfa1a3c8d1
+Create Date: 2022-02-14 10:22:41.613254
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3e8d0b7c91a4"
+down_revision = "f2cfa1a3c8d1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "block_range_checkpoints",
+        sa.Column("after_block_number", sa.Numeric, nullable=False),
+        sa.Column("before_block_number", sa.Numeric, nullable=False),
+        sa.Column("status", sa.String(32), nullable=False),
+        sa.Column("worker_id", sa.String(256), nullable=True),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("error", sa.Text, nullable=True),
+        sa.Column("claimed_at", sa.TIMESTAMP, nullable=True),
+        sa.Column("updated_at", sa.TIMESTAMP, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("after_block_number", "before_block_number"),
+    )
+    op.create_index(
+        "ix_block_range_checkpoints_status",
+        "block_range_checkpoints",
+        ["status", "after_block_number"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_block_range_checkpoints_status")
+    op.drop_table("block_range_checkpoints")
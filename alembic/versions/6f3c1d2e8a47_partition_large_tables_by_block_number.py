@@ -0,0 +1,81 @@
+"""Partition large tables by block number
+
+Revision ID: 6f3c1d2e8a47
+Revises: 5c5375de15fd
+Create Date: 2022-02-07 17:41:23.516094
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6f3c1d2e8a47"
+down_revision = "5c5375de15fd"
+branch_labels = None
+depends_on = None
+
+# same as mev_inspect.crud.partitions.PARTITION_SIZE
+PARTITION_SIZE = 100_000
+
+PRIMARY_KEYS = {
+    "classified_traces": ["block_number", "transaction_hash", "trace_address"],
+    "transfers": ["block_number", "transaction_hash", "trace_address"],
+    "swaps": ["block_number", "transaction_hash", "trace_address"],
+    "miner_payments": ["block_number", "transaction_hash"],
+}
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    for table_name, primary_key in PRIMARY_KEYS.items():
+        legacy_table_name = f"{table_name}_legacy"
+
+        op.rename_table(table_name, legacy_table_name)
+        op.execute(f"ALTER INDEX {table_name}_pkey RENAME TO {legacy_table_name}_pkey")
+
+        op.execute(
+            f"""
+            CREATE TABLE {table_name}
+            (LIKE {legacy_table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE (block_number)
+            """
+        )
+        op.create_primary_key(f"{table_name}_pkey", table_name, primary_key)
+
+        # existing rows stay where they are, as one partition ending
+        # on a partition boundary. New partitions are made as needed
+        max_block_number = connection.execute(
+            f"SELECT MAX(block_number) FROM {legacy_table_name}"
+        ).scalar()
+        legacy_before_block_number = (
+            0
+            if max_block_number is None
+            else max_block_number - max_block_number % PARTITION_SIZE + PARTITION_SIZE
+        )
+
+        op.execute(
+            f"""
+            ALTER TABLE {table_name}
+            ATTACH PARTITION {legacy_table_name}
+            FOR VALUES FROM (MINVALUE) TO ({legacy_before_block_number})
+            """
+        )
+
+
+def downgrade():
+    for table_name, primary_key in PRIMARY_KEYS.items():
+        unpartitioned_table_name = f"{table_name}_unpartitioned"
+
+        op.execute(
+            f"""
+            CREATE TABLE {unpartitioned_table_name}
+            (LIKE {table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            """
+        )
+        op.execute(f"INSERT INTO {unpartitioned_table_name} SELECT * FROM {table_name}")
+
+        # drops its partitions too
+        op.drop_table(table_name)
+
+        op.rename_table(unpartitioned_table_name, table_name)
+        op.create_primary_key(f"{table_name}_pkey", table_name, primary_key)
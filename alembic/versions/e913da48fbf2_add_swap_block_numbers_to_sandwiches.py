@@ -0,0 +1,82 @@
+"""Add swap block numbers to sandwiches
+
+Revision ID: e913da48fbf2
+Revises: 3e8d0b7c91a4
+Create Date: 2022-02-16 15:04:37.120518
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e913da48fbf2"
+down_revision = "3e8d0b7c91a4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "sandwiches", sa.Column("frontrun_swap_block_number", sa.Numeric, nullable=True)
+    )
+    op.add_column(
+        "sandwiches", sa.Column("backrun_swap_block_number", sa.Numeric, nullable=True)
+    )
+
+    # sandwiches before these were all within one block
+    op.execute(
+        """
+        UPDATE sandwiches
+        SET
+            frontrun_swap_block_number = block_number,
+            backrun_swap_block_number = block_number
+        """
+    )
+
+    op.alter_column("sandwiches", "frontrun_swap_block_number", nullable=False)
+    op.alter_column("sandwiches", "backrun_swap_block_number", nullable=False)
+
+    op.drop_index("ik_sandwiches_frontrun")
+    op.drop_index("ik_sandwiches_backrun")
+
+    op.create_index(
+        "ik_sandwiches_frontrun",
+        "sandwiches",
+        [
+            "frontrun_swap_block_number",
+            "frontrun_swap_transaction_hash",
+            "frontrun_swap_trace_address",
+        ],
+    )
+    op.create_index(
+        "ik_sandwiches_backrun",
+        "sandwiches",
+        [
+            "backrun_swap_block_number",
+            "backrun_swap_transaction_hash",
+            "backrun_swap_trace_address",
+        ],
+    )
+
+
+def downgrade():
+    op.drop_index("ik_sandwiches_frontrun")
+    op.drop_index("ik_sandwiches_backrun")
+
+    op.create_index(
+        "ik_sandwiches_frontrun",
+        "sandwiches",
+        [
+            "block_number",
+            "frontrun_swap_transaction_hash",
+            "frontrun_swap_trace_address",
+        ],
+    )
+    op.create_index(
+        "ik_sandwiches_backrun",
+        "sandwiches",
+        ["block_number", "backrun_swap_transaction_hash", "backrun_swap_trace_address"],
+    )
+
+    op.drop_column("sandwiches", "frontrun_swap_block_number")
+    op.drop_column("sandwiches", "backrun_swap_block_number")
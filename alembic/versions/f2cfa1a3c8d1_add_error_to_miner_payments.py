@@ -0,0 +1,41 @@
+"""Add error to miner_payments
+
+Revision ID: f2cfa1a3c8d1
+Revises: 6f3c1d2e8a47
+Create Date: 2022-02-09 11:06:48.231547
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f2cfa1a3c8d1"
+down_revision = "6f3c1d2e8a47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "miner_payments",
+        sa.Column("error", sa.String(256), nullable=True),
+    )
+
+    # from each transaction's root trace, which the summary read it from
+    # before
+    op.execute(
+        """
+        UPDATE miner_payments mp
+        SET error = ct.error
+        FROM classified_traces ct
+        WHERE
+            ct.block_number = mp.block_number AND
+            ct.transaction_hash = mp.transaction_hash AND
+            ct.trace_address = '{}' AND
+            ct.error IS NOT NULL
+        """
+    )
+
+
+def downgrade():
+    op.drop_column("miner_payments", "error")
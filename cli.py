@@ -2,15 +2,24 @@ import logging
 import os
 import sys
 from datetime import datetime
+from typing import Optional
 
 import click
 
+from mev_inspect.backfill import (
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_ATTEMPTS,
+    run_backfill,
+)
+from mev_inspect.block_archive import BlockArchive
 from mev_inspect.concurrency import coro
-from mev_inspect.crud.prices import write_prices
+from mev_inspect.crud.prices import get_latest_price_timestamps, write_prices
 from mev_inspect.db import get_inspect_session, get_trace_session
 from mev_inspect.inspector import MEVInspector
 from mev_inspect.prices import fetch_prices, fetch_prices_range
-from mev_inspect.utils import RPCType
+from mev_inspect.rpc_cache import RPCCache
+from mev_inspect.sandwiches import SandwichWindow
+from mev_inspect.utils import RPCType, WriteMode
 #from mev_inspect.prices import fetch_all_supported_prices
 
 RPC_URL_ENV = "RPC_URL"
@@ -47,6 +56,7 @@ async def inspect_block_command(block_number: int, rpc: str, type: str):
         trace_db_session=trace_db_session,
         block=block_number,
     )
+    await inspector.close()
     #await inspector.inspect_single_block(block=block_number)
 
 
@@ -61,12 +71,25 @@ def convert_str_to_enum(type: str) -> RPCType:
 @cli.command()
 @click.argument("block_number", type=int)
 @click.option("--rpc", default=lambda: os.environ.get(RPC_URL_ENV, ""))
+@click.option(
+    "--block-archive",
+    type=click.Path(file_okay=False),
+    help="directory of archived blocks to read from and add to",
+    default=None,
+)
 @coro
-async def fetch_block_command(block_number: int, rpc: str):
+async def fetch_block_command(block_number: int, rpc: str, block_archive: Optional[str]):
+    inspect_db_session = get_inspect_session()
     trace_db_session = get_trace_session()
 
     #inspector = MEVInspector(rpc)
-    inspector = MEVInspector(rpc, inspect_db_session, trace_db_session, RPCType.parity)
+    inspector = MEVInspector(
+        rpc,
+        inspect_db_session,
+        trace_db_session,
+        RPCType.parity,
+        block_archive=BlockArchive(block_archive) if block_archive else None,
+    )
     block = await inspector.create_from_block(
         block_number=block_number,
         trace_db_session=trace_db_session,
@@ -75,6 +98,7 @@ async def fetch_block_command(block_number: int, rpc: str):
     
     #block = await inspector.create_from_block(block_number=block_number)
     print(block.json())
+    await inspector.close()
 
 
 @cli.command()
@@ -95,6 +119,52 @@ async def fetch_block_command(block_number: int, rpc: str):
 @click.option(
     "--request-timeout", type=int, help="timeout for requests to nodes", default=500
 )
+@click.option(
+    "--inspect-concurrency",
+    type=int,
+    help="maximum number of blocks classified at once",
+    default=1,
+)
+@click.option(
+    "--inspect-processes",
+    type=int,
+    help="number of worker processes to classify blocks in",
+    default=None,
+)
+@click.option(
+    "--write-mode",
+    type=click.Choice(list(map(lambda x: x.name, WriteMode)), case_sensitive=False),
+    help="replace deletes and rewrites the range, upsert merges into it",
+    default=WriteMode.replace.name,
+)
+@click.option(
+    "--block-archive",
+    type=click.Path(file_okay=False),
+    help="directory of archived blocks to read from and add to",
+    default=None,
+)
+@click.option(
+    "--rpc-cache-mb",
+    type=int,
+    help="megabytes of responses for final blocks to cache",
+    default=None,
+)
+@click.option(
+    "--adaptive-concurrency",
+    is_flag=True,
+    help="adapt concurrent requests to the node's latency and errors",
+)
+@click.option(
+    "--lazy-decode",
+    is_flag=True,
+    help="decode inputs of calls no classifier reads only when writing them",
+)
+@click.option(
+    "--sandwich-window",
+    type=int,
+    help="number of blocks to find sandwiches across",
+    default=None,
+)
 @coro
 async def inspect_many_blocks_command(
     after_block: int,
@@ -102,6 +172,14 @@ async def inspect_many_blocks_command(
     rpc: str,
     max_concurrency: int,
     request_timeout: int,
+    inspect_concurrency: int,
+    inspect_processes: Optional[int],
+    write_mode: str,
+    block_archive: Optional[str],
+    sandwich_window: Optional[int],
+    rpc_cache_mb: Optional[int],
+    adaptive_concurrency: bool,
+    lazy_decode: bool,
     type: str,
 ):
     type_e = convert_str_to_enum(type)
@@ -114,13 +192,134 @@ async def inspect_many_blocks_command(
         type_e,
         max_concurrency=max_concurrency,
         request_timeout=request_timeout,
+        inspect_concurrency=inspect_concurrency,
+        inspect_processes=inspect_processes,
+        write_mode=WriteMode[write_mode],
+        block_archive=BlockArchive(block_archive) if block_archive else None,
+        sandwich_window=SandwichWindow(sandwich_window) if sandwich_window else None,
+        adaptive_concurrency=adaptive_concurrency,
+        lazy_decode=lazy_decode,
+        rpc_cache=RPCCache(max_bytes=rpc_cache_mb * 1024 * 1024)
+        if rpc_cache_mb
+        else None,
     )
-    await inspector.inspect_many_blocks(
-        inspect_db_session=inspect_db_session,
-        trace_db_session=trace_db_session,
-        after_block=after_block,
-        before_block=before_block,
+    try:
+        await inspector.inspect_many_blocks(
+            inspect_db_session=inspect_db_session,
+            trace_db_session=trace_db_session,
+            after_block=after_block,
+            before_block=before_block,
+        )
+    finally:
+        await inspector.close()
+
+
+@cli.command()
+@click.argument("after_block", type=int)
+@click.argument("before_block", type=int)
+@click.option("--rpc", default=lambda: os.environ.get(RPC_URL_ENV, ""))
+@click.option(
+    "--type",
+    type=click.Choice(list(map(lambda x: x.name, RPCType)), case_sensitive=False),
+    default=RPCType.parity.name,
+)
+@click.option(
+    "--max-concurrency",
+    type=int,
+    help="maximum number of concurrent connections",
+    default=5,
+)
+@click.option(
+    "--request-timeout", type=int, help="timeout for requests to nodes", default=500
+)
+@click.option(
+    "--inspect-processes",
+    type=int,
+    help="number of worker processes to classify blocks in",
+    default=None,
+)
+@click.option(
+    "--rpc-cache-mb",
+    type=int,
+    help="megabytes of responses for final blocks to cache",
+    default=None,
+)
+@click.option(
+    "--adaptive-concurrency",
+    is_flag=True,
+    help="adapt concurrent requests to the node's latency and errors",
+)
+@click.option(
+    "--lazy-decode",
+    is_flag=True,
+    help="decode inputs of calls no classifier reads only when writing them",
+)
+@click.option(
+    "--worker-id",
+    help="name this worker's claims are recorded under",
+    default=None,
+)
+@click.option(
+    "--lease-seconds",
+    type=int,
+    help="seconds after which another worker takes over a claimed range",
+    default=DEFAULT_LEASE_SECONDS,
+)
+@click.option(
+    "--max-attempts",
+    type=int,
+    help="number of times a range is tried before it's left failed",
+    default=DEFAULT_MAX_ATTEMPTS,
+)
+@coro
+async def backfill_command(
+    after_block: int,
+    before_block: int,
+    rpc: str,
+    type: str,
+    max_concurrency: int,
+    request_timeout: int,
+    inspect_processes: Optional[int],
+    rpc_cache_mb: Optional[int],
+    adaptive_concurrency: bool,
+    lazy_decode: bool,
+    worker_id: Optional[str],
+    lease_seconds: int,
+    max_attempts: int,
+):
+    """
+    Inspects ranges of the blocks not inspected yet, alongside any other
+    workers backfilling the same blocks
+    """
+    inspect_db_session = get_inspect_session()
+    trace_db_session = get_trace_session()
+    inspector = MEVInspector(
+        rpc,
+        inspect_db_session,
+        trace_db_session,
+        convert_str_to_enum(type),
+        max_concurrency=max_concurrency,
+        request_timeout=request_timeout,
+        inspect_processes=inspect_processes,
+        adaptive_concurrency=adaptive_concurrency,
+        lazy_decode=lazy_decode,
+        rpc_cache=RPCCache(max_bytes=rpc_cache_mb * 1024 * 1024)
+        if rpc_cache_mb
+        else None,
     )
+    try:
+        await run_backfill(
+            inspector,
+            inspect_db_session,
+            trace_db_session,
+            after_block,
+            before_block,
+            worker_id=worker_id,
+            lease_seconds=lease_seconds,
+            max_attempts=max_attempts,
+        )
+    finally:
+        await inspector.close()
 
 
 @cli.command()
@@ -139,11 +338,19 @@ def enqueue_many_blocks_command(after_block: int, before_block: int, batch_size:
 
 
 @cli.command()
-def fetch_all_prices():
+@click.option(
+    "--full",
+    is_flag=True,
+    help="refetch all history instead of only prices since the latest stored",
+)
+def fetch_all_prices(full: bool):
     inspect_db_session = get_inspect_session()
 
     logger.info("Fetching prices")
-    prices = fetch_prices()
+    latest_timestamps = (
+        None if full else get_latest_price_timestamps(inspect_db_session)
+    )
+    prices = fetch_prices(latest_timestamps)
 
     logger.info("Writing prices")
     write_prices(inspect_db_session, prices)
@@ -6,8 +6,6 @@ import traceback
 
 #from numpy import block
 
-import aiohttp
-
 import time
 import datetime as dt
 from mev_inspect.block import get_latest_block_number
@@ -18,8 +16,11 @@ from mev_inspect.crud.latest_block_update import (
     close_active_connections
 )
 from mev_inspect.db import get_inspect_session, get_trace_session
+from mev_inspect.head_listener import HeadListener, catch_up
 from mev_inspect.inspector import MEVInspector
+from mev_inspect.price_oracle import PriceOracle
 from mev_inspect.provider import get_base_provider
+from mev_inspect.sandwiches import SandwichWindow
 from mev_inspect.signal_handler import GracefulKiller
 from mev_inspect.utils import RPCType
 
@@ -31,6 +32,15 @@ logger = logging.getLogger(__name__)
 # lag to make sure the blocks we see are settled
 BLOCK_NUMBER_LAG = 5
 
+# blocks behind past which they're caught up on in batches, not one by one
+CATCH_UP_BLOCKS = 10
+
+# most blocks caught up on per loop, so stopping is checked in between
+CATCH_UP_MAX_BLOCKS = 1000
+
+# blocks fetched at once while catching up
+DEFAULT_MAX_CONCURRENCY = 5
+
 
 @coro
 async def run():
@@ -41,32 +51,64 @@ async def run():
 
     healthcheck_url = os.getenv("LISTENER_HEALTHCHECK_URL")
 
-    logger.info("Starting...")
+    # subscribe to new heads instead of polling, if given
+    ws_url = os.getenv("RPC_WS_URL")
+
+    max_concurrency = int(
+        os.getenv("LISTENER_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+    )
 
-    killer = GracefulKiller()
+    logger.info("Starting...")
 
     inspect_db_session = get_inspect_session()
     trace_db_session = get_trace_session()
 
-    inspector = MEVInspector(rpc, inspect_db_session, trace_db_session, type=RPCType.geth)
-    base_provider = get_base_provider(rpc)
-    
-    while not killer.kill_now:
-        #try:
-        await inspect_next_block(
-            inspector,
-            inspect_db_session,
-            trace_db_session,
-            base_provider,
-            healthcheck_url,
-        )
-        #except:
-        #    logger.error(dt.datetime.now())
-        #    logger.error(traceback.format_exc())
-        #    await asyncio.sleep(5)
+    price_oracle = PriceOracle()
+    inspector = MEVInspector(
+        rpc,
+        inspect_db_session,
+        trace_db_session,
+        type=RPCType.geth,
+        max_concurrency=max_concurrency,
+        price_oracle=price_oracle,
+        sandwich_window=SandwichWindow(),
+    )
+
+    try:
+        if ws_url is not None:
+            # inspects blocks as soon as they're seen, and undoes reorgs
+            # stopped by cancelling, as it waits on the subscription
+            head_listener = HeadListener(
+                inspector,
+                inspect_db_session,
+                trace_db_session,
+                healthcheck_url=healthcheck_url,
+            )
+            await head_listener.run(ws_url)
+            logger.info("Stopping...")
+            return
+
+        killer = GracefulKiller()
+        base_provider = get_base_provider(rpc)
+        
+        while not killer.kill_now:
+            #try:
+            await inspect_next_block(
+                inspector,
+                inspect_db_session,
+                trace_db_session,
+                base_provider,
+                healthcheck_url,
+            )
+            #except:
+            #    logger.error(dt.datetime.now())
+            #    logger.error(traceback.format_exc())
+            #    await asyncio.sleep(5)
 
 
-    logger.info("Stopping...")
+        logger.info("Stopping...")
+    finally:
+        await inspector.close()
 
 
 async def inspect_next_block(
@@ -88,11 +130,32 @@ async def inspect_next_block(
 
     if last_written_block < (latest_block_number - BLOCK_NUMBER_LAG):
 
+        if latest_block_number - BLOCK_NUMBER_LAG - last_written_block > CATCH_UP_BLOCKS:
+            # far behind, e.g. after downtime, so in concurrent batches.
+            # a failed batch is gone through a block at a time, so the
+            # next loop starts past it
+            if await catch_up(
+                inspector,
+                inspect_db_session,
+                trace_db_session,
+                last_written_block + 1,
+                min(
+                    latest_block_number - BLOCK_NUMBER_LAG + 1,
+                    last_written_block + 1 + CATCH_UP_MAX_BLOCKS,
+                ),
+            ):
+                if healthcheck_url:
+                    await ping_healthcheck_url(inspector, healthcheck_url)
+            return
+
         block_number = last_written_block + 1
 
         logger.info(f"Writing block: {block_number}")
         print(f"Writing block: {block_number}")
         try:
+            if inspector.price_oracle is not None:
+                inspector.price_oracle.refresh(inspect_db_session)
+
             await inspector.inspect_single_block(
                 inspect_db_session=inspect_db_session,
                 trace_db_session=trace_db_session,
@@ -102,7 +165,7 @@ async def inspect_next_block(
             update_latest_block(inspect_db_session, block_number)
 
             if healthcheck_url: 
-                await ping_healthcheck_url(healthcheck_url)
+                await ping_healthcheck_url(inspector, healthcheck_url)
         except Exception as e:
             logger.error(traceback.format_exc())
             print(block_number)
@@ -118,10 +181,10 @@ async def inspect_next_block(
         await asyncio.sleep(5)
 
 
-async def ping_healthcheck_url(url):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url):
-            pass
+async def ping_healthcheck_url(inspector: MEVInspector, url):
+    session = await inspector.rpc_session.get_session()
+    async with session.get(url):
+        pass
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
+from collections import defaultdict
 from itertools import groupby
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 from mev_inspect.schemas.arbitrages import Arbitrage
 from mev_inspect.schemas.swaps import Swap
@@ -47,14 +48,15 @@ def _get_arbitrages_from_swaps(swaps: List[Swap]) -> List[Arbitrage]:
     if len(start_ends) == 0:
         return []
 
-    used_swaps: List[Swap] = []
+    swap_graph = _SwapGraph(swaps)
+    used_swap_ids: Set[int] = set()
 
     for (start, ends) in start_ends:
-        if start in used_swaps:
+        if id(start) in used_swap_ids:
             continue
 
-        unused_ends = [end for end in ends if end not in used_swaps]
-        route = _get_shortest_route(start, unused_ends, swaps)
+        unused_ends = [end for end in ends if id(end) not in used_swap_ids]
+        route = _get_shortest_route(start, unused_ends, swaps, swap_graph=swap_graph)
 
         if route is not None:
             start_amount = route[0].token_in_amount
@@ -78,7 +80,7 @@ def _get_arbitrages_from_swaps(swaps: List[Swap]) -> List[Arbitrage]:
             )
 
             all_arbitrages.append(arb)
-            used_swaps.extend(route)
+            used_swap_ids.update(id(swap) for swap in route)
 
     if len(all_arbitrages) == 1:
         return all_arbitrages
@@ -90,57 +92,163 @@ def _get_arbitrages_from_swaps(swaps: List[Swap]) -> List[Arbitrage]:
         ]
 
 
+class _SwapGraph:
+    """
+    Which swaps can follow each other in a transaction, as found by
+    _swap_outs_match_swap_ins
+
+    Swaps are indexed by the token they take in and by the addresses it
+    can come from, so only those candidates are compared
+    """
+
+    def __init__(self, swaps: List[Swap]):
+        self._positions: Dict[int, int] = {}
+        self._swaps: List[Swap] = []
+
+        for swap in swaps:
+            if id(swap) not in self._positions:
+                self._positions[id(swap)] = len(self._swaps)
+                self._swaps.append(swap)
+
+        swaps_by_token_in_from: Dict[Tuple[str, str], List[Swap]] = defaultdict(list)
+        swaps_by_token_in_contract: Dict[Tuple[str, str], List[Swap]] = defaultdict(
+            list
+        )
+
+        for swap in self._swaps:
+            swaps_by_token_in_from[(swap.token_in_address, swap.from_address)].append(
+                swap
+            )
+            swaps_by_token_in_contract[
+                (swap.token_in_address, swap.contract_address)
+            ].append(swap)
+
+        self._next_swaps: Dict[int, List[Swap]] = {}
+        self._previous_swaps: Dict[int, List[Swap]] = defaultdict(list)
+
+        for swap_out in self._swaps:
+            candidates = {
+                id(swap_in): swap_in
+                for swap_in in (
+                    swaps_by_token_in_from[
+                        (swap_out.token_out_address, swap_out.contract_address)
+                    ]
+                    + swaps_by_token_in_contract[
+                        (swap_out.token_out_address, swap_out.to_address)
+                    ]
+                    + swaps_by_token_in_from[
+                        (swap_out.token_out_address, swap_out.to_address)
+                    ]
+                )
+            }
+            next_swaps = sorted(
+                (
+                    swap_in
+                    for swap_in in candidates.values()
+                    if _swap_outs_match_swap_ins(swap_out, swap_in)
+                ),
+                key=lambda swap: self._positions[id(swap)],
+            )
+
+            self._next_swaps[id(swap_out)] = next_swaps
+
+            for swap_in in next_swaps:
+                self._previous_swaps[id(swap_in)].append(swap_out)
+
+    def __contains__(self, swap: Swap) -> bool:
+        return id(swap) in self._positions
+
+    def get_next_swaps(self, swap: Swap) -> List[Swap]:
+        return self._next_swaps[id(swap)]
+
+    def get_previous_swaps(self, swap: Swap) -> List[Swap]:
+        return self._previous_swaps[id(swap)]
+
+
 def _get_shortest_route(
     start_swap: Swap,
     end_swaps: List[Swap],
     all_swaps: List[Swap],
     max_route_length: Optional[int] = None,
+    swap_graph: Optional[_SwapGraph] = None,
 ) -> Optional[List[Swap]]:
+    """
+    Shortest route from start_swap through any of all_swaps to one of
+    end_swaps. Of equally short routes, the one taking the earliest swaps
+    in all_swaps order is chosen, and then the earliest of end_swaps
+
+    Distances to the end swaps are found with a breadth first search back
+    from them, which stops once it reaches start_swap. The route then
+    follows the first next swap one step closer
+    """
     if len(end_swaps) == 0:
         return None
 
     if max_route_length is not None and max_route_length < 2:
         return None
 
-    for end_swap in end_swaps:
-        if _swap_outs_match_swap_ins(start_swap, end_swap):
-            return [start_swap, end_swap]
+    if swap_graph is None or not all(
+        swap in swap_graph for swap in [start_swap, *end_swaps]
+    ):
+        swap_graph = _SwapGraph([*all_swaps, start_swap, *end_swaps])
 
-    if max_route_length is not None and max_route_length == 2:
-        return None
+    intermediate_swap_ids = {id(swap) for swap in all_swaps}
+    intermediate_swap_ids.discard(id(start_swap))
+
+    # swaps remaining to an end swap, from each swap reached
+    distances: Dict[int, int] = {id(end_swap): 0 for end_swap in end_swaps}
+    intermediate_swap_ids.difference_update(distances)
+
+    current_swaps = list(end_swaps)
+    start_distance = None
+    distance = 0
+
+    while start_distance is None and len(current_swaps) > 0:
+        distance += 1
+
+        # a route has one more swap than its distance
+        if max_route_length is not None and distance + 1 > max_route_length:
+            return None
+
+        next_swaps = []
+
+        for swap in current_swaps:
+            for previous_swap in swap_graph.get_previous_swaps(swap):
+                if previous_swap is start_swap:
+                    start_distance = distance
+                elif (
+                    id(previous_swap) in intermediate_swap_ids
+                    and id(previous_swap) not in distances
+                ):
+                    distances[id(previous_swap)] = distance
+                    next_swaps.append(previous_swap)
 
-    other_swaps = [
-        swap for swap in all_swaps if (swap is not start_swap and swap not in end_swaps)
-    ]
+        current_swaps = next_swaps
 
-    if len(other_swaps) == 0:
+    if start_distance is None:
         return None
 
-    shortest_remaining_route = None
-    max_remaining_route_length = (
-        None if max_route_length is None else max_route_length - 1
-    )
+    route = [start_swap]
 
-    for next_swap in other_swaps:
-        if _swap_outs_match_swap_ins(start_swap, next_swap):
-            shortest_from_next = _get_shortest_route(
-                next_swap,
-                end_swaps,
-                other_swaps,
-                max_route_length=max_remaining_route_length,
+    for remaining_distance in range(start_distance - 1, 0, -1):
+        route.append(
+            next(
+                swap
+                for swap in swap_graph.get_next_swaps(route[-1])
+                if distances.get(id(swap)) == remaining_distance
+                and id(swap) in intermediate_swap_ids
             )
+        )
 
-            if shortest_from_next is not None and (
-                shortest_remaining_route is None
-                or len(shortest_from_next) < len(shortest_remaining_route)
-            ):
-                shortest_remaining_route = shortest_from_next
-                max_remaining_route_length = len(shortest_from_next) - 1
+    route.append(
+        next(
+            end_swap
+            for end_swap in end_swaps
+            if _swap_outs_match_swap_ins(route[-1], end_swap)
+        )
+    )
 
-    if shortest_remaining_route is None:
-        return None
-    else:
-        return [start_swap] + shortest_remaining_route
+    return route
 
 
 def _get_all_start_end_swaps(swaps: List[Swap]) -> List[Tuple[Swap, List[Swap]]]:
@@ -151,22 +259,28 @@ def _get_all_start_end_swaps(swaps: List[Swap]) -> List[Tuple[Swap, List[Swap]]]
     - not swap[start].from_address in all_pool_addresses
     - not swap[end].to_address in all_pool_addresses
     """
-    pool_addrs = [swap.contract_address for swap in swaps]
+    pool_addrs = {swap.contract_address for swap in swaps}
     valid_start_ends: List[Tuple[Swap, List[Swap]]] = []
 
-    for index, potential_start_swap in enumerate(swaps):
-        ends_for_start: List[Swap] = []
-        remaining_swaps = swaps[:index] + swaps[index + 1 :]
+    swaps_by_token_out_to: Dict[Tuple[str, str], List[Swap]] = defaultdict(list)
+
+    for swap in swaps:
+        swaps_by_token_out_to[(swap.token_out_address, swap.to_address)].append(swap)
 
-        for potential_end_swap in remaining_swaps:
-            if (
-                potential_start_swap.token_in_address
-                == potential_end_swap.token_out_address
-                and potential_start_swap.from_address == potential_end_swap.to_address
-                and not potential_start_swap.from_address in pool_addrs
-            ):
+    for potential_start_swap in swaps:
+        if potential_start_swap.from_address in pool_addrs:
+            continue
 
-                ends_for_start.append(potential_end_swap)
+        ends_for_start = [
+            potential_end_swap
+            for potential_end_swap in swaps_by_token_out_to[
+                (
+                    potential_start_swap.token_in_address,
+                    potential_start_swap.from_address,
+                )
+            ]
+            if potential_end_swap is not potential_start_swap
+        ]
 
         if len(ends_for_start) > 0:
             valid_start_ends.append((potential_start_swap, ends_for_start))
@@ -0,0 +1,187 @@
+import logging
+import os
+import socket
+import traceback
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import orm
+
+from mev_inspect.crud.block_ranges import (
+    claim_block_range,
+    get_block_range_status_counts,
+    update_block_range_status,
+    write_block_ranges,
+)
+from mev_inspect.inspector import MEVInspector
+from mev_inspect.schemas.block_ranges import BlockRangeStatus
+
+logger = logging.getLogger(__name__)
+
+# blocks per range, from the block each size starts at. Early blocks
+# have few transactions and almost no DEX activity, so they're handed
+# out in big ranges. Sizes divide each other and the partition size, so
+# ranges line up with partitions
+RANGE_SIZES = [
+    (0, 10_000),
+    # uniswap v1
+    (6_000_000, 2_000),
+    # uniswap v2
+    (10_000_000, 500),
+    # uniswap v3
+    (12_000_000, 100),
+]
+
+# long enough for the largest ranges, after which a claim is taken over
+DEFAULT_LEASE_SECONDS = 60 * 60
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def get_range_size(block_number: int) -> int:
+    range_size = RANGE_SIZES[0][1]
+
+    for start_block_number, size in RANGE_SIZES:
+        if block_number >= start_block_number:
+            range_size = size
+
+    return range_size
+
+
+def plan_block_ranges(
+    after_block_number: int,
+    before_block_number: int,
+) -> List[Tuple[int, int]]:
+    """
+    Splits the blocks into ranges of get_range_size blocks, aligned to
+    multiples of their size. The first and last ranges are widened to
+    their full size, so the same blocks are always split the same way,
+    and planning again after a restart, from another worker, or for an
+    overlapping backfill finds the ranges already there
+    """
+    block_ranges = []
+    range_after_block = after_block_number - after_block_number % get_range_size(
+        after_block_number
+    )
+
+    while range_after_block < before_block_number:
+        range_size = get_range_size(range_after_block)
+        range_before_block = range_after_block + range_size
+
+        block_ranges.append((range_after_block, range_before_block))
+        range_after_block = range_before_block
+
+    return block_ranges
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def run_backfill(
+    inspector: MEVInspector,
+    inspect_db_session: orm.Session,
+    trace_db_session: Optional[orm.Session],
+    after_block_number: int,
+    before_block_number: int,
+    worker_id: Optional[str] = None,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> None:
+    """
+    Inspects the range as one of any number of workers sharing it
+
+    Ranges and their status are kept in block_range_checkpoints. Each
+    worker plans the same ranges, then claims and inspects one at a time
+    until none are left, so every worker stays busy until the end. Ranges
+    done are never inspected again, so a backfill is resumed by starting
+    its workers again
+
+    Ranges at the ends may stick out of the bounds, and only their blocks
+    in the bounds are inspected. Those are left pending for a backfill
+    covering the rest of their blocks
+    """
+    if worker_id is None:
+        worker_id = get_worker_id()
+
+    write_block_ranges(
+        inspect_db_session,
+        plan_block_ranges(after_block_number, before_block_number),
+    )
+
+    # ranges inspected in part, which this worker doesn't claim again
+    partly_inspected_block_ranges: Set[Tuple[int, int]] = set()
+
+    while True:
+        block_range = claim_block_range(
+            inspect_db_session,
+            worker_id,
+            after_block_number,
+            before_block_number,
+            lease_seconds,
+            max_attempts,
+            skipped_block_ranges=partly_inspected_block_ranges,
+        )
+
+        if block_range is None:
+            break
+
+        range_after_block, range_before_block = block_range
+        inspect_after_block = max(range_after_block, after_block_number)
+        inspect_before_block = min(range_before_block, before_block_number)
+        logger.info(
+            f"{worker_id} inspecting {inspect_after_block} to {inspect_before_block}"
+        )
+
+        is_stopped = False
+
+        try:
+            is_inspected = await inspector.inspect_many_blocks(
+                inspect_db_session=inspect_db_session,
+                trace_db_session=trace_db_session,
+                after_block=inspect_after_block,
+                before_block=inspect_before_block,
+            )
+        except Exception:  # pylint: disable=broad-except
+            # the failed write was rolled back, so the session can go on
+            status = BlockRangeStatus.failed
+            error: Optional[str] = traceback.format_exc()
+        else:
+            error = None
+
+            if not is_inspected:
+                # stopped part way, so left for a worker to start over
+                status = BlockRangeStatus.pending
+                is_stopped = True
+            elif block_range != (inspect_after_block, inspect_before_block):
+                status = BlockRangeStatus.pending
+                partly_inspected_block_ranges.add(block_range)
+            else:
+                status = BlockRangeStatus.done
+
+        is_updated = update_block_range_status(
+            inspect_db_session,
+            worker_id,
+            range_after_block,
+            range_before_block,
+            status,
+            error=error,
+        )
+
+        if not is_updated:
+            logger.warning(
+                f"{worker_id} lost {range_after_block} to {range_before_block} "
+                "to another worker, so left it to them"
+            )
+
+        if is_stopped:
+            return
+
+    status_counts = get_block_range_status_counts(
+        inspect_db_session, after_block_number, before_block_number
+    )
+    logger.info(
+        f"No ranges left for {worker_id}: "
+        + ", ".join(
+            f"{count} {status.value}" for status, count in status_counts.items()
+        )
+    )
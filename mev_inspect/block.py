@@ -1,19 +1,30 @@
 import asyncio
 import logging
 import traceback
-from typing import List, Optional
+from typing import Dict, List, Optional
 import datetime as dt
 
 from sqlalchemy import orm
 from web3 import Web3
 
-from mev_inspect.fees import fetch_base_fee_per_gas
+from mev_inspect.block_archive import BlockArchive
+from mev_inspect.fees import BaseFeeFetcher, fetch_base_fee_per_gas
+from mev_inspect.provider import DEFAULT_BATCH_SIZE, make_batch_request
 from mev_inspect.schemas.blocks import Block
 from mev_inspect.schemas.receipts import Receipt
 from mev_inspect.schemas.traces import Trace, TraceType
 from mev_inspect.utils import RPCType, hex_to_int
 
 logger = logging.getLogger(__name__)
+
+# whether each endpoint supports eth_getBlockReceipts, once known
+_block_receipts_supported: Dict[str, bool] = {}
+
+METHOD_NOT_FOUND_CODE = -32601
+
+# as nodes that don't use the code word it
+_METHOD_NOT_FOUND_MESSAGES = ["method not found", "does not exist"]
+
 _calltype_mapping = {
     "CALL": "call",
     "DELEGATECALL": "delegateCall",
@@ -39,31 +50,65 @@ async def create_from_block_number(
     type: RPCType,
     block_number: int,
     trace_db_session: Optional[orm.Session],
+    rpc_batch_size: int = DEFAULT_BATCH_SIZE,
+    block_archive: Optional[BlockArchive] = None,
+    base_fee_fetcher: Optional[BaseFeeFetcher] = None,
 ) -> Block:
+    """
+    Blocks are read from block_archive if given, and ones fetched from
+    the node are added to it
+
+    Base fees not in the block header come from base_fee_fetcher if
+    given, which fetches them for a range of blocks at once
+    """
     block: Optional[Block] = None
 
+    if block_archive is not None:
+        block = block_archive.get_block(block_number)
+
+        if block is not None:
+            return block
+
     if trace_db_session is not None:
         block = _find_block(trace_db_session, block_number)
 
     if block is None:
         if type is RPCType.parity:
-            block = await _fetch_block_parity(w3, base_provider, block_number)
+            block = await _fetch_block_parity(
+                w3, base_provider, block_number, base_fee_fetcher=base_fee_fetcher
+            )
         elif type is RPCType.geth:
-            block = await _fetch_block_geth(w3, base_provider, block_number)
+            block = await _fetch_block_geth(
+                w3,
+                base_provider,
+                block_number,
+                rpc_batch_size=rpc_batch_size,
+                base_fee_fetcher=base_fee_fetcher,
+            )
         else:
             logger.error(f"RPCType not known - {type}")
             raise ValueError
+
+    if block_archive is not None:
+        block_archive.write_block(block)
+
     return block
 
 
 async def _fetch_block_parity(
-    w3, base_provider, block_number: int, retries: int = 0
+    w3,
+    base_provider,
+    block_number: int,
+    retries: int = 0,
+    base_fee_fetcher: Optional[BaseFeeFetcher] = None,
 ) -> Block:
-    block_json, receipts_json, traces_json, base_fee_per_gas = await asyncio.gather(
+    block_json, receipts_json, traces_json = await asyncio.gather(
         w3.eth.get_block(block_number),
         base_provider.make_request("eth_getBlockReceipts", [block_number]),
         base_provider.make_request("trace_block", [block_number]),
-        fetch_base_fee_per_gas(w3, block_number),
+    )
+    base_fee_per_gas = await _get_base_fee_per_gas(
+        w3, block_number, block_json, base_fee_fetcher
     )
 
     try:
@@ -86,13 +131,20 @@ async def _fetch_block_parity(
         logger.warning(traceback.format_exc())
         if retries < 3:
             await asyncio.sleep(5)
-            return await _fetch_block_parity(w3, base_provider, block_number, retries)
+            return await _fetch_block_parity(
+                w3, base_provider, block_number, retries, base_fee_fetcher
+            )
         else:
             raise
 
 
 async def _fetch_block_geth(
-    w3, base_provider, block_number: int, retries: int = 0
+    w3,
+    base_provider,
+    block_number: int,
+    retries: int = 0,
+    rpc_batch_size: int = DEFAULT_BATCH_SIZE,
+    base_fee_fetcher: Optional[BaseFeeFetcher] = None,
 ) -> Block:
     block_json = await asyncio.gather(w3.eth.get_block(block_number))
 
@@ -100,10 +152,15 @@ async def _fetch_block_geth(
         # Separate calls to help with load during block tracing
         traces = await geth_get_tx_traces_parity_format(base_provider, block_json[0])
         geth_tx_receipts = await geth_get_tx_receipts_async(
-            base_provider, block_json[0]["transactions"]
+            base_provider,
+            block_number,
+            block_json[0]["transactions"],
+            batch_size=rpc_batch_size,
         )
         receipts = geth_receipts_translator(block_json[0], geth_tx_receipts)
-        base_fee_per_gas = 0  # Polygon specific, TODO for other chains
+        base_fee_per_gas = await _get_base_fee_per_gas(
+            w3, block_number, block_json[0], base_fee_fetcher
+        )
 
         return Block(
             block_number=block_number,
@@ -121,11 +178,33 @@ async def _fetch_block_geth(
 
         if retries < 3:
             await asyncio.sleep(5)
-            return await _fetch_block_geth(w3, base_provider, block_number, retries+1)
+            return await _fetch_block_geth(
+                w3,
+                base_provider,
+                block_number,
+                retries + 1,
+                rpc_batch_size,
+                base_fee_fetcher,
+            )
         else:
             raise
 
 
+async def _get_base_fee_per_gas(
+    w3,
+    block_number: int,
+    block_json,
+    base_fee_fetcher: Optional[BaseFeeFetcher],
+) -> int:
+    if base_fee_fetcher is not None:
+        return await base_fee_fetcher.get_base_fee_per_gas(block_number, block_json)
+
+    if "baseFeePerGas" in block_json:
+        return block_json["baseFeePerGas"]
+
+    return await fetch_base_fee_per_gas(w3, block_number)
+
+
 async def _find_or_fetch_block_timestamp(
     w3,
     block_number: int,
@@ -362,22 +441,76 @@ def unwrap_tx_trace_for_parity(
     return response_list
 
 
-async def geth_get_tx_receipts_task(base_provider, tx):
-    #logger.info('Tx: ' + str(tx.hex()))
-    #logger.info(dt.datetime.now())
-    receipt = await base_provider.make_request("eth_getTransactionReceipt", [str(tx.hex())])
-    return receipt
+async def geth_get_tx_receipts_async(
+    base_provider, block_number: int, transactions, batch_size: int = DEFAULT_BATCH_SIZE
+):
+    """
+    Receipts come from a single eth_getBlockReceipts request where the node
+    supports it, otherwise from batches of eth_getTransactionReceipt
+
+    Other errors, like a block the node doesn't have yet, only fall back
+    for this block. Receipts missing from the batches, such as when the
+    node rejects batches, are requested one at a time, and a receipt the
+    node still doesn't return raises KeyError, so the block is fetched
+    again rather than built without it
+    """
+    if _block_receipts_supported.get(base_provider.endpoint_uri, True):
+        block_receipts = await base_provider.make_request(
+            "eth_getBlockReceipts", [hex(block_number)]
+        )
+
+        if block_receipts is not None and block_receipts.get("result") is not None:
+            return [{"result": receipt} for receipt in block_receipts["result"]]
+
+        error = block_receipts.get("error") if block_receipts is not None else None
 
+        if _is_method_not_found(error):
+            logger.info(
+                "eth_getBlockReceipts not supported, batching receipt requests"
+            )
+            _block_receipts_supported[base_provider.endpoint_uri] = False
+        else:
+            logger.info(
+                f"eth_getBlockReceipts failed for block {block_number} with {error}, "
+                "batching receipt requests"
+            )
 
-async def geth_get_tx_receipts_async(base_provider, transactions):
-    geth_tx_receipts = []
-    tasks = [
-        asyncio.create_task(geth_get_tx_receipts_task(base_provider, tx))
-        for tx in transactions
+    tx_receipts = await make_batch_request(
+        base_provider,
+        [("eth_getTransactionReceipt", [tx.hex()]) for tx in transactions],
+        batch_size=batch_size,
+    )
+
+    return [
+        tx_receipt
+        if tx_receipt.get("result") is not None
+        else await _get_tx_receipt(base_provider, tx)
+        for tx, tx_receipt in zip(transactions, tx_receipts)
     ]
-    geth_tx_receipts = await asyncio.gather(*tasks)
-    # return [json.loads(tx_receipts) for tx_receipts in geth_tx_receipts]
-    return geth_tx_receipts
+
+
+async def _get_tx_receipt(base_provider, transaction):
+    tx_receipt = await base_provider.make_request(
+        "eth_getTransactionReceipt", [transaction.hex()]
+    )
+
+    if tx_receipt is None or tx_receipt.get("result") is None:
+        error = tx_receipt.get("error") if tx_receipt is not None else None
+        raise KeyError(f"No receipt for transaction {transaction.hex()}: {error}")
+
+    return tx_receipt
+
+
+def _is_method_not_found(error) -> bool:
+    if not isinstance(error, dict):
+        return False
+
+    message = str(error.get("message", "")).lower()
+
+    return error.get("code") == METHOD_NOT_FOUND_CODE or any(
+        method_not_found_message in message
+        for method_not_found_message in _METHOD_NOT_FOUND_MESSAGES
+    )
 
 
 def geth_receipts_translator(block_json, geth_tx_receipts) -> List[Receipt]:
@@ -0,0 +1,144 @@
+import fcntl
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Optional, Tuple
+
+from mev_inspect.schemas.blocks import Block
+
+# blocks per segment file
+SEGMENT_SIZE = 10_000
+
+COMPRESSION_LEVEL = 6
+
+# block number, offset and length of its record in the segment
+_INDEX_ENTRY = struct.Struct("<QQI")
+
+DATA_SUFFIX = ".blocks"
+INDEX_SUFFIX = ".index"
+
+
+class BlockArchive:
+    """
+    Blocks stored on local disk, to inspect again without a node
+
+    Blocks are split into segments of SEGMENT_SIZE block numbers. Each
+    segment is a data file of zlib compressed block JSON records, in the
+    order they were written, and an index file of fixed size entries
+    pointing into it. Data files are read through mmap, so reading a
+    block is a dict lookup and a decompress
+
+    Appends take a file lock, so processes can share a directory
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._locations_by_segment: Dict[int, Dict[int, Tuple[int, int]]] = {}
+        self._mmaps_by_segment: Dict[int, mmap.mmap] = {}
+
+    def get_block(self, block_number: int) -> Optional[Block]:
+        segment_start = get_segment_start(block_number)
+        location = self._get_locations(segment_start).get(block_number)
+
+        if location is None:
+            # could have been written by another process since it was read
+            location = self._read_locations(segment_start).get(block_number)
+
+        if location is None:
+            return None
+
+        offset, length = location
+        data = self._get_mmap(segment_start, offset + length)
+
+        return Block.parse_raw(zlib.decompress(data[offset : offset + length]))
+
+    def has_block(self, block_number: int) -> bool:
+        segment_start = get_segment_start(block_number)
+        return block_number in self._get_locations(segment_start)
+
+    def write_block(self, block: Block) -> None:
+        segment_start = get_segment_start(block.block_number)
+        record = zlib.compress(block.json().encode(), COMPRESSION_LEVEL)
+
+        with open(self._get_path(segment_start, DATA_SUFFIX), "ab") as data_file:
+            fcntl.flock(data_file, fcntl.LOCK_EX)
+
+            try:
+                offset = data_file.seek(0, os.SEEK_END)
+                data_file.write(record)
+                data_file.flush()
+
+                # only indexed once the record is fully written
+                with open(
+                    self._get_path(segment_start, INDEX_SUFFIX), "ab"
+                ) as index_file:
+                    # drops a partial entry from an interrupted write, so
+                    # the entries after it line up
+                    index_size = index_file.seek(0, os.SEEK_END)
+                    index_file.truncate(index_size - index_size % _INDEX_ENTRY.size)
+                    index_file.write(
+                        _INDEX_ENTRY.pack(block.block_number, offset, len(record))
+                    )
+            finally:
+                fcntl.flock(data_file, fcntl.LOCK_UN)
+
+        self._get_locations(segment_start)[block.block_number] = (offset, len(record))
+
+    def close(self) -> None:
+        for segment_mmap in self._mmaps_by_segment.values():
+            segment_mmap.close()
+
+        self._mmaps_by_segment = {}
+        self._locations_by_segment = {}
+
+    def _get_locations(self, segment_start: int) -> Dict[int, Tuple[int, int]]:
+        if segment_start not in self._locations_by_segment:
+            return self._read_locations(segment_start)
+
+        return self._locations_by_segment[segment_start]
+
+    def _read_locations(self, segment_start: int) -> Dict[int, Tuple[int, int]]:
+        locations: Dict[int, Tuple[int, int]] = {}
+
+        try:
+            with open(self._get_path(segment_start, INDEX_SUFFIX), "rb") as index_file:
+                index = index_file.read()
+        except FileNotFoundError:
+            index = b""
+
+        # a partial entry at the end is from an interrupted write
+        n_entries = len(index) // _INDEX_ENTRY.size
+
+        for block_number, offset, length in _INDEX_ENTRY.iter_unpack(
+            index[: n_entries * _INDEX_ENTRY.size]
+        ):
+            # the latest write of a block wins
+            locations[block_number] = (offset, length)
+
+        self._locations_by_segment[segment_start] = locations
+        return locations
+
+    def _get_mmap(self, segment_start: int, min_length: int) -> mmap.mmap:
+        segment_mmap = self._mmaps_by_segment.get(segment_start)
+
+        # remap if the file grew past the mapped part
+        if segment_mmap is None or len(segment_mmap) < min_length:
+            if segment_mmap is not None:
+                segment_mmap.close()
+
+            with open(self._get_path(segment_start, DATA_SUFFIX), "rb") as data_file:
+                segment_mmap = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            self._mmaps_by_segment[segment_start] = segment_mmap
+
+        return segment_mmap
+
+    def _get_path(self, segment_start: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{segment_start}{suffix}")
+
+
+def get_segment_start(block_number: int) -> int:
+    return block_number - block_number % SEGMENT_SIZE
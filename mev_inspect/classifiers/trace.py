@@ -1,8 +1,8 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from mev_inspect.abi import get_abi
-from mev_inspect.decode import ABIDecoder
-from mev_inspect.schemas.blocks import CallAction, CallResult
+from mev_inspect.decode import ABIDecoder, get_selector
+from mev_inspect.schemas.classifiers import ClassifierSpec
 from mev_inspect.schemas.traces import (
     CallTrace,
     Classification,
@@ -16,8 +16,13 @@ from .specs import ALL_CLASSIFIER_SPECS
 
 
 class TraceClassifier:
-    def __init__(self) -> None:
+    def __init__(self, lazy_decode: bool = False) -> None:
+        """
+        lazy_decode defers decoding inputs of calls that have no classifier
+        until they're read, usually only when writing classified traces
+        """
         self._classifier_specs = ALL_CLASSIFIER_SPECS
+        self._lazy_decode = lazy_decode
         self._decoders_by_abi_name: Dict[str, ABIDecoder] = {}
 
         for spec in self._classifier_specs:
@@ -29,6 +34,59 @@ class TraceClassifier:
             decoder = ABIDecoder(abi)
             self._decoders_by_abi_name[spec.abi_name] = decoder
 
+        self._build_spec_index()
+
+    def _build_spec_index(self) -> None:
+        """
+        Precompute which spec decodes a call to a given (address, selector),
+        so a call is decoded once instead of by every spec in turn.
+
+        Specs without valid_contract_addresses (e.g. ERC20) match any address
+        and go in a selector-only fallback. When both match, the spec that
+        comes first in ALL_CLASSIFIER_SPECS wins, same as a linear scan.
+
+        Only the first match is needed - specs sharing a selector share the
+        argument types, so if it fails to decode the input, they all would.
+        """
+        first_index_by_address_and_selector: Dict[Tuple[str, str], int] = {}
+        first_index_by_selector: Dict[str, int] = {}
+
+        for spec_index, spec in enumerate(self._classifier_specs):
+            decoder = self._decoders_by_abi_name[spec.abi_name]
+
+            for selector in decoder.selectors:
+                if spec.valid_contract_addresses is None:
+                    first_index_by_selector.setdefault(selector, spec_index)
+                else:
+                    for address in spec.valid_contract_addresses:
+                        first_index_by_address_and_selector.setdefault(
+                            (address.lower(), selector), spec_index
+                        )
+
+        self._spec_by_selector: Dict[str, ClassifierSpec] = {
+            selector: self._classifier_specs[spec_index]
+            for selector, spec_index in first_index_by_selector.items()
+        }
+
+        self._spec_by_address_and_selector: Dict[Tuple[str, str], ClassifierSpec] = {}
+
+        for (
+            address,
+            selector,
+        ), spec_index in first_index_by_address_and_selector.items():
+            fallback_index = first_index_by_selector.get(selector, spec_index)
+            self._spec_by_address_and_selector[
+                (address, selector)
+            ] = self._classifier_specs[min(spec_index, fallback_index)]
+
+    def _get_spec(self, to_address: str, selector: str) -> Optional[ClassifierSpec]:
+        spec = self._spec_by_address_and_selector.get((to_address, selector))
+
+        if spec is not None:
+            return spec
+
+        return self._spec_by_selector.get(selector)
+
     def classify(
         self,
         traces: List[Trace],
@@ -45,27 +103,34 @@ class TraceClassifier:
             if classified_trace is not None:
                 return classified_trace
 
-        return ClassifiedTrace(
-            **trace.dict(),
-            trace_type=trace.type,
+        return ClassifiedTrace.construct(
+            **trace.__dict__,
             classification=Classification.unknown,
         )
 
-    def _classify_call(self, trace) -> Optional[ClassifiedTrace]:
-        action = CallAction(**trace.action)
-        result = CallResult(**trace.result) if trace.result is not None else None
-
-        for spec in self._classifier_specs:
-            if spec.valid_contract_addresses is not None:
-                lower_valid_addresses = {
-                    address.lower() for address in spec.valid_contract_addresses
-                }
-
-                if action.to not in lower_valid_addresses:
-                    continue
-
+    def _classify_call(self, trace: Trace) -> Optional[ClassifiedTrace]:
+        """
+        Traces were validated and normalized when they were parsed, so
+        classified traces are built from their fields without validating
+        them again
+        """
+        action = trace.action
+        to_address = action["to"]
+        from_address = action["from"]
+        call_input = action["input"]
+        value = action["value"]
+        gas = action["gas"]
+        gas_used = trace.result["gasUsed"] if trace.result is not None else None
+
+        spec = self._get_spec(to_address, get_selector(call_input))
+
+        if spec is not None:
             decoder = self._decoders_by_abi_name[spec.abi_name]
-            call_data = decoder.decode(action.input)
+            lazy = (
+                self._lazy_decode
+                and decoder.get_function_signature(call_input) not in spec.classifiers
+            )
+            call_data = decoder.decode(call_input, lazy=lazy)
 
             if call_data is not None:
                 signature = call_data.function_signature
@@ -76,29 +141,27 @@ class TraceClassifier:
                     else classifier.get_classification()
                 )
 
-                return DecodedCallTrace(
-                    **trace.dict(),
-                    trace_type=trace.type,
+                return DecodedCallTrace.construct(
+                    **trace.__dict__,
                     classification=classification,
                     protocol=spec.protocol,
                     abi_name=spec.abi_name,
                     function_name=call_data.function_name,
                     function_signature=signature,
                     inputs=call_data.inputs,
-                    to_address=action.to,
-                    from_address=action.from_,
-                    value=action.value,
-                    gas=action.gas,
-                    gas_used=result.gas_used if result is not None else None,
+                    to_address=to_address,
+                    from_address=from_address,
+                    value=value,
+                    gas=gas,
+                    gas_used=gas_used,
                 )
 
-        return CallTrace(
-            **trace.dict(),
-            trace_type=trace.type,
+        return CallTrace.construct(
+            **trace.__dict__,
             classification=Classification.unknown,
-            to_address=action.to,
-            from_address=action.from_,
-            value=action.value,
-            gas=action.gas,
-            gas_used=result.gas_used if result is not None else None,
+            to_address=to_address,
+            from_address=from_address,
+            value=value,
+            gas=gas,
+            gas_used=gas_used,
         )
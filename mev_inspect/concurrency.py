@@ -20,3 +20,17 @@ def coro(f):
             loop.run_until_complete(loop.shutdown_asyncgens())
 
     return wrapper
+
+
+async def gather_or_cancel(*aws):
+    """
+    Like asyncio.gather, but if one awaitable fails the others are
+    cancelled instead of being left running in the background
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
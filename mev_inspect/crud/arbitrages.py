@@ -1,11 +1,31 @@
 from typing import List
 from uuid import uuid4
 
+from mev_inspect.db import to_postgres_list, write_as_csv
 from mev_inspect.models.arbitrages import ArbitrageModel
 from mev_inspect.schemas.arbitrages import Arbitrage
 
 from .shared import delete_by_block_range
 
+ARBITRAGE_COLUMNS = (
+    "id",
+    "block_number",
+    "transaction_hash",
+    "account_address",
+    "profit_token_address",
+    "start_amount",
+    "end_amount",
+    "profit_amount",
+    "error",
+    "protocols",
+)
+
+ARBITRAGE_SWAP_COLUMNS = (
+    "arbitrage_id",
+    "swap_transaction_hash",
+    "swap_trace_address",
+)
+
 
 def delete_arbitrages_for_blocks(
     db_session,
@@ -18,52 +38,50 @@ def delete_arbitrages_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_arbitrages(
     db_session,
     arbitrages: List[Arbitrage],
 ) -> None:
-    arbitrage_models = []
-    swap_arbitrage_ids = []
+    arbitrage_items = []
+    arbitrage_swap_items = []
 
     for arbitrage in arbitrages:
         arbitrage_id = str(uuid4())
-        arbitrage_models.append(
-            ArbitrageModel(
-                id=arbitrage_id,
-                block_number=arbitrage.block_number,
-                transaction_hash=arbitrage.transaction_hash,
-                account_address=arbitrage.account_address,
-                profit_token_address=arbitrage.profit_token_address,
-                start_amount=arbitrage.start_amount,
-                end_amount=arbitrage.end_amount,
-                profit_amount=arbitrage.profit_amount,
-                error=arbitrage.error,
-                protocols={swap.protocol.value for swap in arbitrage.swaps},
+        arbitrage_items.append(
+            (
+                arbitrage_id,
+                arbitrage.block_number,
+                arbitrage.transaction_hash,
+                arbitrage.account_address,
+                arbitrage.profit_token_address,
+                arbitrage.start_amount,
+                arbitrage.end_amount,
+                arbitrage.profit_amount,
+                arbitrage.error,
+                to_postgres_list(
+                    sorted({swap.protocol.value for swap in arbitrage.swaps})
+                ),
             )
         )
 
         for swap in arbitrage.swaps:
-            swap_arbitrage_ids.append(
-                {
-                    "arbitrage_id": arbitrage_id,
-                    "swap_transaction_hash": swap.transaction_hash,
-                    "swap_trace_address": swap.trace_address,
-                }
+            arbitrage_swap_items.append(
+                (
+                    arbitrage_id,
+                    swap.transaction_hash,
+                    to_postgres_list(swap.trace_address),
+                )
             )
 
-    if len(arbitrage_models) > 0:
-        db_session.bulk_save_objects(arbitrage_models)
-        db_session.execute(
-            """
-            INSERT INTO arbitrage_swaps
-            (arbitrage_id, swap_transaction_hash, swap_trace_address)
-            VALUES
-            (:arbitrage_id, :swap_transaction_hash, :swap_trace_address)
-            """,
-            params=swap_arbitrage_ids,
+    if len(arbitrage_items) > 0:
+        write_as_csv(
+            db_session, "arbitrages", arbitrage_items, columns=ARBITRAGE_COLUMNS
+        )
+        write_as_csv(
+            db_session,
+            "arbitrage_swaps",
+            arbitrage_swap_items,
+            columns=ARBITRAGE_SWAP_COLUMNS,
         )
-
-        db_session.commit()
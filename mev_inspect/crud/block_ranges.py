@@ -0,0 +1,183 @@
+from typing import Collection, Dict, List, Optional, Tuple
+
+from mev_inspect.schemas.block_ranges import BlockRangeStatus
+
+# ranges whose worker died on their last attempt, which are never
+# claimed again
+FAIL_EXPIRED_BLOCK_RANGES_QUERY = """
+UPDATE block_range_checkpoints
+SET
+    status = :failed,
+    error = 'Lease expired on the last attempt',
+    updated_at = current_timestamp
+WHERE
+    before_block_number > :after_block_number AND
+    after_block_number < :before_block_number AND
+    status = :in_progress AND
+    attempts >= :max_attempts AND
+    claimed_at < current_timestamp - make_interval(secs => :lease_seconds)
+"""
+
+CLAIM_BLOCK_RANGE_QUERY = """
+UPDATE block_range_checkpoints
+SET
+    status = :in_progress,
+    worker_id = :worker_id,
+    attempts = attempts + 1,
+    error = NULL,
+    claimed_at = current_timestamp,
+    updated_at = current_timestamp
+WHERE (after_block_number, before_block_number) = (
+    SELECT after_block_number, before_block_number
+    FROM block_range_checkpoints
+    WHERE
+        before_block_number > :after_block_number AND
+        after_block_number < :before_block_number AND
+        (after_block_number, before_block_number) NOT IN (
+            SELECT *
+            FROM unnest(
+                CAST(:skipped_after_block_numbers AS numeric[]),
+                CAST(:skipped_before_block_numbers AS numeric[])
+            )
+        ) AND
+        (
+            status = :pending OR
+            (status = :failed AND attempts < :max_attempts) OR
+            (
+                status = :in_progress AND
+                attempts < :max_attempts AND
+                claimed_at < current_timestamp - make_interval(secs => :lease_seconds)
+            )
+        )
+    ORDER BY after_block_number
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING after_block_number, before_block_number
+"""
+
+
+def write_block_ranges(db_session, block_ranges: List[Tuple[int, int]]) -> None:
+    """
+    Adds ranges as pending. Ranges already there keep their status
+    """
+    if len(block_ranges) == 0:
+        return
+
+    db_session.execute(
+        """
+        INSERT INTO block_range_checkpoints
+            (after_block_number, before_block_number, status)
+        VALUES (:after_block_number, :before_block_number, :status)
+        ON CONFLICT DO NOTHING
+        """,
+        params=[
+            {
+                "after_block_number": after_block_number,
+                "before_block_number": before_block_number,
+                "status": BlockRangeStatus.pending.value,
+            }
+            for after_block_number, before_block_number in block_ranges
+        ],
+    )
+    db_session.commit()
+
+
+def claim_block_range(
+    db_session,
+    worker_id: str,
+    after_block_number: int,
+    before_block_number: int,
+    lease_seconds: int,
+    max_attempts: int,
+    skipped_block_ranges: Collection[Tuple[int, int]] = (),
+) -> Optional[Tuple[int, int]]:
+    """
+    Marks the first range overlapping the bounds left to inspect as in
+    progress for worker_id, and returns it. Failed ranges are retried
+    until max_attempts, and ranges claimed more than lease_seconds ago
+    are taken over, since their worker may have died, or left failed if
+    that was their last attempt. Locked rows and skipped_block_ranges are
+    skipped, so workers never wait on each other
+    """
+    params = {
+        "worker_id": worker_id,
+        "after_block_number": after_block_number,
+        "before_block_number": before_block_number,
+        "lease_seconds": lease_seconds,
+        "max_attempts": max_attempts,
+        "skipped_after_block_numbers": [
+            skipped_after_block for skipped_after_block, _ in skipped_block_ranges
+        ],
+        "skipped_before_block_numbers": [
+            skipped_before_block for _, skipped_before_block in skipped_block_ranges
+        ],
+        "pending": BlockRangeStatus.pending.value,
+        "in_progress": BlockRangeStatus.in_progress.value,
+        "failed": BlockRangeStatus.failed.value,
+    }
+
+    db_session.execute(FAIL_EXPIRED_BLOCK_RANGES_QUERY, params=params)
+    row = db_session.execute(CLAIM_BLOCK_RANGE_QUERY, params=params).one_or_none()
+    db_session.commit()
+
+    if row is None:
+        return None
+
+    return int(row[0]), int(row[1])
+
+
+def update_block_range_status(
+    db_session,
+    worker_id: str,
+    after_block_number: int,
+    before_block_number: int,
+    status: BlockRangeStatus,
+    error: Optional[str] = None,
+) -> bool:
+    """
+    Updates a range claimed by worker_id. Returns False if another worker
+    has taken it over since, in which case it's left to them
+    """
+    result = db_session.execute(
+        """
+        UPDATE block_range_checkpoints
+        SET status = :status, error = :error, updated_at = current_timestamp
+        WHERE
+            after_block_number = :after_block_number AND
+            before_block_number = :before_block_number AND
+            worker_id = :worker_id
+        """,
+        params={
+            "worker_id": worker_id,
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+            "status": status.value,
+            "error": error,
+        },
+    )
+    db_session.commit()
+
+    return result.rowcount > 0
+
+
+def get_block_range_status_counts(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+) -> Dict[BlockRangeStatus, int]:
+    result = db_session.execute(
+        """
+        SELECT status, COUNT(*)
+        FROM block_range_checkpoints
+        WHERE
+            before_block_number > :after_block_number AND
+            after_block_number < :before_block_number
+        GROUP BY status
+        """,
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+    )
+    return {BlockRangeStatus(status): count for status, count in result}
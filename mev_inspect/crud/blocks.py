@@ -1,9 +1,11 @@
 from datetime import datetime
-from typing import List
+from typing import Any, Iterator, List, Tuple
 
-from mev_inspect.db import write_as_csv
+from mev_inspect.db import upsert_as_csv, write_as_csv
 from mev_inspect.schemas.blocks import Block
 
+BLOCK_COLUMNS = ("block_number", "block_timestamp")
+
 
 def delete_blocks(
     db_session,
@@ -22,18 +24,37 @@ def delete_blocks(
             "before_block_number": before_block_number,
         },
     )
-    db_session.commit()
 
 
 def write_blocks(
     db_session,
     blocks: List[Block],
 ) -> None:
-    items_generator = (
+    write_as_csv(db_session, "blocks", _get_block_items(blocks), columns=BLOCK_COLUMNS)
+
+
+def upsert_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    blocks: List[Block],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "blocks",
+        _get_block_items(blocks),
+        columns=BLOCK_COLUMNS,
+        key_columns=("block_number",),
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
+
+
+def _get_block_items(blocks: List[Block]) -> Iterator[Tuple[Any, ...]]:
+    return (
         (
             block.block_number,
             datetime.fromtimestamp(block.block_timestamp),
         )
         for block in blocks
     )
-    write_as_csv(db_session, "blocks", items_generator)
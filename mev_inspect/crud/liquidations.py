@@ -1,11 +1,30 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Tuple
 
+from mev_inspect.db import to_postgres_list, upsert_as_csv, write_as_csv
 from mev_inspect.models.liquidations import LiquidationModel
 from mev_inspect.schemas.liquidations import Liquidation
 
 from .shared import delete_by_block_range
 
+LIQUIDATION_COLUMNS = (
+    "liquidated_user",
+    "liquidator_user",
+    "debt_token_address",
+    "debt_purchase_amount",
+    "received_amount",
+    "received_token_address",
+    "protocol",
+    "transaction_hash",
+    "trace_address",
+    "block_number",
+    "error",
+)
+
+LIQUIDATION_KEY_COLUMNS = (
+    "transaction_hash",
+    "trace_address",
+)
+
 
 def delete_liquidations_for_blocks(
     db_session,
@@ -18,17 +37,53 @@ def delete_liquidations_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_liquidations(
     db_session,
     liquidations: List[Liquidation],
 ) -> None:
-    models = [
-        LiquidationModel(**json.loads(liquidation.json()))
-        for liquidation in liquidations
-    ]
+    write_as_csv(
+        db_session,
+        "liquidations",
+        _get_liquidation_items(liquidations),
+        columns=LIQUIDATION_COLUMNS,
+    )
+
+
+def upsert_liquidations_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    liquidations: List[Liquidation],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "liquidations",
+        _get_liquidation_items(liquidations),
+        columns=LIQUIDATION_COLUMNS,
+        key_columns=LIQUIDATION_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+
+def _get_liquidation_items(
+    liquidations: List[Liquidation],
+) -> Iterator[Tuple[Any, ...]]:
+    return (
+        (
+            liquidation.liquidated_user,
+            liquidation.liquidator_user,
+            liquidation.debt_token_address,
+            liquidation.debt_purchase_amount,
+            liquidation.received_amount,
+            liquidation.received_token_address,
+            liquidation.protocol.value,
+            liquidation.transaction_hash,
+            to_postgres_list(liquidation.trace_address),
+            liquidation.block_number,
+            liquidation.error,
+        )
+        for liquidation in liquidations
+    )
@@ -1,11 +1,31 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Tuple
 
+from mev_inspect.db import upsert_as_csv, write_as_csv
 from mev_inspect.models.miner_payments import MinerPaymentModel
 from mev_inspect.schemas.miner_payments import MinerPayment
 
 from .shared import delete_by_block_range
 
+MINER_PAYMENT_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "transaction_index",
+    "miner_address",
+    "coinbase_transfer",
+    "base_fee_per_gas",
+    "gas_price",
+    "gas_price_with_coinbase_transfer",
+    "gas_used",
+    "transaction_from_address",
+    "transaction_to_address",
+    "error",
+)
+
+MINER_PAYMENT_KEY_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+)
+
 
 def delete_miner_payments_for_blocks(
     db_session,
@@ -18,17 +38,55 @@ def delete_miner_payments_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_miner_payments(
     db_session,
     miner_payments: List[MinerPayment],
+    table_name: str = "miner_payments",
 ) -> None:
-    models = [
-        MinerPaymentModel(**json.loads(miner_payment.json()))
-        for miner_payment in miner_payments
-    ]
+    write_as_csv(
+        db_session,
+        table_name,
+        _get_miner_payment_items(miner_payments),
+        columns=MINER_PAYMENT_COLUMNS,
+    )
+
+
+def upsert_miner_payments_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    miner_payments: List[MinerPayment],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "miner_payments",
+        _get_miner_payment_items(miner_payments),
+        columns=MINER_PAYMENT_COLUMNS,
+        key_columns=MINER_PAYMENT_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+
+def _get_miner_payment_items(
+    miner_payments: List[MinerPayment],
+) -> Iterator[Tuple[Any, ...]]:
+    return (
+        (
+            miner_payment.block_number,
+            miner_payment.transaction_hash,
+            miner_payment.transaction_index,
+            miner_payment.miner_address,
+            miner_payment.coinbase_transfer,
+            miner_payment.base_fee_per_gas,
+            miner_payment.gas_price,
+            miner_payment.gas_price_with_coinbase_transfer,
+            miner_payment.gas_used,
+            miner_payment.transaction_from_address,
+            miner_payment.transaction_to_address,
+            miner_payment.error,
+        )
+        for miner_payment in miner_payments
+    )
@@ -1,10 +1,32 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Tuple
 
 from mev_inspect.crud.shared import delete_by_block_range
+from mev_inspect.db import to_postgres_list, upsert_as_csv, write_as_csv
 from mev_inspect.models.nft_trades import NftTradeModel
 from mev_inspect.schemas.nft_trades import NftTrade
 
+NFT_TRADE_COLUMNS = (
+    "abi_name",
+    "transaction_hash",
+    "transaction_position",
+    "block_number",
+    "trace_address",
+    "protocol",
+    "error",
+    "seller_address",
+    "buyer_address",
+    "payment_token_address",
+    "payment_amount",
+    "collection_address",
+    "token_id",
+)
+
+NFT_TRADE_KEY_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+)
+
 
 def delete_nft_trades_for_blocks(
     db_session,
@@ -17,14 +39,53 @@ def delete_nft_trades_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_nft_trades(
     db_session,
     nft_trades: List[NftTrade],
 ) -> None:
-    models = [NftTradeModel(**json.loads(nft_trade.json())) for nft_trade in nft_trades]
+    write_as_csv(
+        db_session,
+        "nft_trades",
+        _get_nft_trade_items(nft_trades),
+        columns=NFT_TRADE_COLUMNS,
+    )
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+
+def upsert_nft_trades_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    nft_trades: List[NftTrade],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "nft_trades",
+        _get_nft_trade_items(nft_trades),
+        columns=NFT_TRADE_COLUMNS,
+        key_columns=NFT_TRADE_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
+
+
+def _get_nft_trade_items(nft_trades: List[NftTrade]) -> Iterator[Tuple[Any, ...]]:
+    return (
+        (
+            nft_trade.abi_name,
+            nft_trade.transaction_hash,
+            nft_trade.transaction_position,
+            nft_trade.block_number,
+            to_postgres_list(nft_trade.trace_address),
+            nft_trade.protocol.value if nft_trade.protocol is not None else None,
+            nft_trade.error,
+            nft_trade.seller_address,
+            nft_trade.buyer_address,
+            nft_trade.payment_token_address,
+            nft_trade.payment_amount,
+            nft_trade.collection_address,
+            nft_trade.token_id,
+        )
+        for nft_trade in nft_trades
+    )
@@ -0,0 +1,249 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# blocks per partition of each partitioned table
+PARTITION_SIZE = 100_000
+
+PARTITIONED_TABLES = [
+    "classified_traces",
+    "transfers",
+    "swaps",
+    "miner_payments",
+]
+
+PartitionBound = Tuple[Optional[int], Optional[int]]
+
+_PARTITION_BOUND_PATTERN = re.compile(r"FOR VALUES FROM \((.+)\) TO \((.+)\)")
+
+GET_PARTITION_BOUNDS_QUERY = """
+SELECT
+    child.relname,
+    pg_get_expr(child.relpartbound, child.oid)
+FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = :table_name
+"""
+
+# held until the transaction ends, so writers creating the same partition
+# take turns
+LOCK_PARTITION_QUERY = """
+SELECT pg_advisory_xact_lock(hashtext(:table_name), :partition_start)
+"""
+
+GET_PRIMARY_KEY_QUERY = """
+SELECT pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = CAST(:table_name AS regclass) AND contype = 'p'
+"""
+
+
+def get_partition_name(table_name: str, partition_start: int) -> str:
+    return f"{table_name}_{partition_start}"
+
+
+def get_staging_table_name(table_name: str, partition_start: int) -> str:
+    return f"{get_partition_name(table_name, partition_start)}_staging"
+
+
+def get_partition_start(block_number: int) -> int:
+    return block_number - block_number % PARTITION_SIZE
+
+
+def get_partition_starts(
+    after_block_number: int,
+    before_block_number: int,
+) -> List[int]:
+    return list(
+        range(
+            get_partition_start(after_block_number),
+            before_block_number,
+            PARTITION_SIZE,
+        )
+    )
+
+
+def get_covered_partition_starts(
+    after_block_number: int,
+    before_block_number: int,
+) -> List[int]:
+    """
+    Starts of the partitions whose blocks are all in the range
+    """
+    return [
+        partition_start
+        for partition_start in get_partition_starts(
+            after_block_number, before_block_number
+        )
+        if partition_start >= after_block_number
+        and partition_start + PARTITION_SIZE <= before_block_number
+    ]
+
+
+def parse_partition_bound(bound: str) -> PartitionBound:
+    """
+    Parses a range partition bound as shown by pg_get_expr, with None
+    for MINVALUE and MAXVALUE
+    """
+    match = _PARTITION_BOUND_PATTERN.match(bound)
+
+    if match is None:
+        raise ValueError(f"Unexpected partition bound {bound}")
+
+    from_value, to_value = match.groups()
+    return _parse_bound_value(from_value), _parse_bound_value(to_value)
+
+
+def _parse_bound_value(value: str) -> Optional[int]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+
+    return int(value.strip("'"))
+
+
+def get_partition_bounds(db_session, table_name: str) -> Dict[str, PartitionBound]:
+    result = db_session.execute(
+        GET_PARTITION_BOUNDS_QUERY,
+        params={"table_name": table_name},
+    )
+    return {
+        partition_name: parse_partition_bound(bound)
+        for partition_name, bound in result
+    }
+
+
+def is_partition_covered(
+    partition_start: int,
+    bounds: List[PartitionBound],
+) -> bool:
+    partition_end = partition_start + PARTITION_SIZE
+
+    return any(
+        (from_block is None or from_block <= partition_start)
+        and (to_block is None or partition_end <= to_block)
+        for from_block, to_block in bounds
+    )
+
+
+def create_partitions_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+) -> None:
+    """
+    Creates any partitions missing for the range. Blocks from before
+    partitioning are all in one legacy partition, so those are skipped.
+    Other writers may be creating the same partition, so each is created
+    under a lock, if it doesn't exist by then
+    """
+    for table_name in PARTITIONED_TABLES:
+        bounds = list(get_partition_bounds(db_session, table_name).values())
+
+        for partition_start in get_partition_starts(
+            after_block_number, before_block_number
+        ):
+            if not is_partition_covered(partition_start, bounds):
+                db_session.execute(
+                    LOCK_PARTITION_QUERY,
+                    params={
+                        "table_name": table_name,
+                        "partition_start": partition_start,
+                    },
+                )
+                db_session.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS
+                    {get_partition_name(table_name, partition_start)}
+                    PARTITION OF {table_name}
+                    FOR VALUES FROM ({partition_start})
+                    TO ({partition_start + PARTITION_SIZE})
+                    """
+                )
+
+
+def get_stageable_partition_starts(
+    db_session,
+    table_name: str,
+    after_block_number: int,
+    before_block_number: int,
+) -> List[int]:
+    """
+    Partitions of table_name that can be rebuilt from the range, which
+    are the ones fully in the range that are a partition of their own
+    """
+    partition_bounds = get_partition_bounds(db_session, table_name)
+
+    return [
+        partition_start
+        for partition_start in get_covered_partition_starts(
+            after_block_number, before_block_number
+        )
+        if partition_bounds.get(get_partition_name(table_name, partition_start))
+        == (partition_start, partition_start + PARTITION_SIZE)
+    ]
+
+
+def create_staging_table(db_session, table_name: str, partition_start: int) -> None:
+    """
+    Creates an empty table to load a partition's blocks into. It has the
+    table's primary key, so duplicate rows fail as they're loaded rather
+    than when it's attached. Other indexes are built when it's attached,
+    after loading. The check constraint lets the attach skip scanning it
+    for rows out of bounds
+    """
+    staging_table_name = get_staging_table_name(table_name, partition_start)
+    partition_name = get_partition_name(table_name, partition_start)
+    primary_key = db_session.execute(
+        GET_PRIMARY_KEY_QUERY,
+        params={"table_name": table_name},
+    ).scalar()
+
+    db_session.execute(f"DROP TABLE IF EXISTS {staging_table_name}")
+    db_session.execute(
+        f"""
+        CREATE TABLE {staging_table_name}
+        (LIKE {table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        """
+    )
+    db_session.execute(
+        f"""
+        ALTER TABLE {staging_table_name}
+        ADD CONSTRAINT {staging_table_name}_pkey {primary_key}
+        """
+    )
+    db_session.execute(
+        f"""
+        ALTER TABLE {staging_table_name}
+        ADD CONSTRAINT {partition_name}_block_number_range CHECK (
+            block_number >= {partition_start} AND
+            block_number < {partition_start + PARTITION_SIZE}
+        )
+        """
+    )
+
+
+def swap_staging_table(db_session, table_name: str, partition_start: int) -> None:
+    """
+    Replaces a partition with its staging table
+    """
+    staging_table_name = get_staging_table_name(table_name, partition_start)
+    partition_name = get_partition_name(table_name, partition_start)
+
+    db_session.execute(f"ALTER TABLE {table_name} DETACH PARTITION {partition_name}")
+    db_session.execute(f"DROP TABLE {partition_name}")
+    db_session.execute(f"ALTER TABLE {staging_table_name} RENAME TO {partition_name}")
+    # the attach uses it for the table's primary key
+    db_session.execute(
+        f"""
+        ALTER TABLE {partition_name}
+        RENAME CONSTRAINT {staging_table_name}_pkey TO {partition_name}_pkey
+        """
+    )
+    db_session.execute(
+        f"""
+        ALTER TABLE {table_name}
+        ATTACH PARTITION {partition_name}
+        FOR VALUES FROM ({partition_start})
+        TO ({partition_start + PARTITION_SIZE})
+        """
+    )
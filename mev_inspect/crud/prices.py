@@ -1,4 +1,6 @@
-from typing import List
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy.dialects.postgresql import insert
 
@@ -15,3 +17,37 @@ def write_prices(db_session, prices: List[Price]) -> None:
 
     db_session.execute(insert_statement)
     db_session.commit()
+
+
+def get_prices(
+    db_session,
+    after: Optional[datetime] = None,
+    token_address: Optional[str] = None,
+) -> List[Tuple[str, datetime, Decimal]]:
+    """
+    (token_address, timestamp, usd_price) of prices after the given time,
+    or all of them, in timestamp order. Only the given token's, if any
+    """
+    result = db_session.execute(
+        """
+        SELECT token_address, timestamp, usd_price
+        FROM prices
+        WHERE
+            (:after IS NULL OR timestamp > :after)
+            AND (:token_address IS NULL OR token_address = :token_address)
+        ORDER BY timestamp
+        """,
+        params={"after": after, "token_address": token_address},
+    )
+    return list(result)
+
+
+def get_latest_price_timestamps(db_session) -> Dict[str, datetime]:
+    result = db_session.execute(
+        """
+        SELECT token_address, MAX(timestamp)
+        FROM prices
+        GROUP BY token_address
+        """
+    )
+    return {token_address: timestamp for token_address, timestamp in result}
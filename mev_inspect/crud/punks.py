@@ -1,6 +1,6 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Tuple
 
+from mev_inspect.db import to_postgres_list, upsert_as_csv, write_as_csv
 from mev_inspect.models.punks import (
     PunkBidAcceptanceModel,
     PunkBidModel,
@@ -12,6 +12,40 @@ from mev_inspect.schemas.punk_snipe import PunkSnipe
 
 from .shared import delete_by_block_range
 
+PUNK_BID_ACCEPTANCE_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+    "from_address",
+    "punk_index",
+    "min_price",
+)
+
+PUNK_BID_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+    "from_address",
+    "punk_index",
+    "price",
+)
+
+PUNK_SNIPE_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+    "from_address",
+    "punk_index",
+    "min_acceptance_price",
+    "acceptance_price",
+)
+
+PUNK_KEY_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+)
+
 
 def delete_punk_bid_acceptances_for_blocks(
     db_session,
@@ -24,20 +58,35 @@ def delete_punk_bid_acceptances_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_punk_bid_acceptances(
     db_session,
     punk_bid_acceptances: List[PunkBidAcceptance],
 ) -> None:
-    models = [
-        PunkBidAcceptanceModel(**json.loads(punk_bid_acceptance.json()))
-        for punk_bid_acceptance in punk_bid_acceptances
-    ]
+    write_as_csv(
+        db_session,
+        "punk_bid_acceptances",
+        _get_punk_bid_acceptance_items(punk_bid_acceptances),
+        columns=PUNK_BID_ACCEPTANCE_COLUMNS,
+    )
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+
+def upsert_punk_bid_acceptances_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    punk_bid_acceptances: List[PunkBidAcceptance],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "punk_bid_acceptances",
+        _get_punk_bid_acceptance_items(punk_bid_acceptances),
+        columns=PUNK_BID_ACCEPTANCE_COLUMNS,
+        key_columns=PUNK_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
 
 
 def delete_punk_bids_for_blocks(
@@ -51,17 +100,35 @@ def delete_punk_bids_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_punk_bids(
     db_session,
     punk_bids: List[PunkBid],
 ) -> None:
-    models = [PunkBidModel(**json.loads(punk_bid.json())) for punk_bid in punk_bids]
+    write_as_csv(
+        db_session,
+        "punk_bids",
+        _get_punk_bid_items(punk_bids),
+        columns=PUNK_BID_COLUMNS,
+    )
+
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+def upsert_punk_bids_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    punk_bids: List[PunkBid],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "punk_bids",
+        _get_punk_bid_items(punk_bids),
+        columns=PUNK_BID_COLUMNS,
+        key_columns=PUNK_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
 
 
 def delete_punk_snipes_for_blocks(
@@ -75,16 +142,77 @@ def delete_punk_snipes_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_punk_snipes(
     db_session,
     punk_snipes: List[PunkSnipe],
 ) -> None:
-    models = [
-        PunkSnipeModel(**json.loads(punk_snipe.json())) for punk_snipe in punk_snipes
-    ]
+    write_as_csv(
+        db_session,
+        "punk_snipes",
+        _get_punk_snipe_items(punk_snipes),
+        columns=PUNK_SNIPE_COLUMNS,
+    )
+
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+def upsert_punk_snipes_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    punk_snipes: List[PunkSnipe],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "punk_snipes",
+        _get_punk_snipe_items(punk_snipes),
+        columns=PUNK_SNIPE_COLUMNS,
+        key_columns=PUNK_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
+
+
+def _get_punk_bid_acceptance_items(
+    punk_bid_acceptances: List[PunkBidAcceptance],
+) -> Iterator[Tuple[Any, ...]]:
+    return (
+        (
+            punk_bid_acceptance.block_number,
+            punk_bid_acceptance.transaction_hash,
+            to_postgres_list(punk_bid_acceptance.trace_address),
+            punk_bid_acceptance.from_address,
+            punk_bid_acceptance.punk_index,
+            punk_bid_acceptance.min_price,
+        )
+        for punk_bid_acceptance in punk_bid_acceptances
+    )
+
+
+def _get_punk_bid_items(punk_bids: List[PunkBid]) -> Iterator[Tuple[Any, ...]]:
+    return (
+        (
+            punk_bid.block_number,
+            punk_bid.transaction_hash,
+            to_postgres_list(punk_bid.trace_address),
+            punk_bid.from_address,
+            punk_bid.punk_index,
+            punk_bid.price,
+        )
+        for punk_bid in punk_bids
+    )
+
+
+def _get_punk_snipe_items(punk_snipes: List[PunkSnipe]) -> Iterator[Tuple[Any, ...]]:
+    return (
+        (
+            punk_snipe.block_number,
+            punk_snipe.transaction_hash,
+            to_postgres_list(punk_snipe.trace_address),
+            punk_snipe.from_address,
+            punk_snipe.punk_index,
+            punk_snipe.min_acceptance_price,
+            punk_snipe.acceptance_price,
+        )
+        for punk_snipe in punk_snipes
+    )
@@ -16,5 +16,3 @@ def delete_by_block_range(
         .filter(model_class.block_number < before_block_number)
         .delete()
     )
-
-    db_session.commit()
@@ -1,149 +1,162 @@
-INSERT_ARBITRAGE_SUMMARY_QUERY = """
-INSERT INTO mev_summary (
+from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS
+
+# latest price of each token in block_tokens as of its block, looked up
+# once per block and token with the prices primary key
+BLOCK_PRICES_QUERY = """
     SELECT
-        NULL,
-        a.block_number,
-        b.block_timestamp,
-        NULL AS protocol,
-        a.transaction_hash,
-        'arbitrage' AS type,
-        (
-            (
-                SELECT usd_price
-                FROM prices
-                WHERE
-                    token_address = a.profit_token_address
-                    AND timestamp <= b.block_timestamp
-                ORDER BY timestamp DESC
-                LIMIT 1
-            ) * a.profit_amount / POWER(10, profit_token.decimals)
-        ) AS gross_profit_usd,
-        (
-            (
-                ((mp.gas_used * mp.gas_price) + mp.coinbase_transfer) /
-                POWER(10, 18)
-            ) * 
-            (
-                SELECT usd_price
-                FROM prices p
-                WHERE
-                    p.timestamp <= b.block_timestamp
-                    AND p.token_address = '0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee'
-                ORDER BY p.timestamp DESC
-                LIMIT 1
-            )
-        ) AS miner_payment_usd,
-        mp.gas_used,
-        mp.gas_price,
-        mp.coinbase_transfer,
-        mp.gas_price_with_coinbase_transfer,
-        mp.miner_address,
-        mp.base_fee_per_gas,
-        ct.error as error,
-        a.protocols
+        block_tokens.block_number,
+        block_tokens.token_address,
+        price.usd_price
+    FROM block_tokens
+    LEFT JOIN LATERAL (
+        SELECT usd_price
+        FROM prices
+        WHERE
+            prices.token_address = block_tokens.token_address
+            AND prices.timestamp <= block_tokens.block_timestamp
+        ORDER BY prices.timestamp DESC
+        LIMIT 1
+    ) price ON TRUE
+"""
+
+INSERT_ARBITRAGE_SUMMARY_QUERY = f"""
+INSERT INTO mev_summary
+WITH range_arbitrages AS (
+    SELECT
+        a.*,
+        b.block_timestamp
     FROM arbitrages a
     JOIN blocks b ON b.block_number = a.block_number
-    JOIN tokens profit_token ON profit_token.token_address = a.profit_token_address
-    JOIN classified_traces ct ON
-        ct.block_number = a.block_number AND
-        ct.transaction_hash = a.transaction_hash
-    JOIN miner_payments mp ON
-        mp.block_number = a.block_number AND
-        mp.transaction_hash = a.transaction_hash
     WHERE
-        b.block_number >= :after_block_number
-        AND b.block_number < :before_block_number
-        AND ct.trace_address = '{}'
+        a.block_number >= :after_block_number
+        AND a.block_number < :before_block_number
         AND NOT EXISTS (
             SELECT 1
             FROM sandwiches front_sandwich
-            WHERE 
-                front_sandwich.block_number = a.block_number AND
+            WHERE
+                front_sandwich.frontrun_swap_block_number = a.block_number AND
                 front_sandwich.frontrun_swap_transaction_hash = a.transaction_hash
         )
         AND NOT EXISTS (
             SELECT 1
             FROM sandwiches back_sandwich
             WHERE
-                back_sandwich.block_number = a.block_number AND
+                back_sandwich.backrun_swap_block_number = a.block_number AND
                 back_sandwich.backrun_swap_transaction_hash = a.transaction_hash
         )
-)
+),
+block_tokens AS (
+    SELECT block_number, block_timestamp, profit_token_address AS token_address
+    FROM range_arbitrages
+    UNION
+    SELECT block_number, block_timestamp, '{ETH_TOKEN_ADDRESS}'
+    FROM range_arbitrages
+),
+block_prices AS ({BLOCK_PRICES_QUERY})
+SELECT
+    NULL,
+    a.block_number,
+    a.block_timestamp,
+    NULL AS protocol,
+    a.transaction_hash,
+    'arbitrage' AS type,
+    (
+        profit_price.usd_price * a.profit_amount / POWER(10, profit_token.decimals)
+    ) AS gross_profit_usd,
+    (
+        (
+            ((mp.gas_used * mp.gas_price) + mp.coinbase_transfer) /
+            POWER(10, 18)
+        ) * eth_price.usd_price
+    ) AS miner_payment_usd,
+    mp.gas_used,
+    mp.gas_price,
+    mp.coinbase_transfer,
+    mp.gas_price_with_coinbase_transfer,
+    mp.miner_address,
+    mp.base_fee_per_gas,
+    mp.error as error,
+    a.protocols
+FROM range_arbitrages a
+JOIN tokens profit_token ON profit_token.token_address = a.profit_token_address
+JOIN miner_payments mp ON
+    mp.block_number = a.block_number AND
+    mp.transaction_hash = a.transaction_hash
+JOIN block_prices profit_price ON
+    profit_price.block_number = a.block_number AND
+    profit_price.token_address = a.profit_token_address
+JOIN block_prices eth_price ON
+    eth_price.block_number = a.block_number AND
+    eth_price.token_address = '{ETH_TOKEN_ADDRESS}'
 """
 
-INSERT_LIQUIDATIONS_SUMMARY_QUERY = """
-INSERT INTO mev_summary (
+INSERT_LIQUIDATIONS_SUMMARY_QUERY = f"""
+INSERT INTO mev_summary
+WITH range_liquidations AS (
     SELECT
-        NULL,
-        l.block_number,
-        b.block_timestamp,
-        l.protocol as protocol,
-        l.transaction_hash,
-        'liquidation' as type,
-        l.received_amount*
-        (
-            SELECT usd_price
-            FROM prices
-            WHERE token_address = l.received_token_address
-            AND timestamp <= b.block_timestamp
-            ORDER BY timestamp DESC
-            LIMIT 1
-        )
-        /POWER(10, received_token.decimals) 
-        
-        - 
-
-        l.debt_purchase_amount*
-        (
-            SELECT usd_price
-            FROM prices
-            WHERE token_address = l.debt_token_address
-            AND timestamp <= b.block_timestamp
-            ORDER BY timestamp DESC
-            LIMIT 1
-        )
-        /POWER(10, debt_token.decimals) as gross_profit_usd,
-        (
-            (
-                ((mp.gas_used * mp.gas_price) + mp.coinbase_transfer) /
-                POWER(10, 18)
-            ) * 
-            (
-                SELECT usd_price
-                FROM prices p
-                WHERE
-                    p.timestamp <= b.block_timestamp
-                    AND p.token_address = '0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee'
-                ORDER BY p.timestamp DESC
-                LIMIT 1
-            )
-        ) AS miner_payment_usd,
-        mp.gas_used,
-        mp.gas_price,
-        mp.coinbase_transfer,
-        mp.gas_price_with_coinbase_transfer,
-        mp.miner_address,
-        mp.base_fee_per_gas,
-        ct.error as error,
-        ARRAY[l.protocol]
+        l.*,
+        b.block_timestamp
     FROM liquidations l
     JOIN blocks b ON b.block_number = l.block_number
-    JOIN tokens received_token ON received_token.token_address = l.received_token_address
-    JOIN tokens debt_token ON debt_token.token_address = l.debt_token_address
-    JOIN miner_payments mp ON
-        mp.block_number = l.block_number AND
-        mp.transaction_hash = l.transaction_hash
-    JOIN classified_traces ct ON
-        ct.block_number = l.block_number AND
-        ct.transaction_hash = l.transaction_hash
     WHERE
-        b.block_number >= :after_block_number AND 
-        b.block_number < :before_block_number AND
-        ct.trace_address = '{}' AND
+        l.block_number >= :after_block_number AND
+        l.block_number < :before_block_number AND
         l.debt_purchase_amount > 0 AND
         l.received_amount > 0 AND
         l.debt_purchase_amount < 115792089237316195423570985008687907853269984665640564039457584007913129639935
-)
+),
+block_tokens AS (
+    SELECT block_number, block_timestamp, received_token_address AS token_address
+    FROM range_liquidations
+    UNION
+    SELECT block_number, block_timestamp, debt_token_address
+    FROM range_liquidations
+    UNION
+    SELECT block_number, block_timestamp, '{ETH_TOKEN_ADDRESS}'
+    FROM range_liquidations
+),
+block_prices AS ({BLOCK_PRICES_QUERY})
+SELECT
+    NULL,
+    l.block_number,
+    l.block_timestamp,
+    l.protocol as protocol,
+    l.transaction_hash,
+    'liquidation' as type,
+    l.received_amount * received_price.usd_price
+    / POWER(10, received_token.decimals)
+    -
+    l.debt_purchase_amount * debt_price.usd_price
+    / POWER(10, debt_token.decimals) as gross_profit_usd,
+    (
+        (
+            ((mp.gas_used * mp.gas_price) + mp.coinbase_transfer) /
+            POWER(10, 18)
+        ) * eth_price.usd_price
+    ) AS miner_payment_usd,
+    mp.gas_used,
+    mp.gas_price,
+    mp.coinbase_transfer,
+    mp.gas_price_with_coinbase_transfer,
+    mp.miner_address,
+    mp.base_fee_per_gas,
+    mp.error as error,
+    ARRAY[l.protocol]
+FROM range_liquidations l
+JOIN tokens received_token ON received_token.token_address = l.received_token_address
+JOIN tokens debt_token ON debt_token.token_address = l.debt_token_address
+JOIN miner_payments mp ON
+    mp.block_number = l.block_number AND
+    mp.transaction_hash = l.transaction_hash
+JOIN block_prices received_price ON
+    received_price.block_number = l.block_number AND
+    received_price.token_address = l.received_token_address
+JOIN block_prices debt_price ON
+    debt_price.block_number = l.block_number AND
+    debt_price.token_address = l.debt_token_address
+JOIN block_prices eth_price ON
+    eth_price.block_number = l.block_number AND
+    eth_price.token_address = '{ETH_TOKEN_ADDRESS}'
 """
 
 
@@ -176,8 +189,6 @@ def _delete_summary_for_block_range(
         },
     )
 
-    db_session.commit()
-
 
 def _insert_into_summary_for_block_range(
     db_session,
@@ -199,5 +210,3 @@ def _insert_into_summary_for_block_range(
             "before_block_number": before_block_number,
         },
     )
-
-    db_session.commit()
@@ -1,11 +1,34 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Tuple
 
+from mev_inspect.db import to_postgres_list, upsert_as_csv, write_as_csv
 from mev_inspect.models.swaps import SwapModel
 from mev_inspect.schemas.swaps import Swap
 
 from .shared import delete_by_block_range
 
+SWAP_COLUMNS = (
+    "abi_name",
+    "transaction_hash",
+    "transaction_position",
+    "block_number",
+    "trace_address",
+    "protocol",
+    "contract_address",
+    "from_address",
+    "to_address",
+    "token_in_address",
+    "token_in_amount",
+    "token_out_address",
+    "token_out_amount",
+    "error",
+)
+
+SWAP_KEY_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+)
+
 
 def delete_swaps_for_blocks(
     db_session,
@@ -18,14 +41,55 @@ def delete_swaps_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_swaps(
     db_session,
     swaps: List[Swap],
+    table_name: str = "swaps",
 ) -> None:
-    models = [SwapModel(**json.loads(swap.json())) for swap in swaps]
+    write_as_csv(
+        db_session,
+        table_name,
+        _get_swap_items(swaps),
+        columns=SWAP_COLUMNS,
+    )
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+
+def upsert_swaps_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    swaps: List[Swap],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "swaps",
+        _get_swap_items(swaps),
+        columns=SWAP_COLUMNS,
+        key_columns=SWAP_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
+
+
+def _get_swap_items(swaps: List[Swap]) -> Iterator[Tuple[Any, ...]]:
+    return (
+        (
+            swap.abi_name,
+            swap.transaction_hash,
+            swap.transaction_position,
+            swap.block_number,
+            to_postgres_list(swap.trace_address),
+            swap.protocol.value,
+            swap.contract_address,
+            swap.from_address,
+            swap.to_address,
+            swap.token_in_address,
+            swap.token_in_amount,
+            swap.token_out_address,
+            swap.token_out_amount,
+            swap.error,
+        )
+        for swap in swaps
+    )
@@ -1,13 +1,48 @@
 import json
-from datetime import datetime, timezone
-from typing import List
+from typing import Any, Iterator, List, Tuple
 
-from mev_inspect.db import to_postgres_list, write_as_csv
+from mev_inspect.db import to_postgres_list, upsert_as_csv, write_as_csv
 from mev_inspect.models.traces import ClassifiedTraceModel
-from mev_inspect.schemas.traces import ClassifiedTrace
+from mev_inspect.schemas.call_data import LazyCallInputs
+from mev_inspect.schemas.traces import CallTrace, ClassifiedTrace, DecodedCallTrace
 
 from .shared import delete_by_block_range
 
+CLASSIFIED_TRACE_COLUMNS = (
+    "transaction_hash",
+    "block_number",
+    "classification",
+    "trace_type",
+    "protocol",
+    "abi_name",
+    "function_name",
+    "function_signature",
+    "inputs",
+    "from_address",
+    "to_address",
+    "gas",
+    "value",
+    "gas_used",
+    "error",
+    "trace_address",
+    "transaction_position",
+)
+
+# fields a call has only once its inputs are decoded
+_DECODED_CALL_FIELDS = {
+    "protocol",
+    "abi_name",
+    "function_name",
+    "function_signature",
+    "inputs",
+}
+
+CLASSIFIED_TRACE_KEY_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+)
+
 
 def delete_classified_traces_for_blocks(
     db_session,
@@ -21,17 +56,43 @@ def delete_classified_traces_for_blocks(
         before_block_number,
     )
 
-    db_session.commit()
-
 
 def write_classified_traces(
     db_session,
     classified_traces: List[ClassifiedTrace],
+    table_name: str = "classified_traces",
 ) -> None:
-    classified_at = datetime.now(timezone.utc)
-    items = (
+    write_as_csv(
+        db_session,
+        table_name,
+        _get_classified_trace_items(classified_traces),
+        columns=CLASSIFIED_TRACE_COLUMNS,
+    )
+
+
+def upsert_classified_traces_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    classified_traces: List[ClassifiedTrace],
+) -> None:
+    upsert_as_csv(
+        db_session,
+        "classified_traces",
+        _get_classified_trace_items(classified_traces),
+        columns=CLASSIFIED_TRACE_COLUMNS,
+        key_columns=CLASSIFIED_TRACE_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
+
+
+def _get_classified_trace_items(
+    classified_traces: List[ClassifiedTrace],
+) -> Iterator[Tuple[Any, ...]]:
+    # classified_at is left to the column default
+    return (
         (
-            classified_at,
             trace.transaction_hash,
             trace.block_number,
             trace.classification.value,
@@ -50,10 +111,30 @@ def write_classified_traces(
             to_postgres_list(trace.trace_address),
             trace.transaction_position,
         )
-        for trace in classified_traces
+        for trace in map(_fall_back_from_undecodable_inputs, classified_traces)
     )
 
-    write_as_csv(db_session, "classified_traces", items)
+
+def _fall_back_from_undecodable_inputs(trace: ClassifiedTrace) -> ClassifiedTrace:
+    """
+    Calls whose inputs were left to decode lazily and can't be decoded
+    are written as the plain calls they'd have been classified as if
+    decoded up front, so rows don't depend on lazy decoding
+    """
+    if (
+        isinstance(trace, DecodedCallTrace)
+        and isinstance(trace.inputs, LazyCallInputs)
+        and trace.inputs.is_undecodable
+    ):
+        return CallTrace.construct(
+            **{
+                field: value
+                for field, value in trace.__dict__.items()
+                if field not in _DECODED_CALL_FIELDS
+            }
+        )
+
+    return trace
 
 
 def _inputs_as_json(trace) -> str:
@@ -1,11 +1,27 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Tuple
 
+from mev_inspect.db import to_postgres_list, upsert_as_csv, write_as_csv
 from mev_inspect.models.transfers import TransferModel
 from mev_inspect.schemas.transfers import Transfer
 
 from .shared import delete_by_block_range
 
+TRANSFER_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+    "from_address",
+    "to_address",
+    "token_address",
+    "amount",
+)
+
+TRANSFER_KEY_COLUMNS = (
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+)
+
 
 def delete_transfers_for_blocks(
     db_session,
@@ -19,14 +35,47 @@ def delete_transfers_for_blocks(
         before_block_number,
     )
 
-    db_session.commit()
-
 
 def write_transfers(
     db_session,
     transfers: List[Transfer],
+    table_name: str = "transfers",
+) -> None:
+    write_as_csv(
+        db_session,
+        table_name,
+        _get_transfer_items(transfers),
+        columns=TRANSFER_COLUMNS,
+    )
+
+
+def upsert_transfers_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    transfers: List[Transfer],
 ) -> None:
-    models = [TransferModel(**json.loads(transfer.json())) for transfer in transfers]
+    upsert_as_csv(
+        db_session,
+        "transfers",
+        _get_transfer_items(transfers),
+        columns=TRANSFER_COLUMNS,
+        key_columns=TRANSFER_KEY_COLUMNS,
+        after_block_number=after_block_number,
+        before_block_number=before_block_number,
+    )
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+
+def _get_transfer_items(transfers: List[Transfer]) -> Iterator[Tuple[Any, ...]]:
+    return (
+        (
+            transfer.block_number,
+            transfer.transaction_hash,
+            to_postgres_list(transfer.trace_address),
+            transfer.from_address,
+            transfer.to_address,
+            transfer.token_address,
+            transfer.amount,
+        )
+        for transfer in transfers
+    )
@@ -1,5 +1,6 @@
 import os
-from typing import Any, Iterable, List, Optional
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
 
 from sqlalchemy import create_engine, orm
 from sqlalchemy.orm import sessionmaker
@@ -67,23 +68,53 @@ def get_trace_session() -> Optional[orm.Session]:
     return None
 
 
+# backslash escapes for COPY's text format
+_CSV_ESCAPES = str.maketrans(
+    {
+        "\\": "\\\\",
+        "|": "\\|",
+        "\n": "\\n",
+        "\r": "\\r",
+    }
+)
+
+
+@contextmanager
+def atomic_write(db_session) -> Iterator[None]:
+    """
+    Runs the writes inside in one transaction with a single commit, so
+    readers see all of them or none
+    """
+    try:
+        yield
+        db_session.commit()
+    except BaseException:
+        db_session.rollback()
+        raise
+
+
 def write_as_csv(
     db_session,
     table_name: str,
     items: Iterable[Iterable[Any]],
+    columns: Optional[Sequence[str]] = None,
 ) -> None:
+    """
+    Bulk loads items with COPY. Without columns, values must be in the
+    table's column order
+    """
     csv_iterator = StringIteratorIO(
         ("|".join(map(_clean_csv_value, item)) + "\n" for item in items)
     )
 
     with db_session.connection().connection.cursor() as cursor:
-        cursor.copy_from(csv_iterator, table_name, sep="|")
+        cursor.copy_from(csv_iterator, table_name, sep="|", columns=columns)
 
 
 def _clean_csv_value(value: Optional[Any]) -> str:
     if value is None:
         return r"\N"
-    return str(value).replace("\n", "\\n")
+    return str(value).translate(_CSV_ESCAPES)
 
 
 def to_postgres_list(values: List[Any]) -> str:
@@ -91,3 +122,75 @@ def to_postgres_list(values: List[Any]) -> str:
         return "{}"
 
     return "{" + ",".join(map(str, values)) + "}"
+
+
+def upsert_as_csv(
+    db_session,
+    table_name: str,
+    items: Iterable[Iterable[Any]],
+    columns: Sequence[str],
+    key_columns: Sequence[str],
+    after_block_number: int,
+    before_block_number: int,
+) -> None:
+    """
+    Makes the table's rows for the block range match items, without
+    deleting everything first
+
+    Items are copied to a temporary table, then merged on key_columns.
+    Only rows whose values changed are updated, and rows in the range
+    that are no longer in items are deleted. Reinspection mostly finds
+    the same results, so most rows aren't rewritten and leave no dead
+    tuples behind
+    """
+    staging_table_name = f"upsert_{table_name}"
+    update_columns = [column for column in columns if column not in key_columns]
+    column_list = ", ".join(columns)
+
+    db_session.execute(
+        f"CREATE TEMPORARY TABLE {staging_table_name} "
+        f"(LIKE {table_name} INCLUDING DEFAULTS)"
+    )
+    write_as_csv(db_session, staging_table_name, items, columns=columns)
+
+    keys_match = " AND ".join(
+        f"staged.{column} = existing.{column}" for column in key_columns
+    )
+    db_session.execute(
+        f"""
+        DELETE FROM {table_name} existing
+        WHERE
+            existing.block_number >= :after_block_number AND
+            existing.block_number < :before_block_number AND
+            NOT EXISTS (
+                SELECT 1 FROM {staging_table_name} staged WHERE {keys_match}
+            )
+        """,
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+    )
+
+    if len(update_columns) > 0:
+        on_conflict = (
+            "DO UPDATE SET "
+            + ", ".join(f"{column} = EXCLUDED.{column}" for column in update_columns)
+            # compared as text since json has no equality operator
+            + " WHERE ("
+            + ", ".join(f"{table_name}.{column}::text" for column in update_columns)
+            + ") IS DISTINCT FROM ("
+            + ", ".join(f"EXCLUDED.{column}::text" for column in update_columns)
+            + ")"
+        )
+    else:
+        on_conflict = "DO NOTHING"
+
+    db_session.execute(
+        f"""
+        INSERT INTO {table_name} ({column_list})
+        SELECT {column_list} FROM {staging_table_name}
+        ON CONFLICT ({", ".join(key_columns)}) {on_conflict}
+        """
+    )
+    db_session.execute(f"DROP TABLE {staging_table_name}")
@@ -1,26 +1,64 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 import eth_utils.abi
 from eth_abi import decode_abi
-from eth_abi.exceptions import InsufficientDataBytes, NonEmptyPaddingBytes
 from hexbytes._utils import hexstr_to_bytes
+from pydantic import BaseModel
 
 from mev_inspect.schemas.abi import ABI, ABIFunctionDescription
-from mev_inspect.schemas.call_data import CallData
+from mev_inspect.schemas.call_data import (
+    DECODE_EXCEPTIONS,
+    CallData,
+    LazyCallInputs,
+    intern_addresses,
+)
 
 # 0x + 8 characters
 SELECTOR_LENGTH = 10
 
 
+def get_selector(data: str) -> str:
+    return data[:SELECTOR_LENGTH]
+
+
+class _DecodableFunction(BaseModel):
+    name: str
+    signature: str
+    input_names: List[str]
+    input_types: List[str]
+
+
 class ABIDecoder:
     def __init__(self, abi: ABI):
-        self._functions_by_selector: Dict[str, ABIFunctionDescription] = {
-            description.get_selector(): description
+        self._functions_by_selector: Dict[str, _DecodableFunction] = {
+            description.get_selector(): _DecodableFunction(
+                name=description.name,
+                signature=description.get_signature(),
+                input_names=[input.name for input in description.inputs],
+                input_types=[
+                    input.type
+                    if input.type != "tuple"
+                    else eth_utils.abi.collapse_if_tuple(input.dict())
+                    for input in description.inputs
+                ],
+            )
             for description in abi
             if isinstance(description, ABIFunctionDescription)
         }
 
-    def decode(self, data: str) -> Optional[CallData]:
+    @property
+    def selectors(self) -> List[str]:
+        return list(self._functions_by_selector.keys())
+
+    def get_function_signature(self, data: str) -> Optional[str]:
+        func = self._functions_by_selector.get(get_selector(data))
+        return func.signature if func is not None else None
+
+    def decode(self, data: str, lazy: bool = False) -> Optional[CallData]:
+        """
+        With lazy=True only the function is resolved here, and the inputs are
+        decoded when first read
+        """
         selector, params = data[:SELECTOR_LENGTH], data[SELECTOR_LENGTH:]
 
         func = self._functions_by_selector.get(selector)
@@ -28,21 +66,22 @@ class ABIDecoder:
         if func is None:
             return None
 
-        names = [input.name for input in func.inputs]
-        types = [
-            input.type
-            if input.type != "tuple"
-            else eth_utils.abi.collapse_if_tuple(input.dict())
-            for input in func.inputs
-        ]
+        if lazy:
+            return CallData(
+                function_name=func.name,
+                function_signature=func.signature,
+                inputs=LazyCallInputs(func.input_names, func.input_types, params),
+            )
 
         try:
-            decoded = decode_abi(types, hexstr_to_bytes(params))
-        except (InsufficientDataBytes, NonEmptyPaddingBytes, OverflowError):
+            decoded = decode_abi(func.input_types, hexstr_to_bytes(params))
+        except DECODE_EXCEPTIONS:
             return None
 
         return CallData(
             function_name=func.name,
-            function_signature=func.get_signature(),
-            inputs={name: value for name, value in zip(names, decoded)},
+            function_signature=func.signature,
+            inputs=dict(
+                zip(func.input_names, intern_addresses(func.input_types, decoded))
+            ),
         )
@@ -1,5 +1,64 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
 from web3 import Web3
 
+# most blocks nodes return fee history for at once
+FEE_HISTORY_MAX_BLOCKS = 1024
+
+
+class BaseFeeFetcher:
+    """
+    Gets base fees for the blocks of a range
+
+    A block's base fee is read from its header where it has one. Otherwise
+    the fees for its whole window of FEE_HISTORY_MAX_BLOCKS blocks are
+    fetched at once, and kept for the other blocks in it
+    """
+
+    def __init__(self, w3: Web3, after_block_number: int, before_block_number: int):
+        self.w3 = w3
+        self.after_block_number = after_block_number
+        self.before_block_number = before_block_number
+        self._windows: Dict[int, asyncio.Task] = {}
+
+    async def get_base_fee_per_gas(
+        self,
+        block_number: int,
+        block_json: Optional[Any] = None,
+    ) -> int:
+        if block_json is not None and "baseFeePerGas" in block_json:
+            return block_json["baseFeePerGas"]
+
+        if not self.after_block_number <= block_number < self.before_block_number:
+            return await fetch_base_fee_per_gas(self.w3, block_number)
+
+        window_start = (
+            block_number
+            - (block_number - self.after_block_number) % FEE_HISTORY_MAX_BLOCKS
+        )
+
+        if window_start not in self._windows:
+            self._windows[window_start] = asyncio.ensure_future(
+                fetch_base_fees_per_gas(
+                    self.w3,
+                    window_start,
+                    min(
+                        window_start + FEE_HISTORY_MAX_BLOCKS,
+                        self.before_block_number,
+                    ),
+                )
+            )
+
+        try:
+            base_fees_per_gas = await asyncio.shield(self._windows[window_start])
+        except Exception:
+            # fetched again by the next block that needs it
+            self._windows.pop(window_start, None)
+            raise
+
+        return base_fees_per_gas[block_number - window_start]
+
 
 async def fetch_base_fee_per_gas(w3: Web3, block_number: int) -> int:
     base_fees = await w3.eth.fee_history(1, block_number)
@@ -8,3 +67,51 @@ async def fetch_base_fee_per_gas(w3: Web3, block_number: int) -> int:
         raise RuntimeError("Unexpected error - no fees returned")
 
     return base_fees_per_gas[0]
+
+
+async def fetch_base_fees_per_gas(
+    w3: Web3,
+    after_block_number: int,
+    before_block_number: int,
+) -> List[int]:
+    """
+    Returns the base fee of each block in the range, from one
+    eth_feeHistory request per FEE_HISTORY_MAX_BLOCKS blocks
+    """
+    window_starts = range(
+        after_block_number, before_block_number, FEE_HISTORY_MAX_BLOCKS
+    )
+    window_base_fees = await asyncio.gather(
+        *(
+            _fetch_window_base_fees_per_gas(
+                w3,
+                window_start,
+                min(window_start + FEE_HISTORY_MAX_BLOCKS, before_block_number),
+            )
+            for window_start in window_starts
+        )
+    )
+
+    return [base_fee for base_fees in window_base_fees for base_fee in base_fees]
+
+
+async def _fetch_window_base_fees_per_gas(
+    w3: Web3,
+    after_block_number: int,
+    before_block_number: int,
+) -> List[int]:
+    block_count = before_block_number - after_block_number
+    base_fees = await w3.eth.fee_history(block_count, before_block_number - 1)
+
+    # also has the fee of the block after the newest
+    base_fees_per_gas = base_fees["baseFeePerGas"][:block_count]
+    if (
+        base_fees["oldestBlock"] != after_block_number
+        or len(base_fees_per_gas) < block_count
+    ):
+        raise RuntimeError(
+            f"Expected {block_count} fees from block {after_block_number}, "
+            f"got {len(base_fees_per_gas)}"
+        )
+
+    return base_fees_per_gas
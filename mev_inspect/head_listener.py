@@ -0,0 +1,456 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+from aiohttp import ClientSession, WSMsgType
+from sqlalchemy import orm
+
+from mev_inspect.crud.latest_block_update import (
+    find_latest_block_update,
+    update_latest_block,
+)
+from mev_inspect.inspect_block import delete_inspections
+from mev_inspect.inspector import MEVInspector
+from mev_inspect.utils import hex_to_int
+
+logger = logging.getLogger(__name__)
+
+# recent blocks whose hashes are kept to find reorgs, which is deeper
+# than reorgs go
+DEFAULT_REORG_BUFFER_SIZE = 64
+
+# blocks inspected and recorded at a time when catching up on missed ones
+DEFAULT_GAP_BATCH_SIZE = 100
+
+RECONNECT_DELAY_SECONDS = 5
+
+# most recent latencies kept for percentiles
+DEFAULT_MAX_LATENCY_SAMPLES = 1000
+
+
+@dataclass
+class BlockHead:
+    block_number: int
+    block_hash: str
+    parent_hash: str
+    timestamp: int
+
+
+@dataclass
+class LatencyMetrics:
+    blocks: int
+    last_seconds: Optional[float]
+    p50_seconds: Optional[float]
+    p95_seconds: Optional[float]
+
+
+class BlockLatencies:
+    """
+    Seconds from when each block was mined, by its timestamp, to when its
+    results were written
+    """
+
+    def __init__(self, max_samples: int = DEFAULT_MAX_LATENCY_SAMPLES):
+        self._latencies: Deque[float] = deque(maxlen=max_samples)
+        self._blocks = 0
+
+    def record(self, block_timestamp: int, written_at: float) -> None:
+        self._latencies.append(written_at - block_timestamp)
+        self._blocks += 1
+
+    def get_metrics(self) -> LatencyMetrics:
+        if len(self._latencies) == 0:
+            return LatencyMetrics(
+                blocks=0, last_seconds=None, p50_seconds=None, p95_seconds=None
+            )
+
+        ordered_latencies = sorted(self._latencies)
+
+        return LatencyMetrics(
+            blocks=self._blocks,
+            last_seconds=self._latencies[-1],
+            p50_seconds=_get_percentile(ordered_latencies, 0.5),
+            p95_seconds=_get_percentile(ordered_latencies, 0.95),
+        )
+
+
+class BlockHashBuffer:
+    """
+    Hashes of the last size blocks seen, by block number
+    """
+
+    def __init__(self, size: int = DEFAULT_REORG_BUFFER_SIZE):
+        self.size = size
+        self._hashes: "OrderedDict[int, str]" = OrderedDict()
+
+    def get(self, block_number: int) -> Optional[str]:
+        return self._hashes.get(block_number)
+
+    def add(self, block_number: int, block_hash: str) -> None:
+        # blocks after it are from another chain
+        self.remove_from(block_number)
+        self._hashes[block_number] = block_hash
+
+        while len(self._hashes) > self.size:
+            self._hashes.popitem(last=False)
+
+    @property
+    def block_numbers(self) -> List[int]:
+        return list(self._hashes)
+
+    def remove_from(self, block_number: int) -> None:
+        while len(self._hashes) > 0 and next(reversed(self._hashes)) >= block_number:
+            self._hashes.popitem()
+
+
+class HeadListener:
+    """
+    Inspects blocks as their heads arrive from a newHeads subscription,
+    instead of polling for the latest block
+
+    Each head brings every block up to block_number_lag behind it, from
+    the last one written, so blocks missed while disconnected or busy are
+    caught up on in the same way. They're inspected as ranges of up to
+    gap_batch_size blocks with MEVInspector.inspect_many_blocks, and the
+    last block written is recorded after each range. A range that fails
+    is inspected again a block at a time, skipping blocks that still fail,
+    so one bad block never stalls the listener
+
+    With no lag, blocks are inspected as soon as they're seen rather than
+    once they settle. The hashes of the last reorg_buffer_size heads are
+    kept, and a head whose parent doesn't match, or that replaces one
+    seen, is a reorg. The results for the blocks replaced are deleted,
+    and the ones on the new chain inspected in their place
+    """
+
+    def __init__(
+        self,
+        inspector: MEVInspector,
+        inspect_db_session: orm.Session,
+        trace_db_session: Optional[orm.Session],
+        block_number_lag: int = 0,
+        gap_batch_size: int = DEFAULT_GAP_BATCH_SIZE,
+        healthcheck_url: Optional[str] = None,
+        reorg_buffer_size: int = DEFAULT_REORG_BUFFER_SIZE,
+    ):
+        self.inspector = inspector
+        self.inspect_db_session = inspect_db_session
+        self.trace_db_session = trace_db_session
+        self.block_number_lag = block_number_lag
+        self.gap_batch_size = gap_batch_size
+        self.healthcheck_url = healthcheck_url
+        self.latencies = BlockLatencies()
+        self.block_hashes = BlockHashBuffer(reorg_buffer_size)
+
+        # timestamps of heads seen and not written yet
+        self._block_timestamps: Dict[int, int] = {}
+
+    async def run(self, ws_url: str) -> None:
+        """
+        Listens until cancelled, subscribing again whenever the connection
+        is lost
+        """
+        try:
+            while True:
+                try:
+                    if not await self.listen(ws_url):
+                        return
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("New heads subscription failed")
+
+                logger.info(f"Subscribing again in {RECONNECT_DELAY_SECONDS}s")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+        except asyncio.CancelledError:
+            logger.info("Requested to exit, stopping listener")
+
+    async def listen(self, ws_url: str) -> bool:
+        """
+        Inspects blocks for the heads of one subscription, until the
+        connection closes. Returns False if inspecting was cancelled
+        """
+        session = await self.inspector.rpc_session.get_session()
+
+        async for head in subscribe_new_heads(session, ws_url):
+            if not await self.on_head(head):
+                return False
+
+        return True
+
+    async def on_head(self, head: BlockHead) -> bool:
+        reorged_block = await self._find_reorged_block(head)
+
+        if reorged_block is not None:
+            self.block_hashes.remove_from(reorged_block)
+
+        self.block_hashes.add(head.block_number, head.block_hash)
+        self._block_timestamps[head.block_number] = head.timestamp
+
+        last_block = head.block_number - self.block_number_lag
+        last_written_block = find_latest_block_update(self.inspect_db_session)
+
+        if last_written_block is None:
+            last_written_block = last_block - 1
+        elif reorged_block is not None and reorged_block <= last_written_block:
+            self._delete_reorged_blocks(reorged_block, last_written_block)
+            last_written_block = reorged_block - 1
+
+        for block_number in list(self._block_timestamps):
+            if block_number <= last_written_block:
+                del self._block_timestamps[block_number]
+
+        for after_block in range(
+            last_written_block + 1, last_block + 1, self.gap_batch_size
+        ):
+            before_block = min(after_block + self.gap_batch_size, last_block + 1)
+
+            try:
+                is_inspected = await inspect_range(
+                    self.inspector,
+                    self.inspect_db_session,
+                    self.trace_db_session,
+                    after_block,
+                    before_block,
+                )
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(
+                    f"Failed to inspect {after_block} to {before_block}, "
+                    "inspecting its blocks one at a time"
+                )
+                is_inspected = await inspect_range_by_block(
+                    self.inspector,
+                    self.inspect_db_session,
+                    self.trace_db_session,
+                    after_block,
+                    before_block,
+                )
+
+            if not is_inspected:
+                return False
+
+            self._record_latencies(before_block)
+
+            if self.healthcheck_url is not None:
+                await self._ping_healthcheck_url()
+
+        return True
+
+    async def _find_reorged_block(self, head: BlockHead) -> Optional[int]:
+        """
+        Returns the first block seen that the head's chain replaces, if
+        any, following its parents back through the blocks seen
+        """
+        reorged_block = None
+        seen_hash = self.block_hashes.get(head.block_number)
+
+        if seen_hash is not None and seen_hash != head.block_hash:
+            reorged_block = head.block_number
+
+        block_number = head.block_number - 1
+        parent_hash = head.parent_hash
+        seen_hash = self.block_hashes.get(block_number)
+
+        while seen_hash is not None and seen_hash != parent_hash:
+            reorged_block = block_number
+
+            parent = await self.inspector.base_provider.make_request(
+                "eth_getBlockByHash", [parent_hash, False]
+            )
+
+            if parent is None or parent.get("result") is None:
+                # unknown to the node, so everything seen before is in doubt
+                return min(self.block_hashes.block_numbers, default=block_number)
+
+            block_number -= 1
+            parent_hash = parent["result"]["parentHash"]
+            seen_hash = self.block_hashes.get(block_number)
+
+        return reorged_block
+
+    def _delete_reorged_blocks(
+        self, reorged_block: int, last_written_block: int
+    ) -> None:
+        logger.warning(
+            f"Reorg from block {reorged_block}, "
+            f"inspecting {last_written_block - reorged_block + 1} blocks again"
+        )
+
+        # recorded first, so they're inspected again if deleting is cut short
+        update_latest_block(self.inspect_db_session, reorged_block - 1)
+        self.inspect_db_session.commit()
+
+        delete_inspections(
+            self.inspect_db_session, reorged_block, last_written_block + 1
+        )
+
+    def _record_latencies(self, before_block: int) -> None:
+        written_at = time.time()
+
+        for block_number in sorted(self._block_timestamps):
+            if block_number >= before_block:
+                break
+
+            self.latencies.record(self._block_timestamps.pop(block_number), written_at)
+
+        logger.info(f"Block latency: {self.latencies.get_metrics()}")
+
+    async def _ping_healthcheck_url(self) -> None:
+        session = await self.inspector.rpc_session.get_session()
+        async with session.get(self.healthcheck_url):
+            pass
+
+
+async def inspect_range(
+    inspector: MEVInspector,
+    inspect_db_session: orm.Session,
+    trace_db_session: Optional[orm.Session],
+    after_block: int,
+    before_block: int,
+) -> bool:
+    """
+    Inspects the range in one batch and records its last block as the
+    latest written. Returns False if inspecting was cancelled
+    """
+    if inspector.price_oracle is not None:
+        inspector.price_oracle.refresh(inspect_db_session)
+
+    if not await inspector.inspect_many_blocks(
+        inspect_db_session=inspect_db_session,
+        trace_db_session=trace_db_session,
+        after_block=after_block,
+        before_block=before_block,
+    ):
+        return False
+
+    update_latest_block(inspect_db_session, before_block - 1)
+    inspect_db_session.commit()
+
+    return True
+
+
+async def inspect_range_by_block(
+    inspector: MEVInspector,
+    inspect_db_session: orm.Session,
+    trace_db_session: Optional[orm.Session],
+    after_block: int,
+    before_block: int,
+) -> bool:
+    """
+    Inspects the range one block at a time, recording each as the latest
+    written. Blocks that fail are logged and recorded as written, so
+    they're skipped. Returns False if inspecting was cancelled
+    """
+    for block_number in range(after_block, before_block):
+        try:
+            if not await inspect_range(
+                inspector,
+                inspect_db_session,
+                trace_db_session,
+                block_number,
+                block_number + 1,
+            ):
+                return False
+        except Exception:  # pylint: disable=broad-except
+            logger.exception(f"Skipping block: {block_number}")
+            update_latest_block(inspect_db_session, block_number)
+            inspect_db_session.commit()
+
+    return True
+
+
+async def catch_up(
+    inspector: MEVInspector,
+    inspect_db_session: orm.Session,
+    trace_db_session: Optional[orm.Session],
+    after_block: int,
+    before_block: int,
+    batch_size: int = DEFAULT_GAP_BATCH_SIZE,
+) -> bool:
+    """
+    Inspects the range in batches of batch_size blocks, recording progress
+    after each, so a listener far behind catches up at the rate the node
+    serves blocks. A batch that fails is inspected again a block at a
+    time, skipping blocks that still fail, before batching on. Returns
+    False if inspecting was cancelled
+    """
+    logger.info(f"Catching up on {before_block - after_block} blocks")
+
+    for batch_after_block in range(after_block, before_block, batch_size):
+        batch_before_block = min(batch_after_block + batch_size, before_block)
+
+        try:
+            is_inspected = await inspect_range(
+                inspector,
+                inspect_db_session,
+                trace_db_session,
+                batch_after_block,
+                batch_before_block,
+            )
+        except Exception:  # pylint: disable=broad-except
+            logger.exception(
+                f"Failed to catch up on {batch_after_block} to {batch_before_block}, "
+                "inspecting its blocks one at a time"
+            )
+            is_inspected = await inspect_range_by_block(
+                inspector,
+                inspect_db_session,
+                trace_db_session,
+                batch_after_block,
+                batch_before_block,
+            )
+
+        if not is_inspected:
+            return False
+
+        logger.info(f"Caught up to {batch_before_block - 1}")
+
+    return True
+
+
+async def subscribe_new_heads(
+    session: ClientSession,
+    ws_url: str,
+) -> AsyncIterator[BlockHead]:
+    """
+    Yields the head of each new block, until the connection closes
+    """
+    async with session.ws_connect(ws_url) as ws:
+        await ws.send_json(
+            {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "eth_subscribe",
+                "params": ["newHeads"],
+            }
+        )
+
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                break
+
+            data = json.loads(message.data)
+
+            if "error" in data:
+                raise RuntimeError(f"Subscribing to new heads failed: {data['error']}")
+
+            if data.get("method") != "eth_subscription":
+                # the subscription id
+                continue
+
+            head = data["params"]["result"]
+
+            yield BlockHead(
+                block_number=hex_to_int(head["number"]),
+                block_hash=head["hash"],
+                parent_hash=head["parentHash"],
+                timestamp=hex_to_int(head["timestamp"]),
+            )
+
+
+def _get_percentile(ordered_values, percentile: float) -> float:
+    return ordered_values[
+        min(len(ordered_values) - 1, int(len(ordered_values) * percentile))
+    ]
@@ -1,44 +1,82 @@
+import asyncio
 import logging
-from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import chain
+from typing import Collection, Dict, List, Optional, Tuple
 
 from sqlalchemy import orm
 from web3 import Web3
 
 from mev_inspect.arbitrages import get_arbitrages
 from mev_inspect.block import create_from_block_number
+from mev_inspect.block_archive import BlockArchive
 from mev_inspect.classifiers.trace import TraceClassifier
+from mev_inspect.concurrency import gather_or_cancel
 from mev_inspect.crud.arbitrages import delete_arbitrages_for_blocks, write_arbitrages
-from mev_inspect.crud.blocks import delete_blocks, write_blocks
+from mev_inspect.crud.blocks import delete_blocks, upsert_blocks, write_blocks
 from mev_inspect.crud.liquidations import (
     delete_liquidations_for_blocks,
+    upsert_liquidations_for_blocks,
     write_liquidations,
 )
 from mev_inspect.crud.miner_payments import (
     delete_miner_payments_for_blocks,
+    upsert_miner_payments_for_blocks,
     write_miner_payments,
 )
-from mev_inspect.crud.nft_trades import delete_nft_trades_for_blocks, write_nft_trades
+from mev_inspect.crud.nft_trades import (
+    delete_nft_trades_for_blocks,
+    upsert_nft_trades_for_blocks,
+    write_nft_trades,
+)
+from mev_inspect.crud.partitions import (
+    PARTITION_SIZE,
+    PARTITIONED_TABLES,
+    create_partitions_for_blocks,
+    create_staging_table,
+    get_partition_start,
+    get_stageable_partition_starts,
+    get_staging_table_name,
+    swap_staging_table,
+)
 from mev_inspect.crud.punks import (
     delete_punk_bid_acceptances_for_blocks,
     delete_punk_bids_for_blocks,
     delete_punk_snipes_for_blocks,
+    upsert_punk_bid_acceptances_for_blocks,
+    upsert_punk_bids_for_blocks,
+    upsert_punk_snipes_for_blocks,
     write_punk_bid_acceptances,
     write_punk_bids,
     write_punk_snipes,
 )
 from mev_inspect.crud.sandwiches import delete_sandwiches_for_blocks, write_sandwiches
 from mev_inspect.crud.summary import update_summary_for_block_range
-from mev_inspect.crud.swaps import delete_swaps_for_blocks, write_swaps
+from mev_inspect.crud.swaps import (
+    delete_swaps_for_blocks,
+    upsert_swaps_for_blocks,
+    write_swaps,
+)
 from mev_inspect.crud.traces import (
     delete_classified_traces_for_blocks,
+    upsert_classified_traces_for_blocks,
     write_classified_traces,
 )
-from mev_inspect.crud.transfers import delete_transfers_for_blocks, write_transfers
+from mev_inspect.crud.transfers import (
+    delete_transfers_for_blocks,
+    upsert_transfers_for_blocks,
+    write_transfers,
+)
+from mev_inspect.db import atomic_write
+from mev_inspect.fees import BaseFeeFetcher
 from mev_inspect.liquidations import get_liquidations
 from mev_inspect.miner_payments import get_miner_payments
 from mev_inspect.nft_trades import get_nft_trades
+from mev_inspect.price_oracle import PriceOracle
 from mev_inspect.punks import get_punk_bid_acceptances, get_punk_bids, get_punk_snipes
-from mev_inspect.sandwiches import get_sandwiches
+from mev_inspect.sandwiches import SandwichWindow, get_sandwiches
 from mev_inspect.schemas.arbitrages import Arbitrage
 from mev_inspect.schemas.blocks import Block
 from mev_inspect.schemas.liquidations import Liquidation
@@ -54,11 +92,20 @@ from mev_inspect.schemas.transfers import Transfer
 from mev_inspect.swaps import get_swaps
 from mev_inspect.transfers import get_transfers
 from mev_inspect.liquidations import get_liquidations
-from mev_inspect.utils import RPCType
+from mev_inspect.utils import RPCType, WriteMode
 
 
 logger = logging.getLogger(__name__)
 
+# blocks buffered between each pipeline stage
+DEFAULT_QUEUE_SIZE = 10
+
+# blocks written in each transaction
+DEFAULT_WRITE_BATCH_SIZE = 10
+
+# set in each worker of an inspect process pool
+_worker_trace_classifier: Optional[TraceClassifier] = None
+
 
 async def inspect_block(
     inspect_db_session: orm.Session,
@@ -69,6 +116,9 @@ async def inspect_block(
     block_number: int,
     trace_db_session: Optional[orm.Session],
     should_write_classified_traces: bool = True,
+    price_oracle: Optional[PriceOracle] = None,
+    block_archive: Optional[BlockArchive] = None,
+    sandwich_window: Optional[SandwichWindow] = None,
 ):
     await inspect_many_blocks(
         inspect_db_session,
@@ -80,9 +130,28 @@ async def inspect_block(
         block_number + 1,
         trace_db_session,
         should_write_classified_traces,
+        price_oracle=price_oracle,
+        block_archive=block_archive,
+        sandwich_window=sandwich_window,
     )
 
 
+@dataclass
+class BlockInspection:
+    block: Block
+    classified_traces: List[ClassifiedTrace] = field(default_factory=list)
+    transfers: List[Transfer] = field(default_factory=list)
+    swaps: List[Swap] = field(default_factory=list)
+    arbitrages: List[Arbitrage] = field(default_factory=list)
+    liquidations: List[Liquidation] = field(default_factory=list)
+    sandwiches: List[Sandwich] = field(default_factory=list)
+    punk_bids: List[PunkBid] = field(default_factory=list)
+    punk_bid_acceptances: List[PunkBidAcceptance] = field(default_factory=list)
+    punk_snipes: List[PunkSnipe] = field(default_factory=list)
+    nft_trades: List[NftTrade] = field(default_factory=list)
+    miner_payments: List[MinerPayment] = field(default_factory=list)
+
+
 async def inspect_many_blocks(
     inspect_db_session: orm.Session,
     base_provider,
@@ -93,7 +162,359 @@ async def inspect_many_blocks(
     before_block_number: int,
     trace_db_session: Optional[orm.Session],
     should_write_classified_traces: bool = True,
+    fetch_concurrency: int = 1,
+    inspect_concurrency: int = 1,
+    write_batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    inspect_process_pool: Optional[ProcessPoolExecutor] = None,
+    write_mode: WriteMode = WriteMode.replace,
+    price_oracle: Optional[PriceOracle] = None,
+    block_archive: Optional[BlockArchive] = None,
+    sandwich_window: Optional[SandwichWindow] = None,
 ):
+    """
+    Blocks go through three stages - fetch, inspect and write - connected
+    by bounded queues, so fetching later blocks overlaps inspecting and
+    writing earlier ones.
+
+    fetch_concurrency blocks are fetched at once, and inspect_concurrency
+    blocks are classified at once in the loop's executor, or in
+    inspect_process_pool if given (see get_inspect_process_pool). Writes
+    share inspect_db_session, so there is a single writer, which writes
+    write_batch_size blocks at a time in block order. Blocks are only
+    fetched up to queue_size blocks past the batch being written, so a
+    block that's slow to fetch doesn't leave the ones after it piling up
+
+    With WriteMode.upsert, partitions of the partitioned tables that the
+    range fully covers are loaded into staging tables, each swapped in as
+    soon as its last block is written, and everything else is merged into
+    the existing rows
+
+    With a price_oracle, the USD value of the MEV found is logged as each
+    block is written. With a block_archive, blocks in it aren't fetched,
+    and the ones fetched are added to it
+
+    With a sandwich_window, blocks are added to it in order as they're
+    written, and the sandwiches it finds across blocks are written with
+    the rest. It can be kept between calls for consecutive ranges
+    """
+    loop = asyncio.get_running_loop()
+
+    staged_partition_starts: Dict[str, List[int]] = {}
+
+    if write_mode == WriteMode.upsert:
+        staged_partition_starts = await loop.run_in_executor(
+            None,
+            _stage_partitions,
+            inspect_db_session,
+            after_block_number,
+            before_block_number,
+            should_write_classified_traces,
+        )
+
+    staged_partition_ends = [
+        partition_start + PARTITION_SIZE
+        for partition_starts in staged_partition_starts.values()
+        for partition_start in partition_starts
+    ]
+    write_batches = _get_write_batches(
+        after_block_number,
+        before_block_number,
+        write_batch_size,
+        split_block_numbers=[
+            *chain.from_iterable(staged_partition_starts.values()),
+            *staged_partition_ends,
+        ],
+    )
+
+    block_numbers: asyncio.Queue = asyncio.Queue()
+    blocks: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    inspections: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    for block_number in range(after_block_number, before_block_number):
+        block_numbers.put_nowait(block_number)
+
+    # taken for each block fetched and given back once it's written
+    fetch_window = asyncio.Semaphore(write_batch_size + queue_size)
+
+    base_fee_fetcher = BaseFeeFetcher(w3, after_block_number, before_block_number)
+
+    async def fetch_worker():
+        while True:
+            await fetch_window.acquire()
+
+            if block_numbers.empty():
+                fetch_window.release()
+                return
+
+            block_number = block_numbers.get_nowait()
+            block = await create_from_block_number(
+                base_provider,
+                w3,
+                type,
+                block_number,
+                trace_db_session,
+                block_archive=block_archive,
+                base_fee_fetcher=base_fee_fetcher,
+            )
+            await blocks.put(block)
+
+    async def inspect_worker():
+        while True:
+            block = await blocks.get()
+
+            if block is None:
+                return
+
+            if inspect_process_pool is None:
+                inspection = await loop.run_in_executor(
+                    None, _inspect_block_data, trace_classifier, block
+                )
+            else:
+                inspection = await loop.run_in_executor(
+                    inspect_process_pool, _inspect_block_in_worker, block
+                )
+            await inspections.put(inspection)
+
+    async def fetch_stage():
+        await gather_or_cancel(*(fetch_worker() for _ in range(fetch_concurrency)))
+
+        for _ in range(inspect_concurrency):
+            await blocks.put(None)
+
+    async def inspect_stage():
+        await gather_or_cancel(*(inspect_worker() for _ in range(inspect_concurrency)))
+
+    async def write_stage():
+        inspections_by_block_number: Dict[int, BlockInspection] = {}
+
+        for batch_after_block, batch_before_block in write_batches:
+            batch_block_numbers = range(batch_after_block, batch_before_block)
+
+            while not all(
+                block_number in inspections_by_block_number
+                for block_number in batch_block_numbers
+            ):
+                inspection = await inspections.get()
+                inspections_by_block_number[inspection.block.block_number] = inspection
+
+                if price_oracle is not None:
+                    _log_usd_values(price_oracle, inspection)
+
+            batch_inspections = [
+                inspections_by_block_number.pop(block_number)
+                for block_number in batch_block_numbers
+            ]
+
+            if sandwich_window is not None:
+                for inspection in batch_inspections:
+                    _add_cross_block_sandwiches(sandwich_window, inspection)
+
+            partition_start = get_partition_start(batch_after_block)
+            staged_table_names = [
+                table_name
+                for table_name, partition_starts in staged_partition_starts.items()
+                if partition_start in partition_starts
+            ]
+
+            await loop.run_in_executor(
+                None,
+                _write_inspections,
+                inspect_db_session,
+                batch_after_block,
+                batch_before_block,
+                batch_inspections,
+                should_write_classified_traces,
+                write_mode,
+                staged_table_names,
+            )
+
+            for _ in batch_block_numbers:
+                fetch_window.release()
+
+            if (
+                len(staged_table_names) > 0
+                and batch_before_block == partition_start + PARTITION_SIZE
+            ):
+                await loop.run_in_executor(
+                    None,
+                    _swap_staged_partition,
+                    inspect_db_session,
+                    partition_start,
+                    staged_table_names,
+                )
+
+    await gather_or_cancel(fetch_stage(), inspect_stage(), write_stage())
+
+
+def delete_inspections(
+    inspect_db_session: orm.Session,
+    after_block_number: int,
+    before_block_number: int,
+) -> None:
+    """
+    Deletes every result written for the range, as replacing it with no
+    blocks does
+    """
+    _write_inspections(
+        inspect_db_session,
+        after_block_number,
+        before_block_number,
+        [],
+        should_write_classified_traces=True,
+        write_mode=WriteMode.replace,
+    )
+
+
+def _add_cross_block_sandwiches(
+    sandwich_window: SandwichWindow, inspection: BlockInspection
+) -> None:
+    block_number = inspection.block.block_number
+    sandwiches = sandwich_window.add_block(block_number, inspection.swaps)
+    logger.info(
+        f"Block: {block_number} -- Found {len(sandwiches)} sandwiches across blocks"
+    )
+
+    inspection.sandwiches.extend(sandwiches)
+
+
+def _log_usd_values(price_oracle: PriceOracle, inspection: BlockInspection) -> None:
+    block_number = inspection.block.block_number
+    block_timestamp = inspection.block.block_timestamp
+    miner_payments_by_transaction_hash = {
+        miner_payment.transaction_hash: miner_payment
+        for miner_payment in inspection.miner_payments
+    }
+
+    def get_miner_payment_usd(transaction_hash: str) -> Optional[float]:
+        miner_payment = miner_payments_by_transaction_hash.get(transaction_hash)
+
+        if miner_payment is None:
+            return None
+
+        return price_oracle.get_miner_payment_usd(miner_payment, block_timestamp)
+
+    for arbitrage in inspection.arbitrages:
+        profit_usd = price_oracle.get_arbitrage_profit_usd(arbitrage, block_timestamp)
+        logger.info(
+            f"Block: {block_number} -- Arbitrage {arbitrage.transaction_hash} "
+            f"gross profit USD: {profit_usd} "
+            f"miner payment USD: {get_miner_payment_usd(arbitrage.transaction_hash)}"
+        )
+
+    for liquidation in inspection.liquidations:
+        profit_usd = price_oracle.get_liquidation_profit_usd(
+            liquidation, block_timestamp
+        )
+        logger.info(
+            f"Block: {block_number} -- Liquidation {liquidation.transaction_hash} "
+            f"gross profit USD: {profit_usd} "
+            f"miner payment USD: {get_miner_payment_usd(liquidation.transaction_hash)}"
+        )
+
+
+def get_inspect_process_pool(
+    max_workers: int, lazy_decode: bool = False
+) -> ProcessPoolExecutor:
+    """
+    Workers build their own TraceClassifier once on start, so only blocks
+    and their results are pickled between processes
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_inspect_worker,
+        initargs=(lazy_decode,),
+    )
+
+
+def _init_inspect_worker(lazy_decode: bool) -> None:
+    global _worker_trace_classifier  # pylint: disable=global-statement
+    _worker_trace_classifier = TraceClassifier(lazy_decode=lazy_decode)
+
+
+def _inspect_block_in_worker(block: Block) -> BlockInspection:
+    if _worker_trace_classifier is None:
+        raise RuntimeError("Inspect worker was not initialized")
+
+    return _inspect_block_data(_worker_trace_classifier, block)
+
+
+def _inspect_block_data(
+    trace_classifier: TraceClassifier, block: Block
+) -> BlockInspection:
+    block_number = block.block_number
+    logger.info(f"Block: {block_number} -- Total traces: {len(block.traces)}")
+
+    total_transactions = len(
+        set(t.transaction_hash for t in block.traces if t.transaction_hash is not None)
+    )
+    logger.info(f"Block: {block_number} -- Total transactions: {total_transactions}")
+
+    classified_traces = trace_classifier.classify(block.traces)
+    logger.info(
+        f"Block: {block_number} -- Returned {len(classified_traces)} classified traces"
+    )
+
+    transfers = get_transfers(classified_traces)
+    logger.info(f"Block: {block_number} -- Found {len(transfers)} transfers")
+
+    swaps = get_swaps(classified_traces)
+    logger.info(f"Block: {block_number} -- Found {len(swaps)} swaps")
+
+    arbitrages = get_arbitrages(swaps)
+    for s in arbitrages:
+        for sw in s.swaps:
+            logger.info(sw)
+            logger.info(str(sw.token_in_address) + "  " + str(sw.token_out_address))
+    logger.info(f"Block: {block_number} -- Found {len(arbitrages)} arbitrages")
+
+    liquidations = get_liquidations(classified_traces)
+    logger.info(f"Block: {block_number} -- Found {len(liquidations)} liquidations")
+
+    sandwiches = get_sandwiches(swaps)
+    logger.info(f"Block: {block_number} -- Found {len(sandwiches)} sandwiches")
+
+    punk_bids = get_punk_bids(classified_traces)
+    punk_bid_acceptances = get_punk_bid_acceptances(classified_traces)
+    punk_snipes = get_punk_snipes(punk_bids, punk_bid_acceptances)
+    logger.info(f"Block: {block_number} -- Found {len(punk_snipes)} punk snipes")
+
+    nft_trades = get_nft_trades(classified_traces)
+    logger.info(f"Block: {block_number} -- Found {len(nft_trades)} nft trades")
+
+    miner_payments = get_miner_payments(
+        block.miner, block.base_fee_per_gas, classified_traces, block.receipts
+    )
+
+    return BlockInspection(
+        block=block,
+        classified_traces=classified_traces,
+        transfers=transfers,
+        swaps=swaps,
+        arbitrages=arbitrages,
+        liquidations=liquidations,
+        sandwiches=sandwiches,
+        punk_bids=punk_bids,
+        punk_bid_acceptances=punk_bid_acceptances,
+        punk_snipes=punk_snipes,
+        nft_trades=nft_trades,
+        miner_payments=miner_payments,
+    )
+
+
+def _write_inspections(
+    inspect_db_session: orm.Session,
+    after_block_number: int,
+    before_block_number: int,
+    inspections: List[BlockInspection],
+    should_write_classified_traces: bool = True,
+    write_mode: WriteMode = WriteMode.replace,
+    staged_table_names: Collection[str] = (),
+):
+    """
+    staged_table_names are partitioned tables whose rows for the range
+    go to the staging table for their partition instead
+    """
     all_blocks: List[Block] = []
     all_classified_traces: List[ClassifiedTrace] = []
     all_transfers: List[Transfer] = []
@@ -110,142 +531,333 @@ async def inspect_many_blocks(
 
     all_nft_trades: List[NftTrade] = []
 
-    for block_number in range(after_block_number, before_block_number):
-        block = await create_from_block_number(
-            base_provider,
-            w3,
-            type,
-            block_number,
-            trace_db_session,
-        )
-
-        logger.info(f"Block: {block_number} -- Total traces: {len(block.traces)}")
-
-        total_transactions = len(
-            set(
-                t.transaction_hash
-                for t in block.traces
-                if t.transaction_hash is not None
-            )
-        )
-        logger.info(
-            f"Block: {block_number} -- Total transactions: {total_transactions}"
-        )
-
-        classified_traces = trace_classifier.classify(block.traces)
-        logger.info(
-            f"Block: {block_number} -- Returned {len(classified_traces)} classified traces"
-        )
-
-        transfers = get_transfers(classified_traces)
-        logger.info(f"Block: {block_number} -- Found {len(transfers)} transfers")
-
-        swaps = get_swaps(classified_traces)
-        logger.info(f"Block: {block_number} -- Found {len(swaps)} swaps")
+    for inspection in inspections:
+        all_blocks.append(inspection.block)
+        all_classified_traces.extend(inspection.classified_traces)
+        all_transfers.extend(inspection.transfers)
+        all_swaps.extend(inspection.swaps)
+        all_arbitrages.extend(inspection.arbitrages)
+        all_liquidations.extend(inspection.liquidations)
+        all_sandwiches.extend(inspection.sandwiches)
 
-        arbitrages = get_arbitrages(swaps)
-        for s in arbitrages:
-            for sw in s.swaps:
-                logger.info(sw)
-                logger.info(str(sw.token_in_address) + '  ' + str(sw.token_out_address))
-        logger.info(f"Block: {block_number} -- Found {len(arbitrages)} arbitrages")
+        all_punk_bids.extend(inspection.punk_bids)
+        all_punk_bid_acceptances.extend(inspection.punk_bid_acceptances)
+        all_punk_snipes.extend(inspection.punk_snipes)
 
-        liquidations = get_liquidations(classified_traces)
-        logger.info(f"Block: {block_number} -- Found {len(liquidations)} liquidations")
+        all_nft_trades.extend(inspection.nft_trades)
 
-        sandwiches = get_sandwiches(swaps)
-        logger.info(f"Block: {block_number} -- Found {len(sandwiches)} sandwiches")
+        all_miner_payments.extend(inspection.miner_payments)
 
-        punk_bids = get_punk_bids(classified_traces)
-        punk_bid_acceptances = get_punk_bid_acceptances(classified_traces)
-        punk_snipes = get_punk_snipes(punk_bids, punk_bid_acceptances)
-        logger.info(f"Block: {block_number} -- Found {len(punk_snipes)} punk snipes")
+    logger.info("Writing data")
+    with atomic_write(inspect_db_session):
+        create_partitions_for_blocks(
+            inspect_db_session, after_block_number, before_block_number
+        )
 
-        nft_trades = get_nft_trades(classified_traces)
-        logger.info(f"Block: {block_number} -- Found {len(nft_trades)} nft trades")
+        if write_mode == WriteMode.upsert:
+            _upsert_results(
+                inspect_db_session,
+                after_block_number,
+                before_block_number,
+                all_blocks,
+                all_classified_traces if should_write_classified_traces else None,
+                all_transfers,
+                all_swaps,
+                all_liquidations,
+                all_punk_bids,
+                all_punk_bid_acceptances,
+                all_punk_snipes,
+                all_nft_trades,
+                all_miner_payments,
+                staged_table_names,
+            )
+        else:
+            _replace_results(
+                inspect_db_session,
+                after_block_number,
+                before_block_number,
+                all_blocks,
+                all_classified_traces if should_write_classified_traces else None,
+                all_transfers,
+                all_swaps,
+                all_liquidations,
+                all_punk_bids,
+                all_punk_bid_acceptances,
+                all_punk_snipes,
+                all_nft_trades,
+                all_miner_payments,
+            )
 
-        miner_payments = get_miner_payments(
-            block.miner, block.base_fee_per_gas, classified_traces, block.receipts
+        # ids are generated on each write, so these are always replaced
+        delete_arbitrages_for_blocks(
+            inspect_db_session, after_block_number, before_block_number
         )
+        write_arbitrages(inspect_db_session, all_arbitrages)
 
-        all_blocks.append(block)
-        all_classified_traces.extend(classified_traces)
-        all_transfers.extend(transfers)
-        all_swaps.extend(swaps)
-        all_arbitrages.extend(arbitrages)
-        all_liquidations.extend(liquidations)
-        all_sandwiches.extend(sandwiches)
-
-        all_punk_bids.extend(punk_bids)
-        all_punk_bid_acceptances.extend(punk_bid_acceptances)
-        all_punk_snipes.extend(punk_snipes)
+        delete_sandwiches_for_blocks(
+            inspect_db_session, after_block_number, before_block_number
+        )
+        write_sandwiches(inspect_db_session, all_sandwiches)
+
+        # the summary reads partitioned tables, so for staged blocks
+        # it's updated once the staging tables are swapped in
+        if len(staged_table_names) == 0:
+            # also for blocks before with the frontruns of sandwiches
+            # found across blocks, whose arbitrages no longer count
+            summary_after_block_number = min(
+                [after_block_number]
+                + [sandwich.frontrun_swap.block_number for sandwich in all_sandwiches]
+            )
+            update_summary_for_block_range(
+                inspect_db_session,
+                summary_after_block_number,
+                before_block_number,
+            )
 
-        all_nft_trades.extend(nft_trades)
+    logger.info("Done writing")
 
-        all_miner_payments.extend(miner_payments)
 
-    logger.info("Writing data")
+def _replace_results(
+    inspect_db_session: orm.Session,
+    after_block_number: int,
+    before_block_number: int,
+    blocks: List[Block],
+    classified_traces: Optional[List[ClassifiedTrace]],
+    transfers: List[Transfer],
+    swaps: List[Swap],
+    liquidations: List[Liquidation],
+    punk_bids: List[PunkBid],
+    punk_bid_acceptances: List[PunkBidAcceptance],
+    punk_snipes: List[PunkSnipe],
+    nft_trades: List[NftTrade],
+    miner_payments: List[MinerPayment],
+) -> None:
     delete_blocks(inspect_db_session, after_block_number, before_block_number)
-    write_blocks(inspect_db_session, all_blocks)
+    write_blocks(inspect_db_session, blocks)
 
-    if should_write_classified_traces:
+    if classified_traces is not None:
         delete_classified_traces_for_blocks(
             inspect_db_session, after_block_number, before_block_number
         )
-        write_classified_traces(inspect_db_session, all_classified_traces)
+        write_classified_traces(inspect_db_session, classified_traces)
 
     delete_transfers_for_blocks(
         inspect_db_session, after_block_number, before_block_number
     )
-    write_transfers(inspect_db_session, all_transfers)
+    write_transfers(inspect_db_session, transfers)
 
     delete_swaps_for_blocks(inspect_db_session, after_block_number, before_block_number)
-    write_swaps(inspect_db_session, all_swaps)
-
-    delete_arbitrages_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_arbitrages(inspect_db_session, all_arbitrages)
+    write_swaps(inspect_db_session, swaps)
 
     delete_liquidations_for_blocks(
         inspect_db_session, after_block_number, before_block_number
     )
-    write_liquidations(inspect_db_session, all_liquidations)
-
-    delete_sandwiches_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_sandwiches(inspect_db_session, all_sandwiches)
+    write_liquidations(inspect_db_session, liquidations)
 
     delete_punk_bids_for_blocks(
         inspect_db_session, after_block_number, before_block_number
     )
-    write_punk_bids(inspect_db_session, all_punk_bids)
+    write_punk_bids(inspect_db_session, punk_bids)
 
     delete_punk_bid_acceptances_for_blocks(
         inspect_db_session, after_block_number, before_block_number
     )
-    write_punk_bid_acceptances(inspect_db_session, all_punk_bid_acceptances)
+    write_punk_bid_acceptances(inspect_db_session, punk_bid_acceptances)
 
     delete_punk_snipes_for_blocks(
         inspect_db_session, after_block_number, before_block_number
     )
-    write_punk_snipes(inspect_db_session, all_punk_snipes)
+    write_punk_snipes(inspect_db_session, punk_snipes)
 
     delete_nft_trades_for_blocks(
         inspect_db_session, after_block_number, before_block_number
     )
-    write_nft_trades(inspect_db_session, all_nft_trades)
+    write_nft_trades(inspect_db_session, nft_trades)
 
     delete_miner_payments_for_blocks(
         inspect_db_session, after_block_number, before_block_number
     )
-    write_miner_payments(inspect_db_session, all_miner_payments)
+    write_miner_payments(inspect_db_session, miner_payments)
+
+
+def _upsert_results(
+    inspect_db_session: orm.Session,
+    after_block_number: int,
+    before_block_number: int,
+    blocks: List[Block],
+    classified_traces: Optional[List[ClassifiedTrace]],
+    transfers: List[Transfer],
+    swaps: List[Swap],
+    liquidations: List[Liquidation],
+    punk_bids: List[PunkBid],
+    punk_bid_acceptances: List[PunkBidAcceptance],
+    punk_snipes: List[PunkSnipe],
+    nft_trades: List[NftTrade],
+    miner_payments: List[MinerPayment],
+    staged_table_names: Collection[str],
+) -> None:
+    staging_table_name = partial(
+        get_staging_table_name,
+        partition_start=get_partition_start(after_block_number),
+    )
 
-    update_summary_for_block_range(
+    upsert_blocks(inspect_db_session, after_block_number, before_block_number, blocks)
+
+    if classified_traces is not None:
+        if "classified_traces" in staged_table_names:
+            write_classified_traces(
+                inspect_db_session,
+                classified_traces,
+                table_name=staging_table_name("classified_traces"),
+            )
+        else:
+            upsert_classified_traces_for_blocks(
+                inspect_db_session,
+                after_block_number,
+                before_block_number,
+                classified_traces,
+            )
+
+    if "transfers" in staged_table_names:
+        write_transfers(
+            inspect_db_session,
+            transfers,
+            table_name=staging_table_name("transfers"),
+        )
+    else:
+        upsert_transfers_for_blocks(
+            inspect_db_session, after_block_number, before_block_number, transfers
+        )
+
+    if "swaps" in staged_table_names:
+        write_swaps(
+            inspect_db_session,
+            swaps,
+            table_name=staging_table_name("swaps"),
+        )
+    else:
+        upsert_swaps_for_blocks(
+            inspect_db_session, after_block_number, before_block_number, swaps
+        )
+
+    if "miner_payments" in staged_table_names:
+        write_miner_payments(
+            inspect_db_session,
+            miner_payments,
+            table_name=staging_table_name("miner_payments"),
+        )
+    else:
+        upsert_miner_payments_for_blocks(
+            inspect_db_session,
+            after_block_number,
+            before_block_number,
+            miner_payments,
+        )
+
+    upsert_liquidations_for_blocks(
+        inspect_db_session, after_block_number, before_block_number, liquidations
+    )
+    upsert_punk_bids_for_blocks(
+        inspect_db_session, after_block_number, before_block_number, punk_bids
+    )
+    upsert_punk_bid_acceptances_for_blocks(
         inspect_db_session,
         after_block_number,
         before_block_number,
+        punk_bid_acceptances,
+    )
+    upsert_punk_snipes_for_blocks(
+        inspect_db_session, after_block_number, before_block_number, punk_snipes
+    )
+    upsert_nft_trades_for_blocks(
+        inspect_db_session, after_block_number, before_block_number, nft_trades
     )
 
-    logger.info("Done writing")
+
+def _stage_partitions(
+    inspect_db_session: orm.Session,
+    after_block_number: int,
+    before_block_number: int,
+    should_write_classified_traces: bool,
+) -> Dict[str, List[int]]:
+    """
+    Creates staging tables for the partitions the range fully covers.
+    Returns the staged partition starts of each table
+    """
+    staged_partition_starts: Dict[str, List[int]] = {}
+
+    with atomic_write(inspect_db_session):
+        create_partitions_for_blocks(
+            inspect_db_session, after_block_number, before_block_number
+        )
+
+        for table_name in PARTITIONED_TABLES:
+            if table_name == "classified_traces" and not should_write_classified_traces:
+                continue
+
+            partition_starts = get_stageable_partition_starts(
+                inspect_db_session,
+                table_name,
+                after_block_number,
+                before_block_number,
+            )
+
+            for partition_start in partition_starts:
+                create_staging_table(inspect_db_session, table_name, partition_start)
+
+            if len(partition_starts) > 0:
+                staged_partition_starts[table_name] = partition_starts
+
+    return staged_partition_starts
+
+
+def _swap_staged_partition(
+    inspect_db_session: orm.Session,
+    partition_start: int,
+    staged_table_names: Collection[str],
+) -> None:
+    with atomic_write(inspect_db_session):
+        for table_name in staged_table_names:
+            logger.info(f"Swapping in {table_name} from block {partition_start}")
+            swap_staging_table(inspect_db_session, table_name, partition_start)
+
+        update_summary_for_block_range(
+            inspect_db_session,
+            partition_start,
+            partition_start + PARTITION_SIZE,
+        )
+
+
+def _get_write_batches(
+    after_block_number: int,
+    before_block_number: int,
+    write_batch_size: int,
+    split_block_numbers: Collection[int] = (),
+) -> List[Tuple[int, int]]:
+    """
+    Splits the range into batches of at most write_batch_size blocks,
+    with no batch crossing any of split_block_numbers
+    """
+    boundaries = sorted(
+        {after_block_number, before_block_number}
+        | {
+            block_number
+            for block_number in split_block_numbers
+            if after_block_number < block_number < before_block_number
+        }
+    )
+
+    batches = []
+
+    for section_after_block, section_before_block in zip(boundaries, boundaries[1:]):
+        for batch_after_block in range(
+            section_after_block, section_before_block, write_batch_size
+        ):
+            batches.append(
+                (
+                    batch_after_block,
+                    min(batch_after_block + write_batch_size, section_before_block),
+                )
+            )
+
+    return batches
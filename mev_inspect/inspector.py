@@ -1,4 +1,3 @@
-import asyncio
 import logging
 import traceback
 from asyncio import CancelledError
@@ -9,11 +8,21 @@ from web3 import Web3
 from web3.eth import AsyncEth
 
 from mev_inspect.block import create_from_block_number
+from mev_inspect.block_archive import BlockArchive
 from mev_inspect.classifiers.trace import TraceClassifier
-from mev_inspect.inspect_block import inspect_block, inspect_many_blocks
+from mev_inspect.inspect_block import (
+    get_inspect_process_pool,
+    inspect_block,
+    inspect_many_blocks,
+)
 from mev_inspect.methods import get_block_receipts, trace_block
+from mev_inspect.price_oracle import PriceOracle
 from mev_inspect.provider import get_base_provider
-from mev_inspect.utils import RPCType
+from mev_inspect.rpc_cache import RPCCache
+from mev_inspect.rpc_limiter import AdaptiveRPCLimiter
+from mev_inspect.rpc_session import CONNECTIONS_PER_BLOCK, RPCSession
+from mev_inspect.sandwiches import SandwichWindow
+from mev_inspect.utils import RPCType, WriteMode
 
 logger = logging.getLogger(__name__)
 
@@ -33,25 +42,66 @@ class MEVInspector:
         type: RPCType = RPCType.parity,
         max_concurrency: int = 1,
         request_timeout: int = 10,
+        lazy_decode: bool = False,
+        inspect_concurrency: int = 1,
+        inspect_processes: Optional[int] = None,
+        write_mode: WriteMode = WriteMode.replace,
+        price_oracle: Optional[PriceOracle] = None,
+        block_archive: Optional[BlockArchive] = None,
+        sandwich_window: Optional[SandwichWindow] = None,
+        adaptive_concurrency: bool = False,
+        rpc_cache: Optional[RPCCache] = None,
     ):
         self.inspect_db_session = inspect_db_session
         self.trace_db_session = trace_db_session
         self.base_provider = get_base_provider(rpc, request_timeout, type)
         self.type = type
         self.w3 = Web3(self.base_provider, modules={"eth": (AsyncEth,)}, middlewares=[])
-        self.trace_classifier = TraceClassifier()
-        self.max_concurrency = asyncio.Semaphore(max_concurrency)
+        self.rpc_session = RPCSession(self.base_provider, max_concurrency)
+        self.trace_classifier = TraceClassifier(lazy_decode=lazy_decode)
+        self.max_concurrency = max_concurrency
+        self.inspect_concurrency = inspect_concurrency
+        self.inspect_process_pool = None
+        self.write_mode = write_mode
+        self.price_oracle = price_oracle
+        self.block_archive = block_archive
+        self.sandwich_window = sandwich_window
+        self.rpc_limiter: Optional[AdaptiveRPCLimiter] = None
+
+        if adaptive_concurrency:
+            # starts at one block's worth of requests, up to the pool size
+            self.rpc_limiter = AdaptiveRPCLimiter(
+                max_limit=max_concurrency * CONNECTIONS_PER_BLOCK,
+                initial_limit=CONNECTIONS_PER_BLOCK,
+            )
+            self.rpc_limiter.install(self.base_provider)
+
+        self.rpc_cache = rpc_cache
+
+        if rpc_cache is not None:
+            # around the limiter, so hits don't wait for it
+            rpc_cache.install(self.base_provider)
+
+        if inspect_processes is not None:
+            # keep every worker process busy
+            self.inspect_concurrency = max(inspect_concurrency, inspect_processes)
+            self.inspect_process_pool = get_inspect_process_pool(
+                inspect_processes, lazy_decode=lazy_decode
+            )
 
     async def create_from_block(
         self,
         trace_db_session: Optional[orm.Session],
         block_number: int,
     ):
+        await self.rpc_session.get_session()
         return await create_from_block_number(
+            base_provider=self.base_provider,
             w3=self.w3,
             type=self.type,
             block_number=block_number,
             trace_db_session=trace_db_session,
+            block_archive=self.block_archive,
         )
 
     async def inspect_single_block(
@@ -60,6 +110,7 @@ class MEVInspector:
         block: int,
         trace_db_session: Optional[orm.Session],
     ):
+        await self.rpc_session.get_session()
         return await inspect_block(
             inspect_db_session,
             self.base_provider,
@@ -68,6 +119,9 @@ class MEVInspector:
             self.trace_classifier,
             block,
             trace_db_session=trace_db_session,
+            price_oracle=self.price_oracle,
+            block_archive=self.block_archive,
+            sandwich_window=self.sandwich_window,
         )
 
     async def inspect_many_blocks(
@@ -77,47 +131,55 @@ class MEVInspector:
         after_block: int,
         before_block: int,
         block_batch_size: int = 10,
-    ):
-        tasks = []
-        for block_number in range(after_block, before_block, block_batch_size):
-            batch_after_block = block_number
-            batch_before_block = min(block_number + block_batch_size, before_block)
-
-            tasks.append(
-                asyncio.ensure_future(
-                    self.safe_inspect_many_blocks(
-                        inspect_db_session,
-                        trace_db_session,
-                        after_block_number=batch_after_block,
-                        before_block_number=batch_before_block,
-                    )
-                )
-            )
+    ) -> bool:
+        """
+        Returns whether the whole range was inspected, which it isn't if
+        cancelled part way
+        """
+        await self.rpc_session.get_session()
         logger.info(f"Gathered {before_block-after_block} blocks to inspect")
         try:
-            await asyncio.gather(*tasks)
-        except CancelledError:
-            logger.info("Requested to exit, cleaning up...")
-        except Exception as e:
-            logger.error(f"Exited due to {type(e)}")
-            traceback.print_exc()
-            raise
-
-    async def safe_inspect_many_blocks(
-        self,
-        inspect_db_session: orm.Session,
-        trace_db_session: Optional[orm.Session],
-        after_block_number: int,
-        before_block_number: int,
-    ):
-        async with self.max_concurrency:
-            return await inspect_many_blocks(
+            await inspect_many_blocks(
                 inspect_db_session,
                 self.base_provider,
                 self.w3,
                 self.type,
                 self.trace_classifier,
-                after_block_number,
-                before_block_number,
+                after_block,
+                before_block,
                 trace_db_session=trace_db_session,
+                fetch_concurrency=self.max_concurrency,
+                inspect_concurrency=self.inspect_concurrency,
+                write_batch_size=block_batch_size,
+                inspect_process_pool=self.inspect_process_pool,
+                write_mode=self.write_mode,
+                price_oracle=self.price_oracle,
+                block_archive=self.block_archive,
+                sandwich_window=self.sandwich_window,
             )
+        except CancelledError:
+            logger.info("Requested to exit, cleaning up...")
+            return False
+        except Exception as e:
+            logger.error(f"Exited due to {type(e)}")
+            traceback.print_exc()
+            raise
+        finally:
+            logger.info(f"RPC pool: {self.rpc_session.get_pool_metrics()}")
+
+            if self.rpc_limiter is not None:
+                logger.info(f"RPC limiter: {self.rpc_limiter.get_metrics()}")
+
+            if self.rpc_cache is not None:
+                logger.info(f"RPC cache: {self.rpc_cache.get_metrics()}")
+
+        return True
+
+    async def close(self):
+        await self.rpc_session.close()
+
+        if self.inspect_process_pool is not None:
+            self.inspect_process_pool.shutdown()
+
+        if self.block_archive is not None:
+            self.block_archive.close()
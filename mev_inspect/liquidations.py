@@ -1,12 +1,12 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from mev_inspect.classifiers.specs import get_classifier
 from mev_inspect.schemas.classifiers import LiquidationClassifier
 from mev_inspect.schemas.liquidations import Liquidation
 from mev_inspect.schemas.traces import Classification, ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
-from mev_inspect.traces import get_child_traces, is_child_trace_address
-from mev_inspect.transfers import get_child_transfers
+from mev_inspect.trace_tree import TraceTree
+from mev_inspect.traces import get_traces_by_transaction_hash, is_child_trace_address
 
 
 def has_liquidations(classified_traces: List[ClassifiedTrace]) -> bool:
@@ -22,6 +22,9 @@ def get_liquidations(classified_traces: List[ClassifiedTrace]) -> List[Liquidati
     liquidations: List[Liquidation] = []
     parent_liquidations: List[DecodedCallTrace] = []
 
+    traces_by_transaction_hash = get_traces_by_transaction_hash(classified_traces)
+    trace_trees: Dict[str, TraceTree] = {}
+
     for trace in classified_traces:
 
         if not isinstance(trace, DecodedCallTrace):
@@ -33,12 +36,15 @@ def get_liquidations(classified_traces: List[ClassifiedTrace]) -> List[Liquidati
         if trace.classification == Classification.liquidate:
 
             parent_liquidations.append(trace)
-            child_traces = get_child_traces(
-                trace.transaction_hash, trace.trace_address, classified_traces
-            )
-            child_transfers = get_child_transfers(
-                trace.transaction_hash, trace.trace_address, child_traces
-            )
+
+            if trace.transaction_hash not in trace_trees:
+                trace_trees[trace.transaction_hash] = TraceTree(
+                    traces_by_transaction_hash[trace.transaction_hash]
+                )
+
+            trace_tree = trace_trees[trace.transaction_hash]
+            child_traces = trace_tree.get_child_traces(trace)
+            child_transfers = trace_tree.get_child_transfers(trace)
             liquidation = _parse_liquidation(trace, child_traces, child_transfers)
 
             if liquidation is not None:
@@ -53,6 +53,7 @@ def get_miner_payments(
                 coinbase_transfer=coinbase_transfer,
                 transaction_to_address=first_trace.to_address,
                 transaction_from_address=first_trace.from_address,
+                error=first_trace.error,
             )
         )
 
@@ -17,3 +17,4 @@ class MinerPaymentModel(Base):
     gas_used = Column(Numeric, nullable=False)
     transaction_from_address = Column(String, nullable=True)
     transaction_to_address = Column(String, nullable=True)
+    error = Column(String, nullable=True)
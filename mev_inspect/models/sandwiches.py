@@ -10,8 +10,10 @@ class SandwichModel(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
     block_number = Column(Numeric, nullable=False)
     sandwicher_address = Column(String(256), nullable=False)
+    frontrun_swap_block_number = Column(Numeric, nullable=False)
     frontrun_swap_transaction_hash = Column(String(256), nullable=False)
     frontrun_swap_trace_address = Column(ARRAY(Integer), nullable=False)
+    backrun_swap_block_number = Column(Numeric, nullable=False)
     backrun_swap_transaction_hash = Column(String(256), nullable=False)
     backrun_swap_trace_address = Column(ARRAY(Integer), nullable=False)
     profit_token_address = Column(String(256), nullable=False)
@@ -5,11 +5,9 @@ from mev_inspect.schemas.classifiers import NftTradeClassifier
 from mev_inspect.schemas.nft_trades import NftTrade
 from mev_inspect.schemas.traces import Classification, ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
+from mev_inspect.trace_tree import TraceTree
 from mev_inspect.traces import get_traces_by_transaction_hash
-from mev_inspect.transfers import (
-    get_child_transfers,
-    remove_child_transfers_of_transfers,
-)
+from mev_inspect.transfers import remove_child_transfers_of_transfers
 
 
 def get_nft_trades(traces: List[ClassifiedTrace]) -> List[NftTrade]:
@@ -24,23 +22,20 @@ def get_nft_trades(traces: List[ClassifiedTrace]) -> List[NftTrade]:
 def _get_nft_trades_for_transaction(
     traces: List[ClassifiedTrace],
 ) -> List[NftTrade]:
-    ordered_traces = list(sorted(traces, key=lambda t: t.trace_address))
+    trace_tree = TraceTree(traces)
 
     nft_trades: List[NftTrade] = []
 
-    for trace in ordered_traces:
+    for trace in trace_tree.traces:
         if not isinstance(trace, DecodedCallTrace):
             continue
 
         elif trace.classification == Classification.nft_trade:
-            child_transfers = get_child_transfers(
-                trace.transaction_hash,
-                trace.trace_address,
-                traces,
-            )
             nft_trade = _parse_trade(
                 trace,
-                remove_child_transfers_of_transfers(child_transfers),
+                remove_child_transfers_of_transfers(
+                    trace_tree.get_child_transfers(trace)
+                ),
             )
 
             if nft_trade is not None:
@@ -0,0 +1,145 @@
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Optional
+
+from mev_inspect.crud.prices import get_latest_price_timestamps, get_prices
+from mev_inspect.crud.tokens import get_token_decimals
+from mev_inspect.schemas.arbitrages import Arbitrage
+from mev_inspect.schemas.liquidations import Liquidation
+from mev_inspect.schemas.miner_payments import MinerPayment
+from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS
+
+ETH_DECIMALS = 18
+
+
+class PriceOracle:
+    """
+    USD prices from the prices table, held in memory
+
+    Each token's prices are kept in two parallel arrays sorted by
+    timestamp, so the price at a time is a binary search. Timestamps are
+    unix seconds, like Block.block_timestamp, from the UTC times stored.
+    Values match the ones computed for mev_summary, with None where a
+    price or token is unknown
+    """
+
+    def __init__(self) -> None:
+        self._timestamps_by_token: Dict[str, array] = {}
+        self._prices_by_token: Dict[str, array] = {}
+        self._decimals_by_token: Dict[str, int] = {}
+        self._latest_timestamps: Dict[str, datetime] = {}
+
+    def refresh(self, db_session) -> int:
+        """
+        Loads each token's prices stored after its latest one loaded, or
+        all of them for tokens new to it. Token decimals are loaded again
+        when there are new tokens. Returns how many prices were added
+        """
+        latest_timestamps = get_latest_price_timestamps(db_session)
+
+        if len(self._latest_timestamps) == 0 or any(
+            token_address not in self._latest_timestamps
+            for token_address in latest_timestamps
+        ):
+            self._decimals_by_token = get_token_decimals(db_session)
+
+        n_added = 0
+
+        for token_address, latest_timestamp in latest_timestamps.items():
+            loaded_timestamp = self._latest_timestamps.get(token_address)
+
+            if loaded_timestamp is not None and latest_timestamp <= loaded_timestamp:
+                continue
+
+            # in timestamp order, including any stored since the latest
+            for _, timestamp, usd_price in get_prices(
+                db_session, after=loaded_timestamp, token_address=token_address
+            ):
+                self._add_price(token_address, timestamp, usd_price)
+                self._latest_timestamps[token_address] = timestamp
+                n_added += 1
+
+        return n_added
+
+    def _add_price(
+        self, token_address: str, timestamp: datetime, usd_price: Decimal
+    ) -> None:
+        self._timestamps_by_token.setdefault(token_address, array("d")).append(
+            timestamp.replace(tzinfo=timezone.utc).timestamp()
+        )
+        self._prices_by_token.setdefault(token_address, array("d")).append(
+            float(usd_price)
+        )
+
+    def get_price(self, token_address: str, timestamp: int) -> Optional[float]:
+        """
+        Latest price of the token at or before timestamp
+        """
+        token_address = token_address.lower()
+        timestamps = self._timestamps_by_token.get(token_address)
+
+        if timestamps is None:
+            return None
+
+        index = bisect_right(timestamps, timestamp)
+
+        if index == 0:
+            return None
+
+        return self._prices_by_token[token_address][index - 1]
+
+    def get_usd_value(
+        self, token_address: str, amount: int, timestamp: int
+    ) -> Optional[float]:
+        price = self.get_price(token_address, timestamp)
+        decimals = self._decimals_by_token.get(token_address.lower())
+
+        if price is None or decimals is None:
+            return None
+
+        return price * amount / 10**decimals
+
+    def get_arbitrage_profit_usd(
+        self, arbitrage: Arbitrage, timestamp: int
+    ) -> Optional[float]:
+        return self.get_usd_value(
+            arbitrage.profit_token_address, arbitrage.profit_amount, timestamp
+        )
+
+    def get_liquidation_profit_usd(
+        self, liquidation: Liquidation, timestamp: int
+    ) -> Optional[float]:
+        if liquidation.received_token_address is None:
+            return None
+
+        received_usd = self.get_usd_value(
+            liquidation.received_token_address,
+            liquidation.received_amount,
+            timestamp,
+        )
+        debt_usd = self.get_usd_value(
+            liquidation.debt_token_address,
+            liquidation.debt_purchase_amount,
+            timestamp,
+        )
+
+        if received_usd is None or debt_usd is None:
+            return None
+
+        return received_usd - debt_usd
+
+    def get_miner_payment_usd(
+        self, miner_payment: MinerPayment, timestamp: int
+    ) -> Optional[float]:
+        eth_price = self.get_price(ETH_TOKEN_ADDRESS, timestamp)
+
+        if eth_price is None:
+            return None
+
+        total_payment = (
+            miner_payment.gas_used * miner_payment.gas_price
+            + miner_payment.coinbase_transfer
+        )
+        return eth_price * total_payment / 10**ETH_DECIMALS
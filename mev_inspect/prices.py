@@ -1,22 +1,46 @@
-from datetime import datetime
-from typing import List
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
 from pycoingecko import CoinGeckoAPI
 
 from mev_inspect.schemas.prices import COINGECKO_ID_BY_ADDRESS, TOKEN_ADDRESSES, Price
 
 
-def fetch_prices() -> List[Price]:
+def fetch_prices(
+    latest_timestamps: Optional[Dict[str, datetime]] = None,
+) -> List[Price]:
+    """
+    Fetches the full daily history of each token, or just what's new for
+    tokens in latest_timestamps
+
+    Timestamps, here and on the prices returned, are naive UTC, as they're
+    stored
+    """
     coingecko_api = CoinGeckoAPI()
     prices = []
 
+    if latest_timestamps is None:
+        latest_timestamps = {}
+
     for token_address in TOKEN_ADDRESSES:
-        coingecko_price_data = coingecko_api.get_coin_market_chart_by_id(
-            id=COINGECKO_ID_BY_ADDRESS[token_address],
-            vs_currency="usd",
-            days="max",
-            interval="daily",
-        )
+        coingecko_id = COINGECKO_ID_BY_ADDRESS[token_address]
+        latest_timestamp = latest_timestamps.get(token_address.lower())
+
+        if latest_timestamp is None:
+            coingecko_price_data = coingecko_api.get_coin_market_chart_by_id(
+                id=coingecko_id,
+                vs_currency="usd",
+                days="max",
+                interval="daily",
+            )
+        else:
+            coingecko_price_data = coingecko_api.get_coin_market_chart_range_by_id(
+                coingecko_id,
+                "usd",
+                _get_unix_timestamp(latest_timestamp),
+                _get_unix_timestamp(datetime.utcnow()),
+            )
+
         prices += _build_token_prices(coingecko_price_data, token_address)
 
     return prices
@@ -25,8 +49,8 @@ def fetch_prices() -> List[Price]:
 def fetch_prices_range(after: datetime, before: datetime) -> List[Price]:
     coingecko_api = CoinGeckoAPI()
     prices = []
-    after_unix = int(after.timestamp())
-    before_unix = int(before.timestamp())
+    after_unix = _get_unix_timestamp(after)
+    before_unix = _get_unix_timestamp(before)
 
     for token_address in TOKEN_ADDRESSES:
         coingecko_price_data = coingecko_api.get_coin_market_chart_range_by_id(
@@ -42,7 +66,7 @@ def _build_token_prices(coingecko_price_data, token_address) -> List[Price]:
     time_series = coingecko_price_data["prices"]
     prices = []
     for entry in time_series:
-        timestamp = datetime.fromtimestamp(entry[0] / 1000)
+        timestamp = datetime.utcfromtimestamp(entry[0] / 1000)
         token_price = entry[1]
         prices.append(
             Price(
@@ -52,3 +76,7 @@ def _build_token_prices(coingecko_price_data, token_address) -> List[Price]:
             )
         )
     return prices
+
+
+def _get_unix_timestamp(timestamp: datetime) -> int:
+    return int(timestamp.replace(tzinfo=timezone.utc).timestamp())
@@ -1,9 +1,29 @@
+import asyncio
+import itertools
+import json
+import logging
+import random
+from typing import Any, List, Tuple
+
 from web3 import AsyncHTTPProvider, Web3
+from web3._utils.request import async_make_post_request
+from web3.types import RPCEndpoint, RPCResponse
 
-from mev_inspect.retry import http_retry_with_backoff_request_middleware
 from mev_inspect.geth_poa_middleware import geth_poa_middleware
+from mev_inspect.retry import (
+    HTTP_RETRY_EXCEPTIONS,
+    http_retry_with_backoff_request_middleware,
+)
+from mev_inspect.rpc_limiter import get_rpc_limiter
 from mev_inspect.utils import RPCType
 
+# requests sent in one JSON-RPC batch
+DEFAULT_BATCH_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+_batch_request_ids = itertools.count()
+
 
 def get_base_provider(
     rpc: str, request_timeout: int = 1000, type: RPCType = RPCType.parity
@@ -17,3 +37,95 @@ def get_base_provider(
     else:
         base_provider.middlewares += (http_retry_with_backoff_request_middleware,)
     return base_provider
+
+
+async def make_batch_request(
+    base_provider: AsyncHTTPProvider,
+    requests: List[Tuple[RPCEndpoint, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    retries: int = 5,
+    backoff_time_seconds: float = 0.1,
+) -> List[RPCResponse]:
+    """
+    Sends (method, params) requests as JSON-RPC batches of up to batch_size,
+    returning responses in the same order as the requests
+
+    Batches skip the provider's middlewares, so they're retried here
+    """
+    batches = [
+        requests[start : start + batch_size]
+        for start in range(0, len(requests), batch_size)
+    ]
+    responses = await asyncio.gather(
+        *(
+            _make_batch_request_with_retries(
+                base_provider, batch, retries, backoff_time_seconds
+            )
+            for batch in batches
+        )
+    )
+
+    return [response for batch_responses in responses for response in batch_responses]
+
+
+async def _make_batch_request_with_retries(
+    base_provider: AsyncHTTPProvider,
+    batch: List[Tuple[RPCEndpoint, Any]],
+    retries: int,
+    backoff_time_seconds: float,
+) -> List[RPCResponse]:
+    rpc_limiter = get_rpc_limiter(base_provider)
+
+    for i in range(retries):
+        try:
+            if rpc_limiter is None:
+                return await _make_batch_request(base_provider, batch)
+
+            return await rpc_limiter.run(
+                lambda: _make_batch_request(base_provider, batch)
+            )
+        except HTTP_RETRY_EXCEPTIONS:
+            logger.error(
+                f"Batch request of {len(batch)} requests failed, retrying: {i}/{retries}"
+            )
+            if i < (retries - 1):
+                await asyncio.sleep(backoff_time_seconds * (random.uniform(5, 10) ** i))
+            else:
+                raise
+
+    return []
+
+
+async def _make_batch_request(
+    base_provider: AsyncHTTPProvider,
+    batch: List[Tuple[RPCEndpoint, Any]],
+) -> List[RPCResponse]:
+    request_ids = [next(_batch_request_ids) for _ in batch]
+    request_data = json.dumps(
+        [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+            for request_id, (method, params) in zip(request_ids, batch)
+        ]
+    ).encode("utf-8")
+
+    raw_response = await async_make_post_request(
+        base_provider.endpoint_uri,
+        request_data,
+        **base_provider.get_request_kwargs(),
+    )
+    response_json = json.loads(raw_response)
+
+    if not isinstance(response_json, list):
+        # nodes without batch support answer with a single error
+        return [response_json for _ in batch]
+
+    # responses to a batch can come back in any order
+    responses_by_id = {response.get("id"): response for response in response_json}
+
+    return [
+        responses_by_id.get(
+            request_id,
+            {"id": request_id, "error": {"message": "Missing batch response"}},
+        )
+        for request_id in request_ids
+    ]
@@ -25,6 +25,10 @@ aiohttp_exceptions = (
     ServerTimeoutError,
 )
 
+HTTP_RETRY_EXCEPTIONS = (
+    request_exceptions + aiohttp_exceptions + (TimeoutError, ConnectionRefusedError)
+)
+
 whitelist_additions = ["eth_getBlockReceipts", "trace_block", "eth_feeHistory"]
 
 logger = logging.getLogger(__name__)
@@ -84,9 +88,5 @@ async def http_retry_with_backoff_request_middleware(
     return await exception_retry_with_backoff_middleware(
         make_request,
         web3,
-        (
-            request_exceptions
-            + aiohttp_exceptions
-            + (TimeoutError, ConnectionRefusedError)
-        ),
+        HTTP_RETRY_EXCEPTIONS,
     )
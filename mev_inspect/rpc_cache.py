@@ -0,0 +1,353 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from web3 import AsyncHTTPProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from mev_inspect.utils import hex_to_int
+
+MakeRequest = Callable[[RPCEndpoint, Any], Awaitable[RPCResponse]]
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# blocks this far behind the head are taken as final
+DEFAULT_REORG_DEPTH = 64
+
+# most blocks nodes return fee history for at once
+FEE_HISTORY_WINDOW = 1024
+
+# the head is fetched again after this long, at most
+HEAD_REFRESH_SECONDS = 12
+
+# results for a block hash never change
+BLOCK_HASH_METHODS = {"eth_getBlockByHash", "debug_traceBlockByHash"}
+
+# results for a block number change until it's final
+BLOCK_NUMBER_METHODS = {"eth_getBlockByNumber", "eth_getBlockReceipts", "trace_block"}
+
+
+@dataclass
+class CacheMetrics:
+    entries: int
+    bytes: int
+    hits: int
+    misses: int
+    coalesced: int
+
+
+class RPCCache:
+    """
+    Caches responses to requests for data that can't change, and joins
+    identical requests in flight
+
+    Data for a block is cached once it's reorg_depth blocks behind the
+    head, and data for a block hash is cached straight away. The head is
+    taken from requests for the latest block passing through, or fetched
+    when it's needed and out of date. The least recently used responses
+    are evicted past max_entries or max_bytes
+
+    Fee history for a single block is fetched for its whole window of
+    FEE_HISTORY_WINDOW blocks instead, so the blocks around it are
+    cached as well
+
+    Responses are shared between callers, so they mustn't be changed
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        reorg_depth: int = DEFAULT_REORG_DEPTH,
+        fee_history_window: int = FEE_HISTORY_WINDOW,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.reorg_depth = reorg_depth
+        self.fee_history_window = fee_history_window
+
+        self._responses: "OrderedDict[Tuple[str, str], Tuple[RPCResponse, int]]" = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+        self._head_block_number: Optional[int] = None
+        self._head_fetched_at: Optional[float] = None
+
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def install(self, base_provider: AsyncHTTPProvider) -> None:
+        """
+        Sends the provider's make_request requests through the cache.
+        Installed after a limiter, hits don't wait for it
+        """
+        make_request = base_provider.make_request
+
+        async def cached_make_request(method, params):
+            return await self.make_request(make_request, method, params)
+
+        base_provider.make_request = cached_make_request  # type: ignore
+
+    async def make_request(
+        self,
+        make_request: MakeRequest,
+        method: RPCEndpoint,
+        params: Any,
+    ) -> RPCResponse:
+        key = _get_key(method, params)
+        cached = self._get(key)
+
+        if cached is not None:
+            self._hits += 1
+            return cached
+
+        self._misses += 1
+
+        if method == "eth_feeHistory" and _is_single_block_fee_history(params):
+            response = await self._get_fee_history_from_window(make_request, params)
+
+            if response is not None:
+                return response
+
+        return await self._coalesce(
+            key, lambda: self._fetch(make_request, key, method, params)
+        )
+
+    def get_metrics(self) -> CacheMetrics:
+        return CacheMetrics(
+            entries=len(self._responses),
+            bytes=self._bytes,
+            hits=self._hits,
+            misses=self._misses,
+            coalesced=self._coalesced,
+        )
+
+    async def _coalesce(
+        self,
+        key: Tuple[str, str],
+        make_request: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(make_request())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._coalesced += 1
+
+        # one caller giving up doesn't cancel it for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        make_request: MakeRequest,
+        key: Tuple[str, str],
+        method: RPCEndpoint,
+        params: Any,
+    ) -> RPCResponse:
+        response = await make_request(method, params)
+        result = _get_result(response)
+
+        if result is None:
+            return response
+
+        if method == "eth_blockNumber":
+            self._set_head(hex_to_int(result))
+        elif method == "eth_getBlockByNumber" and params[0] == "latest":
+            self._set_head(hex_to_int(result["number"]))
+
+        if await self._is_final(make_request, method, params, result):
+            self._put(key, response)
+
+        return response
+
+    async def _is_final(
+        self,
+        make_request: MakeRequest,
+        method: RPCEndpoint,
+        params: Any,
+        result: Any,
+    ) -> bool:
+        if method in BLOCK_HASH_METHODS:
+            return True
+
+        block_number: Optional[int] = None
+
+        if method in BLOCK_NUMBER_METHODS:
+            block_number = _get_block_number(params[0])
+        elif method == "eth_feeHistory":
+            # newest block of the history
+            block_number = _get_block_number(params[1])
+        elif method == "eth_getTransactionReceipt":
+            block_number = _get_block_number(result.get("blockNumber"))
+
+        if block_number is None:
+            return False
+
+        return await self._is_finalized(make_request, block_number)
+
+    async def _is_finalized(self, make_request: MakeRequest, block_number: int) -> bool:
+        finalized_block_number = self._get_finalized_block_number()
+
+        is_head_stale = (
+            self._head_fetched_at is None
+            or time.monotonic() - self._head_fetched_at > HEAD_REFRESH_SECONDS
+        )
+
+        if is_head_stale and (
+            finalized_block_number is None or block_number > finalized_block_number
+        ):
+            await self.make_request(make_request, RPCEndpoint("eth_blockNumber"), [])
+            finalized_block_number = self._get_finalized_block_number()
+
+        return (
+            finalized_block_number is not None
+            and block_number <= finalized_block_number
+        )
+
+    def _get_finalized_block_number(self) -> Optional[int]:
+        if self._head_block_number is None:
+            return None
+
+        return self._head_block_number - self.reorg_depth
+
+    def _set_head(self, block_number: int) -> None:
+        if self._head_block_number is None or block_number > self._head_block_number:
+            self._head_block_number = block_number
+
+        self._head_fetched_at = time.monotonic()
+
+    async def _get_fee_history_from_window(
+        self,
+        make_request: MakeRequest,
+        params: List[Any],
+    ) -> Optional[RPCResponse]:
+        block_number = _get_block_number(params[1])
+        assert block_number is not None
+
+        if not await self._is_finalized(make_request, block_number):
+            return None
+
+        finalized_block_number = self._get_finalized_block_number()
+        assert finalized_block_number is not None
+
+        # aligned, so requests for blocks in the same window are joined
+        window_start = block_number - block_number % self.fee_history_window
+        window_end = min(
+            window_start + self.fee_history_window - 1, finalized_block_number
+        )
+        window_params = [hex(window_end - window_start + 1), hex(window_end)] + list(
+            params[2:]
+        )
+
+        await self._coalesce(
+            _get_key(RPCEndpoint("eth_feeHistory"), window_params),
+            lambda: self._fetch_fee_history_window(make_request, window_params),
+        )
+
+        # missing if the node returned fewer blocks
+        return self._get(_get_key(RPCEndpoint("eth_feeHistory"), params))
+
+    async def _fetch_fee_history_window(
+        self,
+        make_request: MakeRequest,
+        window_params: List[Any],
+    ) -> None:
+        response = await make_request(RPCEndpoint("eth_feeHistory"), window_params)
+        fee_history = _get_result(response)
+
+        if fee_history is None:
+            return
+
+        oldest_block_number = hex_to_int(fee_history["oldestBlock"])
+
+        for index, gas_used_ratio in enumerate(fee_history["gasUsedRatio"]):
+            block_number = oldest_block_number + index
+            block_fee_history = {
+                "oldestBlock": hex(block_number),
+                # each block's fee and the next block's, as for a single block
+                "baseFeePerGas": fee_history["baseFeePerGas"][index : index + 2],
+                "gasUsedRatio": [gas_used_ratio],
+            }
+
+            if "reward" in fee_history:
+                block_fee_history["reward"] = fee_history["reward"][index : index + 1]
+
+            self._put(
+                _get_key(
+                    RPCEndpoint("eth_feeHistory"),
+                    [hex(1), hex(block_number)] + list(window_params[2:]),
+                ),
+                {**response, "result": block_fee_history},
+            )
+
+    def _get(self, key: Tuple[str, str]) -> Optional[RPCResponse]:
+        entry = self._responses.get(key)
+
+        if entry is None:
+            return None
+
+        self._responses.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: Tuple[str, str], response: RPCResponse) -> None:
+        size = len(json.dumps(response, default=str))
+
+        if size > self.max_bytes:
+            return
+
+        previous_entry = self._responses.pop(key, None)
+
+        if previous_entry is not None:
+            self._bytes -= previous_entry[1]
+
+        self._responses[key] = (response, size)
+        self._bytes += size
+
+        while len(self._responses) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._responses.popitem(last=False)
+            self._bytes -= evicted_size
+
+
+def _get_key(method: RPCEndpoint, params: Any) -> Tuple[str, str]:
+    # block numbers are sent as ints or hex, so both are keyed as hex
+    normalized_params = [
+        hex(param) if isinstance(param, int) and not isinstance(param, bool) else param
+        for param in params
+    ]
+    return method, json.dumps(normalized_params, sort_keys=True, default=str)
+
+
+def _get_result(response: Optional[RPCResponse]) -> Any:
+    if response is None or "error" in response:
+        return None
+
+    return response.get("result")
+
+
+def _get_block_number(block_identifier: Any) -> Optional[int]:
+    if isinstance(block_identifier, int) and not isinstance(block_identifier, bool):
+        return block_identifier
+
+    if isinstance(block_identifier, str) and block_identifier.startswith("0x"):
+        return hex_to_int(block_identifier)
+
+    # a tag such as latest
+    return None
+
+
+def _is_single_block_fee_history(params: Any) -> bool:
+    return (
+        len(params) >= 2
+        and _get_block_number(params[0]) == 1
+        and _get_block_number(params[1]) is not None
+    )
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, List, Optional, TypeVar
+
+from aiohttp.client_exceptions import ClientResponseError, ServerDisconnectedError
+from web3 import AsyncHTTPProvider
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TOO_MANY_REQUESTS_STATUS = 429
+
+# share of the limit kept when the node is overloaded
+DECREASE_FACTOR = 0.5
+
+# how far p95 latency can rise over its baseline and still count as stable
+LATENCY_TOLERANCE = 1.5
+
+# weight of each round's p95 latency in the baseline
+BASELINE_WEIGHT = 0.1
+
+# fewest requests a round's p95 latency is taken from
+MIN_ROUND_SIZE = 20
+
+_limiters_by_provider: "weakref.WeakKeyDictionary[AsyncHTTPProvider, AdaptiveRPCLimiter]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@dataclass
+class LimiterMetrics:
+    limit: int
+    in_flight: int
+    waiting: int
+    p95_latency_seconds: Optional[float]
+    increases: int
+    decreases: int
+
+
+class AdaptiveRPCLimiter:
+    """
+    Limits the requests in flight to a node, adapting the limit to what
+    the node handles
+
+    The limit goes up by one after each round of requests whose p95
+    latency is within LATENCY_TOLERANCE of the baseline, and is cut by
+    DECREASE_FACTOR on timeouts, 429 responses and disconnects. A round is
+    as many requests as the limit. Requests in flight when the limit is
+    cut tend to fail together, so their failures only cut it once
+
+    Waiters are futures of whichever loop is running, so it can be used
+    from successive event loops like RPCSession
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        initial_limit: Optional[int] = None,
+        min_limit: int = 1,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self._limit = float(max_limit if initial_limit is None else initial_limit)
+
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # bumped on each cut, to tell requests started before it
+        self._epoch = 0
+        self._round_latencies: List[float] = []
+        self._baseline_latency: Optional[float] = None
+        self._p95_latency: Optional[float] = None
+
+        self._increases = 0
+        self._decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def install(self, base_provider: AsyncHTTPProvider) -> None:
+        """
+        Sends the provider's requests through the limiter, both with
+        make_request and as JSON-RPC batches
+        """
+        make_request = base_provider.make_request
+
+        async def limited_make_request(method, params):
+            return await self.run(lambda: make_request(method, params))
+
+        base_provider.make_request = limited_make_request  # type: ignore
+        _limiters_by_provider[base_provider] = self
+
+    async def run(self, make_request: Callable[[], Awaitable[T]]) -> T:
+        await self._acquire()
+
+        started_at = time.monotonic()
+        epoch = self._epoch
+
+        try:
+            result = await make_request()
+        except BaseException as e:
+            self._release()
+
+            if _is_overload(e) and epoch == self._epoch:
+                self._decrease()
+
+            raise
+
+        self._release()
+        self._record_latency(time.monotonic() - started_at)
+
+        return result
+
+    def get_metrics(self) -> LimiterMetrics:
+        return LimiterMetrics(
+            limit=self.limit,
+            in_flight=self._in_flight,
+            waiting=len(self._waiters),
+            p95_latency_seconds=self._p95_latency,
+            increases=self._increases,
+            decreases=self._decreases,
+        )
+
+    async def _acquire(self) -> None:
+        while self._in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    # woken already, so its turn goes to the next one
+                    self._wake_waiters()
+                raise
+
+        self._in_flight += 1
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        n_free = self.limit - self._in_flight
+
+        while n_free > 0 and len(self._waiters) > 0:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_result(None)
+                n_free -= 1
+
+    def _record_latency(self, latency: float) -> None:
+        self._round_latencies.append(latency)
+
+        if len(self._round_latencies) < max(self.limit, MIN_ROUND_SIZE):
+            return
+
+        self._p95_latency = _get_p95(self._round_latencies)
+        self._round_latencies = []
+
+        if self._baseline_latency is None:
+            self._baseline_latency = self._p95_latency
+
+        if self._p95_latency <= self._baseline_latency * LATENCY_TOLERANCE:
+            self._set_limit(self._limit + 1)
+
+        self._baseline_latency += BASELINE_WEIGHT * (
+            self._p95_latency - self._baseline_latency
+        )
+
+    def _decrease(self) -> None:
+        self._epoch += 1
+        self._round_latencies = []
+        self._set_limit(self._limit * DECREASE_FACTOR)
+
+    def _set_limit(self, limit: float) -> None:
+        previous_limit = self.limit
+        self._limit = min(max(limit, self.min_limit), self.max_limit)
+
+        if self.limit > previous_limit:
+            self._increases += 1
+            logger.debug(f"RPC concurrency limit raised to {self.limit}")
+        elif self.limit < previous_limit:
+            self._decreases += 1
+            logger.info(f"RPC concurrency limit cut to {self.limit}")
+
+        self._wake_waiters()
+
+
+def get_rpc_limiter(base_provider: AsyncHTTPProvider) -> Optional[AdaptiveRPCLimiter]:
+    return _limiters_by_provider.get(base_provider)
+
+
+def _is_overload(error: BaseException) -> bool:
+    if isinstance(error, ClientResponseError):
+        return error.status == TOO_MANY_REQUESTS_STATUS
+
+    # aiohttp's timeouts are asyncio ones
+    return isinstance(error, (asyncio.TimeoutError, ServerDisconnectedError))
+
+
+def _get_p95(values: List[Any]) -> Any:
+    ordered_values = sorted(values)
+    return ordered_values[min(len(ordered_values) - 1, int(len(ordered_values) * 0.95))]
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import ClientSession, TCPConnector, TraceConfig
+from web3 import AsyncHTTPProvider
+
+logger = logging.getLogger(__name__)
+
+# parity blocks are fetched with 4 requests at once
+CONNECTIONS_PER_BLOCK = 4
+
+# long enough that idle connections survive between batches
+DEFAULT_KEEPALIVE_TIMEOUT_SECONDS = 60
+
+DEFAULT_DNS_CACHE_TTL_SECONDS = 300
+
+
+@dataclass
+class PoolMetrics:
+    limit: int
+    open: int
+    idle: int
+    waiting: int
+    created: int
+    reused: int
+
+
+class RPCSession:
+    """
+    Owns the aiohttp session used for requests to an RPC endpoint
+
+    web3 caches one session per endpoint and thread, so installing ours
+    there means every provider for the endpoint reuses its connections,
+    including JSON-RPC batches. Sessions are bound to an event loop, so a
+    new one is made if the loop changes
+    """
+
+    def __init__(
+        self,
+        base_provider: AsyncHTTPProvider,
+        max_concurrency: int = 1,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT_SECONDS,
+        dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL_SECONDS,
+    ):
+        self.base_provider = base_provider
+        self.limit = max_concurrency * CONNECTIONS_PER_BLOCK
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+        self._session: Optional[ClientSession] = None
+        self._connector: Optional[TCPConnector] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._waiting = 0
+        self._created = 0
+        self._reused = 0
+
+    async def get_session(self) -> ClientSession:
+        loop = asyncio.get_running_loop()
+
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._connector = TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = ClientSession(
+                connector=self._connector,
+                raise_for_status=True,
+                trace_configs=[self._get_trace_config()],
+            )
+            self._loop = loop
+
+            await self.base_provider.cache_async_session(self._session)
+
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+        self._session = None
+        self._connector = None
+        self._loop = None
+
+    def get_pool_metrics(self) -> PoolMetrics:
+        in_use = 0
+        idle = 0
+
+        if self._connector is not None and not self._connector.closed:
+            # aiohttp has no public API for these
+            in_use = len(self._connector._acquired)  # pylint: disable=protected-access
+            idle = sum(
+                len(connections)
+                for connections in self._connector._conns.values()  # pylint: disable=protected-access
+            )
+
+        return PoolMetrics(
+            limit=self.limit,
+            open=in_use + idle,
+            idle=idle,
+            waiting=self._waiting,
+            created=self._created,
+            reused=self._reused,
+        )
+
+    def _get_trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+
+        async def on_queued_start(session, context, params):
+            self._waiting += 1
+
+        async def on_queued_end(session, context, params):
+            self._waiting -= 1
+
+        async def on_create_end(session, context, params):
+            self._created += 1
+
+        async def on_reuse(session, context, params):
+            self._reused += 1
+
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_create_end)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+
+        return trace_config
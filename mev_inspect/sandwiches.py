@@ -1,4 +1,6 @@
-from typing import List, Optional
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 from mev_inspect.schemas.sandwiches import Sandwich
 from mev_inspect.schemas.swaps import Swap
@@ -6,63 +8,265 @@ from mev_inspect.schemas.swaps import Swap
 UNISWAP_V2_ROUTER = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
 UNISWAP_V3_ROUTER = "0x68b3465833fb72a70ecdf485e0e4c7bd8665fc45"
 
+# blocks searched for sandwiches across blocks, which is enough for legs
+# in adjacent blocks
+DEFAULT_SANDWICH_WINDOW_SIZE = 2
+
+# contract address, token in address, token out address
+PoolDirection = Tuple[str, str, str]
+
+
+class _SwapIndex:
+    """
+    Positions of ordered swaps by pool and direction, and by sender for
+    swaps that could be a backrun
+
+    Swaps are numbered in the order they're added. The oldest can be
+    evicted, so it can hold a sliding window of blocks
+    """
+
+    def __init__(self) -> None:
+        self._swaps: List[Swap] = []
+        self._first_position = 0
+        self.positions_by_direction: Dict[PoolDirection, List[int]] = defaultdict(list)
+        self.positions_by_direction_and_sender: Dict[
+            Tuple[PoolDirection, str], List[int]
+        ] = defaultdict(list)
+
+    @property
+    def first_position(self) -> int:
+        return self._first_position
+
+    @property
+    def end_position(self) -> int:
+        return self._first_position + len(self._swaps)
+
+    def get_swap(self, position: int) -> Swap:
+        return self._swaps[position - self._first_position]
+
+    def add_swaps(self, ordered_swaps: List[Swap]) -> None:
+        for position, swap in enumerate(ordered_swaps, start=self.end_position):
+            direction = _get_pool_direction(swap)
+            self.positions_by_direction[direction].append(position)
+            self.positions_by_direction_and_sender[
+                (direction, swap.from_address)
+            ].append(position)
+
+        self._swaps.extend(ordered_swaps)
+
+    def evict_swaps(self, before_position: int) -> None:
+        n_evicted = before_position - self._first_position
+
+        if n_evicted <= 0:
+            return
+
+        for swap in self._swaps[:n_evicted]:
+            direction = _get_pool_direction(swap)
+            _evict_positions(self.positions_by_direction, direction, before_position)
+            _evict_positions(
+                self.positions_by_direction_and_sender,
+                (direction, swap.from_address),
+                before_position,
+            )
+
+        del self._swaps[:n_evicted]
+        self._first_position = before_position
+
+
+class SandwichWindow:
+    """
+    Finds sandwiches whose legs are in different blocks, from the swaps
+    of the last window_size blocks
+
+    Blocks are added in order, and each add returns the sandwiches whose
+    backrun is in the added block and frontrun is in an earlier one. The
+    ones within a block are left to get_sandwiches. These are recorded at
+    the block of their backrun, where they're found, so rewriting a range
+    of blocks replaces them
+
+    Only swaps are kept, and blocks that fall out of the window are
+    evicted, so memory is bounded by the window size. A block at or before
+    the latest one added starts a new window
+    """
+
+    def __init__(self, window_size: int = DEFAULT_SANDWICH_WINDOW_SIZE):
+        if window_size < 1:
+            raise ValueError("Sandwich window must be at least one block")
+
+        self.window_size = window_size
+        self._swap_index = _SwapIndex()
+        # block number and first swap position of each block in the window
+        self._block_starts: Deque[Tuple[int, int]] = deque()
+
+    def add_block(self, block_number: int, swaps: List[Swap]) -> List[Sandwich]:
+        if len(self._block_starts) > 0 and block_number <= self._block_starts[-1][0]:
+            self._swap_index = _SwapIndex()
+            self._block_starts.clear()
+
+        while (
+            len(self._block_starts) > 0
+            and self._block_starts[0][0] <= block_number - self.window_size
+        ):
+            self._block_starts.popleft()
+            self._swap_index.evict_swaps(
+                self._block_starts[0][1]
+                if len(self._block_starts) > 0
+                else self._swap_index.end_position
+            )
+
+        block_start = self._swap_index.end_position
+        self._block_starts.append((block_number, block_start))
+        self._swap_index.add_swaps(_order_swaps(swaps))
+
+        sandwiches = []
+
+        for front_position in range(self._swap_index.first_position, block_start):
+            if not self._has_backrun_in_block(front_position, block_start):
+                continue
+
+            sandwich = _get_sandwich_starting_with_swap(
+                front_position, self._swap_index
+            )
+
+            if (
+                sandwich is not None
+                and sandwich.backrun_swap.block_number == block_number
+            ):
+                sandwiches.append(sandwich.copy(update={"block_number": block_number}))
+
+        return sandwiches
+
+    def _has_backrun_in_block(self, front_position: int, block_start: int) -> bool:
+        front_swap = self._swap_index.get_swap(front_position)
+        backrun_positions = self._swap_index.positions_by_direction_and_sender.get(
+            (_get_reverse_pool_direction(front_swap), front_swap.to_address)
+        )
+
+        return backrun_positions is not None and backrun_positions[-1] >= block_start
+
 
 def get_sandwiches(swaps: List[Swap]) -> List[Sandwich]:
-    ordered_swaps = list(
+    swap_index = _SwapIndex()
+    swap_index.add_swaps(_order_swaps(swaps))
+
+    sandwiches: List[Sandwich] = []
+
+    for position in range(swap_index.end_position):
+        sandwich = _get_sandwich_starting_with_swap(position, swap_index)
+
+        if sandwich is not None:
+            sandwiches.append(sandwich)
+
+    return sandwiches
+
+
+def _order_swaps(swaps: List[Swap]) -> List[Swap]:
+    return list(
         sorted(
             swaps,
             key=lambda swap: (swap.transaction_position, swap.trace_address),
         )
     )
 
-    sandwiches: List[Sandwich] = []
 
-    for index, swap in enumerate(ordered_swaps):
-        rest_swaps = ordered_swaps[index + 1 :]
-        sandwich = _get_sandwich_starting_with_swap(swap, rest_swaps)
+def _evict_positions(
+    positions_by_key: Dict[Any, List[int]],
+    key: Any,
+    before_position: int,
+) -> None:
+    positions = positions_by_key.get(key)
 
-        if sandwich is not None:
-            sandwiches.append(sandwich)
+    if positions is None:
+        return
 
-    return sandwiches
+    del positions[: bisect_left(positions, before_position)]
+
+    if len(positions) == 0:
+        del positions_by_key[key]
 
 
 def _get_sandwich_starting_with_swap(
-    front_swap: Swap,
-    rest_swaps: List[Swap],
+    front_position: int,
+    swap_index: _SwapIndex,
 ) -> Optional[Sandwich]:
+    """
+    Finds the first swap after the front swap in the same pool and
+    direction from someone else, the victim, then the first swap after it
+    in the opposite direction from the sandwicher, the backrun. Swaps in
+    the front swap's transaction are ignored. Every swap from someone
+    else in the front swap's direction before the backrun is sandwiched
+    """
+    front_swap = swap_index.get_swap(front_position)
     sandwicher_address = front_swap.to_address
-    sandwiched_swaps = []
 
     if sandwicher_address in [UNISWAP_V2_ROUTER, UNISWAP_V3_ROUTER]:
         return None
 
-    for other_swap in rest_swaps:
-        if other_swap.transaction_hash == front_swap.transaction_hash:
-            continue
+    # lookups don't add keys, so a window's index only holds its swaps
+    direction_positions = swap_index.positions_by_direction.get(
+        _get_pool_direction(front_swap), []
+    )
+    first_index = bisect_right(direction_positions, front_position)
 
-        if other_swap.contract_address == front_swap.contract_address:
-            if (
-                other_swap.token_in_address == front_swap.token_in_address
-                and other_swap.token_out_address == front_swap.token_out_address
-                and other_swap.from_address != sandwicher_address
-            ):
-                sandwiched_swaps.append(other_swap)
-            elif (
-                other_swap.token_out_address == front_swap.token_in_address
-                and other_swap.token_in_address == front_swap.token_out_address
-                and other_swap.from_address == sandwicher_address
-            ):
-                if len(sandwiched_swaps) > 0:
-                    return Sandwich(
-                        block_number=front_swap.block_number,
-                        sandwicher_address=sandwicher_address,
-                        frontrun_swap=front_swap,
-                        backrun_swap=other_swap,
-                        sandwiched_swaps=sandwiched_swaps,
-                        profit_token_address=front_swap.token_in_address,
-                        profit_amount=other_swap.token_out_amount
-                        - front_swap.token_in_amount,
-                    )
-
-    return None
+    sandwiched_positions = (
+        position
+        for position in direction_positions[first_index:]
+        if _is_sandwiched(swap_index.get_swap(position), front_swap)
+    )
+    first_sandwiched_position = next(sandwiched_positions, None)
+
+    if first_sandwiched_position is None:
+        return None
+
+    backrun_positions = swap_index.positions_by_direction_and_sender.get(
+        (_get_reverse_pool_direction(front_swap), sandwicher_address), []
+    )
+    backrun_position = next(
+        (
+            position
+            for position in backrun_positions[
+                bisect_right(backrun_positions, first_sandwiched_position) :
+            ]
+            if swap_index.get_swap(position).transaction_hash
+            != front_swap.transaction_hash
+        ),
+        None,
+    )
+
+    if backrun_position is None:
+        return None
+
+    sandwiched_swaps = [swap_index.get_swap(first_sandwiched_position)]
+
+    for position in sandwiched_positions:
+        if position > backrun_position:
+            break
+
+        sandwiched_swaps.append(swap_index.get_swap(position))
+
+    backrun_swap = swap_index.get_swap(backrun_position)
+
+    return Sandwich(
+        block_number=front_swap.block_number,
+        sandwicher_address=sandwicher_address,
+        frontrun_swap=front_swap,
+        backrun_swap=backrun_swap,
+        sandwiched_swaps=sandwiched_swaps,
+        profit_token_address=front_swap.token_in_address,
+        profit_amount=backrun_swap.token_out_amount - front_swap.token_in_amount,
+    )
+
+
+def _is_sandwiched(swap: Swap, front_swap: Swap) -> bool:
+    return (
+        swap.transaction_hash != front_swap.transaction_hash
+        and swap.from_address != front_swap.to_address
+    )
+
+
+def _get_pool_direction(swap: Swap) -> PoolDirection:
+    return (swap.contract_address, swap.token_in_address, swap.token_out_address)
+
+
+def _get_reverse_pool_direction(swap: Swap) -> PoolDirection:
+    return (swap.contract_address, swap.token_out_address, swap.token_in_address)
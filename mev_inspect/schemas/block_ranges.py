@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class BlockRangeStatus(Enum):
+    pending = "pending"
+    in_progress = "in_progress"
+    done = "done"
+    failed = "failed"
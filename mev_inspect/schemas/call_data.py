@@ -1,9 +1,104 @@
-from typing import Any, Dict
+import sys
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Union
 
+from eth_abi import decode_abi
+from eth_abi.exceptions import InsufficientDataBytes, NonEmptyPaddingBytes
+from hexbytes._utils import hexstr_to_bytes
 from pydantic import BaseModel
 
+DECODE_EXCEPTIONS = (InsufficientDataBytes, NonEmptyPaddingBytes, OverflowError)
+
+
+def intern_addresses(types: Sequence[str], values: Sequence[Any]) -> List[Any]:
+    """
+    Interns decoded address values, which eth_abi already lowercases, so
+    they're the same strings as addresses from traces
+    """
+    return [_intern_address_value(type_, value) for type_, value in zip(types, values)]
+
+
+def _intern_address_value(type_: str, value: Any) -> Any:
+    if type_ == "address" and isinstance(value, str):
+        return sys.intern(value)
+
+    if type_ == "address[]" and isinstance(value, tuple):
+        return tuple(
+            sys.intern(address) if isinstance(address, str) else address
+            for address in value
+        )
+
+    return value
+
+
+class LazyCallInputs(Mapping[str, Any]):
+    """
+    Function inputs that are only ABI decoded on first access
+
+    Undecodable call data resolves to empty inputs rather than raising,
+    since by then the trace has already been classified. is_undecodable
+    tells those apart from calls without inputs
+    """
+
+    def __init__(self, names: List[str], types: List[str], params: str):
+        self._names = names
+        self._types = types
+        self._params = params
+        self._inputs: Optional[Dict[str, Any]] = None
+        self._is_undecodable = False
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._inputs is not None
+
+    @property
+    def is_undecodable(self) -> bool:
+        self._get_inputs()
+        return self._is_undecodable
+
+    def _get_inputs(self) -> Dict[str, Any]:
+        if self._inputs is None:
+            try:
+                decoded = decode_abi(self._types, hexstr_to_bytes(self._params))
+                self._inputs = dict(
+                    zip(self._names, intern_addresses(self._types, decoded))
+                )
+            except DECODE_EXCEPTIONS:
+                self._inputs = {}
+                self._is_undecodable = True
+
+        return self._inputs
+
+    def __getitem__(self, key: str) -> Any:
+        return self._get_inputs()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._get_inputs())
+
+    def __len__(self) -> int:
+        return len(self._get_inputs())
+
+    def __repr__(self) -> str:
+        if self._inputs is None:
+            return f"LazyCallInputs({self._types})"
+
+        return repr(self._inputs)
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value):
+        if not isinstance(value, cls):
+            raise TypeError("LazyCallInputs required")
+
+        return value
+
+
+CallInputs = Union[LazyCallInputs, Dict[str, Any]]
+
 
 class CallData(BaseModel):
     function_name: str
     function_signature: str
-    inputs: Dict[str, Any]
+    inputs: CallInputs
@@ -15,3 +15,4 @@ class MinerPayment(BaseModel):
     gas_used: int
     transaction_to_address: Optional[str]
     transaction_from_address: Optional[str]
+    error: Optional[str]
@@ -1,8 +1,9 @@
+import sys
 from typing import Optional
 
 from pydantic import validator
 
-from mev_inspect.utils import hex_to_int
+from mev_inspect.utils import hex_to_int, normalize_address
 
 from .utils import CamelModel
 
@@ -28,3 +29,11 @@ class Receipt(CamelModel):
         if isinstance(v, str):
             return hex_to_int(v)
         return v
+
+    @validator("to")
+    def normalize_to(v):
+        return normalize_address(v)
+
+    @validator("transaction_hash")
+    def intern_transaction_hash(v):
+        return sys.intern(v)
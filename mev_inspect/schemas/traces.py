@@ -1,8 +1,21 @@
+import sys
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
+from pydantic import validator
+
+from mev_inspect.utils import hex_to_int, normalize_address
+
+from .call_data import CallInputs, LazyCallInputs
 from .utils import CamelModel
 
+# hex quantities in actions and results, parsed to ints once on ingestion
+ACTION_QUANTITY_KEYS = {"value", "gas", "balance"}
+RESULT_QUANTITY_KEYS = {"gasUsed"}
+
+ACTION_ADDRESS_KEYS = {"from", "to", "address", "refundAddress", "author"}
+RESULT_ADDRESS_KEYS = {"address"}
+
 
 class TraceType(Enum):
     call = "call"
@@ -26,6 +39,35 @@ class Trace(CamelModel):
     type: TraceType
     error: Optional[str]
 
+    @validator("action")
+    def normalize_action(cls, action: dict) -> dict:
+        return _normalize_fields(action, ACTION_QUANTITY_KEYS, ACTION_ADDRESS_KEYS)
+
+    @validator("result")
+    def normalize_result(cls, result: Optional[dict]) -> Optional[dict]:
+        if result is None:
+            return None
+
+        return _normalize_fields(result, RESULT_QUANTITY_KEYS, RESULT_ADDRESS_KEYS)
+
+    @validator("block_hash", "transaction_hash")
+    def intern_hash(cls, value: Optional[str]) -> Optional[str]:
+        return sys.intern(value) if value is not None else None
+
+
+def _normalize_fields(fields: dict, quantity_keys: set, address_keys: set) -> dict:
+    normalized = {}
+
+    for key, value in fields.items():
+        if key in quantity_keys and isinstance(value, str):
+            normalized[key] = hex_to_int(value)
+        elif key in address_keys and isinstance(value, str):
+            normalized[key] = normalize_address(value)
+        else:
+            normalized[key] = value
+
+    return normalized
+
 
 class Classification(Enum):
     unknown = "unknown"
@@ -75,6 +117,7 @@ class ClassifiedTrace(Trace):
             # a little lazy but fine for now
             # this is used for bytes value inputs
             bytes: lambda b: b.hex(),
+            LazyCallInputs: dict,
         }
 
 
@@ -84,7 +127,7 @@ class CallTrace(ClassifiedTrace):
 
 
 class DecodedCallTrace(CallTrace):
-    inputs: Dict[str, Any]
+    inputs: CallInputs
     abi_name: str
     protocol: Optional[Protocol]
     gas: Optional[int]
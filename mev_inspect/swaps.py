@@ -5,12 +5,9 @@ from mev_inspect.schemas.classifiers import SwapClassifier
 from mev_inspect.schemas.swaps import Swap
 from mev_inspect.schemas.traces import Classification, ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
+from mev_inspect.trace_tree import TraceTree
 from mev_inspect.traces import get_traces_by_transaction_hash
-from mev_inspect.transfers import (
-    get_child_transfers,
-    get_transfer,
-    remove_child_transfers_of_transfers,
-)
+from mev_inspect.transfers import remove_child_transfers_of_transfers
 
 
 def get_swaps(traces: List[ClassifiedTrace]) -> List[Swap]:
@@ -23,31 +20,23 @@ def get_swaps(traces: List[ClassifiedTrace]) -> List[Swap]:
 
 
 def _get_swaps_for_transaction(traces: List[ClassifiedTrace]) -> List[Swap]:
-    ordered_traces = list(sorted(traces, key=lambda t: t.trace_address))
+    trace_tree = TraceTree(traces)
 
     swaps: List[Swap] = []
-    prior_transfers: List[Transfer] = []
 
-    for trace in ordered_traces:
+    for trace in trace_tree.traces:
         if not isinstance(trace, DecodedCallTrace):
             continue
 
-        elif trace.classification == Classification.transfer:
-            transfer = get_transfer(trace)
-            if transfer is not None:
-                prior_transfers.append(transfer)
-
         elif trace.classification == Classification.swap:
-            child_transfers = get_child_transfers(
-                trace.transaction_hash,
-                trace.trace_address,
-                traces,
-            )
-
             swap = _parse_swap(
                 trace,
-                remove_child_transfers_of_transfers(prior_transfers),
-                remove_child_transfers_of_transfers(child_transfers),
+                remove_child_transfers_of_transfers(
+                    trace_tree.get_prior_transfers(trace)
+                ),
+                remove_child_transfers_of_transfers(
+                    trace_tree.get_child_transfers(trace)
+                ),
             )
 
             if swap is not None:
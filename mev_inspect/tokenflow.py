@@ -83,7 +83,7 @@ def get_net_gas_used(tx_hash, block):
     gas_used = 0
     for trace in block.traces:
         if trace.transaction_hash == tx_hash:
-            gas_used += int(trace.result["gasUsed"], 16)
+            gas_used += trace.result["gasUsed"]
 
     return gas_used
 
@@ -94,9 +94,7 @@ def get_ether_flows(tx_traces, addresses_to_check):
 
     for trace in tx_traces:
         if trace.type == TraceType.call:
-            value = int(
-                trace.action["value"], 16
-            )  # converting from 0x prefix to decimal
+            value = trace.action["value"]
             # ETH_GET
             if (
                 trace.action["callType"] != "delegatecall"
@@ -142,7 +140,7 @@ def get_ether_flows(tx_traces, addresses_to_check):
 
         if trace.type == TraceType.suicide:
             if trace.action["refundAddress"] in addresses_to_check:
-                refund_value = int("0x" + trace.action["balance"], 16)
+                refund_value = trace.action["balance"]
                 eth_inflow = eth_inflow + refund_value
 
     return [eth_inflow, eth_outflow]
@@ -153,8 +151,6 @@ def get_dollar_flows(tx_traces, addresses_to_check):
     dollar_outflow = 0
     for trace in tx_traces:
         if trace.type == TraceType.call and is_stablecoin_address(trace.action["to"]):
-            _ = int(trace.action["value"], 16)  # converting from 0x prefix to decimal
-
             # USD_GET1 & USD_GET2 (to account for both 'transfer' and 'transferFrom' methods)
             # USD_GIVE1 & USD_GIVE2
 
@@ -194,14 +190,13 @@ def run_tokenflow(tx_hash: str, block: Block):
     proxies = get_tx_proxies(tx_traces, to_address)
 
     for proxy in proxies:
-        addresses_to_check.append(proxy.lower())
+        addresses_to_check.append(proxy)
 
     # check if the 'to' field is a known aggregator/router
     # if not, add to relevant addresses to run TF on
     if not is_known_router_address(to_address):
-        addresses_to_check.append(
-            to_address.lower()
-        )  # traces need lowercase addresses to match
+        # receipt and trace addresses are both normalized to lowercase
+        addresses_to_check.append(to_address)
 
     ether_flows = get_ether_flows(tx_traces, addresses_to_check)
     dollar_flows = get_dollar_flows(tx_traces, addresses_to_check)
@@ -0,0 +1,94 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from mev_inspect.schemas.traces import Classification, ClassifiedTrace, DecodedCallTrace
+from mev_inspect.schemas.transfers import Transfer
+from mev_inspect.traces import is_child_trace_address
+from mev_inspect.transfers import get_transfer
+
+
+class TraceTree:
+    """
+    Traces of a single transaction, indexed by trace_address
+
+    Sorting by trace_address orders traces depth first, so the subtree
+    of a trace is the contiguous range of traces right after it. Ranges and
+    parent links are computed once here, so looking up children is
+    proportional to the size of the subtree rather than the transaction
+    """
+
+    def __init__(self, traces: List[ClassifiedTrace]):
+        self.traces = sorted(traces, key=lambda t: t.trace_address)
+
+        self._index_by_trace_address: Dict[Tuple[int, ...], int] = {}
+        self._parent_indexes: List[Optional[int]] = [None] * len(self.traces)
+        self._subtree_ends: List[int] = [len(self.traces)] * len(self.traces)
+
+        self._transfers_by_index: Dict[int, Optional[Transfer]] = {}
+        self._transfer_trace_indexes: List[int] = []
+
+        ancestor_indexes: List[int] = []
+
+        for index, trace in enumerate(self.traces):
+            while ancestor_indexes and not is_child_trace_address(
+                trace.trace_address,
+                self.traces[ancestor_indexes[-1]].trace_address,
+            ):
+                self._subtree_ends[ancestor_indexes.pop()] = index
+
+            if ancestor_indexes:
+                self._parent_indexes[index] = ancestor_indexes[-1]
+
+            ancestor_indexes.append(index)
+            self._index_by_trace_address[tuple(trace.trace_address)] = index
+
+            if (
+                isinstance(trace, DecodedCallTrace)
+                and trace.classification == Classification.transfer
+            ):
+                self._transfer_trace_indexes.append(index)
+
+    def get_parent(self, trace: ClassifiedTrace) -> Optional[ClassifiedTrace]:
+        parent_index = self._parent_indexes[self._get_index(trace)]
+        return self.traces[parent_index] if parent_index is not None else None
+
+    def get_child_traces(self, trace: ClassifiedTrace) -> List[ClassifiedTrace]:
+        index = self._get_index(trace)
+        return self.traces[index + 1 : self._subtree_ends[index]]
+
+    def get_child_transfers(self, trace: ClassifiedTrace) -> List[Transfer]:
+        index = self._get_index(trace)
+        child_transfers = []
+
+        for child_index in range(index + 1, self._subtree_ends[index]):
+            transfer = self._get_transfer(child_index)
+            if transfer is not None:
+                child_transfers.append(transfer)
+
+        return child_transfers
+
+    def get_prior_transfers(self, trace: ClassifiedTrace) -> List[Transfer]:
+        """
+        Transfers from traces classified as transfers that come before
+        this trace in the transaction
+        """
+        n_prior_transfer_traces = bisect_left(
+            self._transfer_trace_indexes, self._get_index(trace)
+        )
+        prior_transfers = []
+
+        for transfer_index in self._transfer_trace_indexes[:n_prior_transfer_traces]:
+            transfer = self._get_transfer(transfer_index)
+            if transfer is not None:
+                prior_transfers.append(transfer)
+
+        return prior_transfers
+
+    def _get_index(self, trace: ClassifiedTrace) -> int:
+        return self._index_by_trace_address[tuple(trace.trace_address)]
+
+    def _get_transfer(self, index: int) -> Optional[Transfer]:
+        if index not in self._transfers_by_index:
+            self._transfers_by_index[index] = get_transfer(self.traces[index])
+
+        return self._transfers_by_index[index]
@@ -1,11 +1,11 @@
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 from mev_inspect.classifiers.specs import get_classifier
 from mev_inspect.schemas.classifiers import TransferClassifier
 from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS
 from mev_inspect.schemas.traces import ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
-from mev_inspect.traces import get_child_traces, is_child_trace_address
+from mev_inspect.traces import get_child_traces
 
 
 def get_transfers(traces: List[ClassifiedTrace]) -> List[Transfer]:
@@ -106,23 +106,22 @@ def remove_child_transfers_of_transfers(
     transfers: List[Transfer],
 ) -> List[Transfer]:
     updated_transfers = []
-    transfer_addresses_by_transaction: Dict[str, List[List[int]]] = {}
+    transfer_addresses_by_transaction: Dict[str, Set[Tuple[int, ...]]] = {}
 
     sorted_transfers = sorted(transfers, key=lambda t: t.trace_address)
 
     for transfer in sorted_transfers:
-        existing_addresses = transfer_addresses_by_transaction.get(
-            transfer.transaction_hash, []
+        existing_addresses = transfer_addresses_by_transaction.setdefault(
+            transfer.transaction_hash, set()
         )
 
+        # a transfer is a child if any of its ancestors' addresses were seen
         if not any(
-            is_child_trace_address(transfer.trace_address, parent_address)
-            for parent_address in existing_addresses
+            tuple(transfer.trace_address[:ancestor_depth]) in existing_addresses
+            for ancestor_depth in range(len(transfer.trace_address))
         ):
             updated_transfers.append(transfer)
 
-        transfer_addresses_by_transaction[
-            transfer.transaction_hash
-        ] = existing_addresses + [transfer.trace_address]
+        existing_addresses.add(tuple(transfer.trace_address))
 
     return updated_transfers
@@ -1,4 +1,7 @@
+import sys
 from enum import Enum
+from typing import Optional
+
 from hexbytes._utils import hexstr_to_bytes
 
 
@@ -7,13 +10,39 @@ class RPCType(Enum):
     geth = 1
 
 
+class WriteMode(Enum):
+    # delete the range's rows, then insert
+    replace = "replace"
+    # merge into existing rows, rebuilding whole partitions in staging tables
+    upsert = "upsert"
+
+
 def hex_to_int(value: str) -> int:
-    return int.from_bytes(hexstr_to_bytes(value), byteorder="big")
+    try:
+        # handles the 0x prefix, and is much faster than going through bytes
+        return int(value, 16)
+    except ValueError:
+        # e.g. "0x" for zero
+        return int.from_bytes(hexstr_to_bytes(value), byteorder="big")
+
+
+def normalize_address(address: Optional[str]) -> Optional[str]:
+    """
+    Lowercased and interned, so each address is one string in memory and
+    comparing equal addresses is an identity check
+    """
+    if address is None:
+        return None
+
+    return sys.intern(address.lower())
 
 
 def equal_within_percent(
     first_value: int, second_value: int, threshold_percent: float
 ) -> bool:
+    if first_value == second_value:
+        return True
+
     difference = abs(
         (first_value - second_value) / (0.5 * (first_value + second_value))
     )
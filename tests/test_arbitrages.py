@@ -1,6 +1,11 @@
-from typing import List, Tuple
+import random
+from typing import List, Optional, Tuple
 
-from mev_inspect.arbitrages import _get_shortest_route, get_arbitrages
+from mev_inspect.arbitrages import (
+    _get_shortest_route,
+    _swap_outs_match_swap_ins,
+    get_arbitrages,
+)
 from mev_inspect.classifiers.specs.uniswap import (
     UNISWAP_V2_PAIR_ABI_NAME,
     UNISWAP_V3_POOL_ABI_NAME,
@@ -228,6 +233,142 @@ def test_get_shortest_route():
     _assert_route_tokens_equal(actual_shortest_route, expected_shortest_route)
 
 
+def test_get_shortest_route_matches_search():
+    # routes chosen before indexing, by trying every path in order
+    rng = random.Random(1)
+    tokens = ["0xa", "0xb", "0xc"]
+    addresses = ["0x1", "0x2"]
+
+    for _ in range(1000):
+        swaps = [
+            _create_random_swap(rng, tokens, addresses, trace_address=[i])
+            for i in range(rng.randint(2, 10))
+        ]
+        start_swap, *other_swaps = swaps
+        end_swaps = [swap for swap in other_swaps if rng.random() < 0.2]
+        max_route_length = rng.choice([None, 2, 3, 4])
+
+        expected_route = _get_shortest_route_by_search(
+            start_swap, end_swaps, other_swaps, max_route_length
+        )
+        actual_route = _get_shortest_route(
+            start_swap, end_swaps, other_swaps, max_route_length
+        )
+
+        assert actual_route == expected_route
+
+
+def test_arbitrage_with_many_swaps():
+    # an aggregator splitting each hop across pools
+    n_hops = 60
+    n_pools_per_hop = 5
+    account_address = "0x0"
+    tokens = [f"0x{hop:040x}" for hop in range(n_hops)]
+
+    swaps = []
+    for hop in range(n_hops):
+        for pool in range(n_pools_per_hop):
+            swaps.append(
+                Swap(
+                    abi_name=UNISWAP_V2_PAIR_ABI_NAME,
+                    transaction_hash="0xfake",
+                    transaction_position=0,
+                    block_number=0,
+                    trace_address=[hop, pool],
+                    contract_address=f"0xpool{hop}_{pool}",
+                    protocol=Protocol.uniswap_v2,
+                    from_address=account_address,
+                    to_address=account_address,
+                    token_in_address=tokens[hop],
+                    token_in_amount=100,
+                    token_out_address=tokens[(hop + 1) % n_hops],
+                    token_out_amount=100,
+                )
+            )
+
+    arbitrages = get_arbitrages(swaps)
+
+    assert len(arbitrages) > 0
+    for arbitrage in arbitrages:
+        assert len(arbitrage.swaps) == n_hops
+        assert arbitrage.profit_token_address == arbitrage.swaps[0].token_in_address
+
+
+def _get_shortest_route_by_search(
+    start_swap: Swap,
+    end_swaps: List[Swap],
+    all_swaps: List[Swap],
+    max_route_length: Optional[int] = None,
+) -> Optional[List[Swap]]:
+    if len(end_swaps) == 0:
+        return None
+
+    if max_route_length is not None and max_route_length < 2:
+        return None
+
+    for end_swap in end_swaps:
+        if _swap_outs_match_swap_ins(start_swap, end_swap):
+            return [start_swap, end_swap]
+
+    if max_route_length is not None and max_route_length == 2:
+        return None
+
+    other_swaps = [
+        swap for swap in all_swaps if (swap is not start_swap and swap not in end_swaps)
+    ]
+
+    shortest_remaining_route = None
+    max_remaining_route_length = (
+        None if max_route_length is None else max_route_length - 1
+    )
+
+    for next_swap in other_swaps:
+        if _swap_outs_match_swap_ins(start_swap, next_swap):
+            shortest_from_next = _get_shortest_route_by_search(
+                next_swap,
+                end_swaps,
+                other_swaps,
+                max_route_length=max_remaining_route_length,
+            )
+
+            if shortest_from_next is not None and (
+                shortest_remaining_route is None
+                or len(shortest_from_next) < len(shortest_remaining_route)
+            ):
+                shortest_remaining_route = shortest_from_next
+                max_remaining_route_length = len(shortest_from_next) - 1
+
+    if shortest_remaining_route is None:
+        return None
+    else:
+        return [start_swap] + shortest_remaining_route
+
+
+def _create_random_swap(
+    rng: random.Random,
+    tokens: List[str],
+    addresses: List[str],
+    trace_address: List[int],
+) -> Swap:
+    token_in_address, token_out_address = rng.sample(tokens, 2)
+
+    return Swap(
+        abi_name=UNISWAP_V2_PAIR_ABI_NAME,
+        transaction_hash="0xfake",
+        transaction_position=0,
+        block_number=0,
+        trace_address=trace_address,
+        contract_address=rng.choice(addresses),
+        protocol=Protocol.uniswap_v2,
+        from_address=rng.choice(addresses),
+        to_address=rng.choice(addresses),
+        token_in_address=token_in_address,
+        token_in_amount=rng.choice([100] * 9 + [50]),
+        token_out_address=token_out_address,
+        token_out_amount=rng.choice([100] * 9 + [50]),
+    )
+
+
 def _assert_route_tokens_equal(
     route: List[Swap],
     expected_token_in_out_pairs: List[Tuple[str, str]],
@@ -0,0 +1,212 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from mev_inspect import backfill
+from mev_inspect.backfill import plan_block_ranges, run_backfill
+from mev_inspect.schemas.block_ranges import BlockRangeStatus
+
+
+def test_plan_block_ranges():
+    assert plan_block_ranges(12_000_000, 12_000_200) == [
+        (12_000_000, 12_000_100),
+        (12_000_100, 12_000_200),
+    ]
+
+    # widened to whole ranges at the ends
+    assert plan_block_ranges(12_000_050, 12_000_250) == [
+        (12_000_000, 12_000_100),
+        (12_000_100, 12_000_200),
+        (12_000_200, 12_000_300),
+    ]
+
+    # bigger ranges for older blocks, split where the size changes
+    assert plan_block_ranges(5_985_000, 6_003_000) == [
+        (5_980_000, 5_990_000),
+        (5_990_000, 6_000_000),
+        (6_000_000, 6_002_000),
+        (6_002_000, 6_004_000),
+    ]
+
+
+def test_plan_block_ranges_is_the_same_from_any_start():
+    all_block_ranges = plan_block_ranges(11_990_000, 12_010_000)
+    later_block_ranges = plan_block_ranges(12_000_000, 12_010_000)
+
+    assert all_block_ranges[-len(later_block_ranges) :] == later_block_ranges
+
+
+def test_run_backfill(monkeypatch):
+    checkpoints = _Checkpoints(monkeypatch)
+    inspector = _Inspector(failing_after_blocks={12_000_100})
+
+    asyncio.run(run_backfill(inspector, None, None, 12_000_000, 12_000_300, "worker"))
+
+    # failed ranges are tried again first, up to max_attempts
+    assert inspector.inspected == [
+        (12_000_000, 12_000_100),
+        (12_000_100, 12_000_200),
+        (12_000_100, 12_000_200),
+        (12_000_100, 12_000_200),
+        (12_000_200, 12_000_300),
+    ]
+    assert checkpoints.statuses == {
+        (12_000_000, 12_000_100): BlockRangeStatus.done,
+        (12_000_100, 12_000_200): BlockRangeStatus.failed,
+        (12_000_200, 12_000_300): BlockRangeStatus.done,
+    }
+
+
+def test_run_backfill_skips_done_ranges(monkeypatch):
+    checkpoints = _Checkpoints(monkeypatch)
+    checkpoints.statuses[(12_000_000, 12_000_100)] = BlockRangeStatus.done
+
+    inspector = _Inspector()
+    asyncio.run(run_backfill(inspector, None, None, 12_000_000, 12_000_200, "worker"))
+
+    assert inspector.inspected == [(12_000_100, 12_000_200)]
+
+
+def test_run_backfill_releases_cancelled_range(monkeypatch):
+    checkpoints = _Checkpoints(monkeypatch)
+    inspector = _Inspector(cancelled_after_blocks={12_000_000})
+
+    asyncio.run(run_backfill(inspector, None, None, 12_000_000, 12_000_200, "worker"))
+
+    assert inspector.inspected == [(12_000_000, 12_000_100)]
+    assert checkpoints.statuses == {
+        (12_000_000, 12_000_100): BlockRangeStatus.pending,
+        (12_000_100, 12_000_200): BlockRangeStatus.pending,
+    }
+
+
+def test_run_backfill_clips_ranges_to_bounds(monkeypatch):
+    checkpoints = _Checkpoints(monkeypatch)
+    inspector = _Inspector()
+
+    asyncio.run(run_backfill(inspector, None, None, 12_000_050, 12_000_250, "worker"))
+
+    assert inspector.inspected == [
+        (12_000_050, 12_000_100),
+        (12_000_100, 12_000_200),
+        (12_000_200, 12_000_250),
+    ]
+    # the rest of their blocks are left for a later backfill
+    assert checkpoints.statuses == {
+        (12_000_000, 12_000_100): BlockRangeStatus.pending,
+        (12_000_100, 12_000_200): BlockRangeStatus.done,
+        (12_000_200, 12_000_300): BlockRangeStatus.pending,
+    }
+
+    inspector = _Inspector()
+    asyncio.run(run_backfill(inspector, None, None, 12_000_000, 12_000_300, "worker"))
+
+    assert inspector.inspected == [
+        (12_000_000, 12_000_100),
+        (12_000_200, 12_000_300),
+    ]
+
+
+def test_run_backfill_leaves_ranges_taken_over(monkeypatch):
+    checkpoints = _Checkpoints(monkeypatch)
+    inspector = _Inspector()
+
+    def take_over(after_block, before_block):
+        checkpoints.worker_ids[(after_block, before_block)] = "other-worker"
+        checkpoints.statuses[(after_block, before_block)] = BlockRangeStatus.done
+
+    inspector.on_inspect = take_over
+    asyncio.run(run_backfill(inspector, None, None, 12_000_000, 12_000_100, "worker"))
+
+    assert checkpoints.statuses == {
+        (12_000_000, 12_000_100): BlockRangeStatus.done,
+    }
+    assert checkpoints.worker_ids == {(12_000_000, 12_000_100): "other-worker"}
+
+
+class _Checkpoints:
+    """
+    block_range_checkpoints in memory, with no other workers
+    """
+
+    def __init__(self, monkeypatch):
+        self.statuses: Dict[Tuple[int, int], BlockRangeStatus] = {}
+        self.attempts: Dict[Tuple[int, int], int] = {}
+        self.worker_ids: Dict[Tuple[int, int], str] = {}
+
+        monkeypatch.setattr(backfill, "write_block_ranges", self.write_block_ranges)
+        monkeypatch.setattr(backfill, "claim_block_range", self.claim_block_range)
+        monkeypatch.setattr(
+            backfill, "update_block_range_status", self.update_block_range_status
+        )
+        monkeypatch.setattr(backfill, "get_block_range_status_counts", lambda *args: {})
+
+    def write_block_ranges(self, db_session, block_ranges):
+        for block_range in block_ranges:
+            self.statuses.setdefault(block_range, BlockRangeStatus.pending)
+
+    def claim_block_range(
+        self,
+        db_session,
+        worker_id,
+        after_block_number,
+        before_block_number,
+        lease_seconds,
+        max_attempts,
+        skipped_block_ranges=(),
+    ) -> Optional[Tuple[int, int]]:
+        for block_range, status in sorted(self.statuses.items()):
+            range_after_block, range_before_block = block_range
+
+            if (
+                range_before_block <= after_block_number
+                or range_after_block >= before_block_number
+                or block_range in skipped_block_ranges
+            ):
+                continue
+
+            if status == BlockRangeStatus.pending or (
+                status == BlockRangeStatus.failed
+                and self.attempts.get(block_range, 0) < max_attempts
+            ):
+                self.statuses[block_range] = BlockRangeStatus.in_progress
+                self.attempts[block_range] = self.attempts.get(block_range, 0) + 1
+                self.worker_ids[block_range] = worker_id
+                return block_range
+
+        return None
+
+    def update_block_range_status(
+        self,
+        db_session,
+        worker_id,
+        after_block_number,
+        before_block_number,
+        status,
+        error=None,
+    ) -> bool:
+        block_range = (after_block_number, before_block_number)
+
+        if self.worker_ids.get(block_range) != worker_id:
+            return False
+
+        self.statuses[block_range] = status
+        return True
+
+
+class _Inspector:
+    def __init__(self, failing_after_blocks=(), cancelled_after_blocks=()):
+        self.failing_after_blocks = failing_after_blocks
+        self.cancelled_after_blocks = cancelled_after_blocks
+        self.inspected = []
+        self.on_inspect = lambda after_block, before_block: None
+
+    async def inspect_many_blocks(
+        self, inspect_db_session, trace_db_session, after_block, before_block
+    ) -> bool:
+        self.inspected.append((after_block, before_block))
+        self.on_inspect(after_block, before_block)
+
+        if after_block in self.failing_after_blocks:
+            raise RuntimeError("Node is down")
+
+        return after_block not in self.cancelled_after_blocks
@@ -0,0 +1,81 @@
+import asyncio
+import os
+
+from mev_inspect.block import create_from_block_number
+from mev_inspect.block_archive import INDEX_SUFFIX, BlockArchive, get_segment_start
+
+from .utils import load_test_block
+
+
+def test_write_and_read_blocks(tmp_path):
+    block_archive = BlockArchive(str(tmp_path))
+    first_block = load_test_block(12775690)
+    second_block = load_test_block(13207907)
+
+    block_archive.write_block(first_block)
+    block_archive.write_block(second_block)
+
+    assert block_archive.get_block(first_block.block_number) == first_block
+    assert block_archive.get_block(second_block.block_number) == second_block
+    assert block_archive.get_block(first_block.block_number + 1) is None
+
+    reopened_block_archive = BlockArchive(str(tmp_path))
+    assert reopened_block_archive.has_block(first_block.block_number)
+    assert reopened_block_archive.get_block(second_block.block_number) == second_block
+
+    block_archive.close()
+    reopened_block_archive.close()
+
+
+def test_reads_blocks_written_by_another_archive(tmp_path):
+    reader = BlockArchive(str(tmp_path))
+    writer = BlockArchive(str(tmp_path))
+    block = load_test_block(12775690)
+
+    assert reader.get_block(block.block_number) is None
+
+    writer.write_block(block)
+
+    assert reader.get_block(block.block_number) == block
+
+
+def test_ignores_partial_index_entry(tmp_path):
+    block_archive = BlockArchive(str(tmp_path))
+    block = load_test_block(12775690)
+    block_archive.write_block(block)
+
+    index_path = os.path.join(
+        str(tmp_path), f"{get_segment_start(block.block_number)}{INDEX_SUFFIX}"
+    )
+    with open(index_path, "ab") as index_file:
+        index_file.write(b"\x01\x02\x03")
+
+    assert BlockArchive(str(tmp_path)).get_block(block.block_number) == block
+
+    # blocks written after it are indexed past the partial entry
+    next_block = block.copy(update={"block_number": block.block_number + 1})
+    BlockArchive(str(tmp_path)).write_block(next_block)
+
+    block_archive = BlockArchive(str(tmp_path))
+    assert block_archive.get_block(block.block_number) == block
+    assert block_archive.get_block(next_block.block_number) == next_block
+
+
+def test_create_from_block_number_reads_archive(tmp_path):
+    block_archive = BlockArchive(str(tmp_path))
+    block = load_test_block(12775690)
+    block_archive.write_block(block)
+
+    # no provider, so any request to a node would fail
+    archived_block = asyncio.run(
+        create_from_block_number(
+            None,
+            None,
+            None,
+            block.block_number,
+            None,
+            block_archive=block_archive,
+        )
+    )
+
+    assert archived_block == block
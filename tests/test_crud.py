@@ -0,0 +1,322 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from mev_inspect.classifiers.trace import TraceClassifier
+from mev_inspect.crud.arbitrages import ARBITRAGE_COLUMNS, write_arbitrages
+from mev_inspect.crud.sandwiches import SANDWICH_COLUMNS, write_sandwiches
+from mev_inspect.crud.summary import update_summary_for_block_range
+from mev_inspect.crud.swaps import SWAP_COLUMNS, write_swaps
+from mev_inspect.crud.traces import (
+    CLASSIFIED_TRACE_KEY_COLUMNS,
+    upsert_classified_traces_for_blocks,
+    write_classified_traces,
+)
+from mev_inspect.db import atomic_write, upsert_as_csv, write_as_csv
+from mev_inspect.schemas.arbitrages import Arbitrage
+from mev_inspect.schemas.sandwiches import Sandwich
+from mev_inspect.schemas.swaps import Swap
+from mev_inspect.schemas.traces import Protocol, Trace, TraceType
+
+
+def test_write_as_csv_escapes_values():
+    db_session = _CopySession()
+
+    write_as_csv(
+        db_session,
+        "table",
+        [("a|b", '{"x": "\\"y\\""}', "line\nbreak", None, 10**30)],
+        columns=("c1", "c2", "c3", "c4", "c5"),
+    )
+
+    [(table_name, columns, text)] = db_session.copies
+    assert table_name == "table"
+    assert columns == ("c1", "c2", "c3", "c4", "c5")
+    assert text == 'a\\|b|{"x": "\\\\"y\\\\""}|line\\nbreak|\\N|' + str(10**30) + "\n"
+
+
+def test_write_swaps_and_arbitrages():
+    db_session = _CopySession()
+    swap = Swap(
+        abi_name="UniswapV2Pair",
+        transaction_hash="0xabc",
+        transaction_position=1,
+        block_number=100,
+        trace_address=[0, 2],
+        contract_address="0xpool",
+        from_address="0xfrom",
+        to_address="0xto",
+        token_in_address="0xa",
+        token_in_amount=10,
+        token_out_address="0xb",
+        token_out_amount=20,
+        protocol=Protocol.uniswap_v2,
+        error=None,
+    )
+    arbitrage = Arbitrage(
+        swaps=[swap, swap],
+        block_number=100,
+        transaction_hash="0xabc",
+        account_address="0xfrom",
+        profit_token_address="0xa",
+        start_amount=10,
+        end_amount=12,
+        profit_amount=2,
+        error=None,
+    )
+
+    write_swaps(db_session, [swap])
+    write_arbitrages(db_session, [arbitrage])
+
+    (
+        (swaps_table, swap_columns, swaps_text),
+        (arbitrages_table, arbitrage_columns, arbitrages_text),
+        (arbitrage_swaps_table, _, arbitrage_swaps_text),
+    ) = db_session.copies
+
+    assert (swaps_table, swap_columns) == ("swaps", SWAP_COLUMNS)
+    assert swaps_text == (
+        "UniswapV2Pair|0xabc|1|100|{0,2}|uniswap_v2|0xpool|0xfrom|0xto"
+        "|0xa|10|0xb|20|\\N\n"
+    )
+
+    assert (arbitrages_table, arbitrage_columns) == ("arbitrages", ARBITRAGE_COLUMNS)
+    [arbitrage_row] = arbitrages_text.splitlines()
+    arbitrage_id, *arbitrage_values = arbitrage_row.split("|")
+    assert arbitrage_values == [
+        "100",
+        "0xabc",
+        "0xfrom",
+        "0xa",
+        "10",
+        "12",
+        "2",
+        "\\N",
+        "{uniswap_v2}",
+    ]
+
+    assert arbitrage_swaps_table == "arbitrage_swaps"
+    assert arbitrage_swaps_text == f"{arbitrage_id}|0xabc|{{0,2}}\n" * 2
+    assert db_session.commits == 0
+
+
+def test_write_sandwiches_across_blocks():
+    db_session = _CopySession()
+    frontrun_swap, sandwiched_swap, backrun_swap = [
+        Swap(
+            abi_name="UniswapV2Pair",
+            transaction_hash=transaction_hash,
+            transaction_position=0,
+            block_number=block_number,
+            trace_address=[],
+            contract_address="0xpool",
+            from_address="0xfrom",
+            to_address="0xto",
+            token_in_address="0xa",
+            token_in_amount=10,
+            token_out_address="0xb",
+            token_out_amount=20,
+            protocol=Protocol.uniswap_v2,
+            error=None,
+        )
+        for transaction_hash, block_number in [
+            ("0xfront", 100),
+            ("0xvictim", 100),
+            ("0xback", 101),
+        ]
+    ]
+    sandwich = Sandwich(
+        block_number=101,
+        sandwicher_address="0xto",
+        frontrun_swap=frontrun_swap,
+        backrun_swap=backrun_swap,
+        sandwiched_swaps=[sandwiched_swap],
+        profit_token_address="0xa",
+        profit_amount=1,
+    )
+
+    write_sandwiches(db_session, [sandwich])
+
+    (sandwiches_table, sandwich_columns, sandwiches_text), _ = db_session.copies
+
+    assert (sandwiches_table, sandwich_columns) == ("sandwiches", SANDWICH_COLUMNS)
+    _, *sandwich_values = sandwiches_text.strip().split("|")
+    assert sandwich_values == [
+        "101",
+        "0xto",
+        "100",
+        "0xfront",
+        "{}",
+        "101",
+        "0xback",
+        "{}",
+        "0xa",
+        "1",
+    ]
+
+
+def test_summary_excludes_sandwich_legs_by_their_blocks():
+    db_session = _CopySession()
+
+    update_summary_for_block_range(db_session, 1, 2)
+
+    arbitrage_insert = " ".join(db_session.statements[1].split())
+    assert "front_sandwich.frontrun_swap_block_number = a.block_number" in (
+        arbitrage_insert
+    )
+    assert "back_sandwich.backrun_swap_block_number = a.block_number" in (
+        arbitrage_insert
+    )
+
+
+def test_atomic_write_commits_once():
+    db_session = _CopySession()
+
+    with atomic_write(db_session):
+        write_as_csv(db_session, "blocks", [(1, "2021-01-01")])
+        write_as_csv(db_session, "blocks", [(2, "2021-01-01")])
+
+    assert db_session.statements == []
+    assert (db_session.commits, db_session.rollbacks) == (1, 0)
+
+
+def test_atomic_write_rolls_back_on_error():
+    db_session = _CopySession()
+
+    with pytest.raises(ValueError):
+        with atomic_write(db_session):
+            write_as_csv(db_session, "blocks", [(1, "2021-01-01")])
+            raise ValueError("write failed")
+
+    assert (db_session.commits, db_session.rollbacks) == (0, 1)
+
+
+def test_upsert_as_csv_merges_from_temporary_table():
+    db_session = _CopySession()
+
+    upsert_as_csv(
+        db_session,
+        "blocks",
+        [(1, "2021-01-01")],
+        columns=("block_number", "block_timestamp"),
+        key_columns=("block_number",),
+        after_block_number=1,
+        before_block_number=2,
+    )
+
+    [(table_name, columns, text)] = db_session.copies
+    assert table_name == "upsert_blocks"
+    assert columns == ("block_number", "block_timestamp")
+    assert text == "1|2021-01-01\n"
+
+    create, delete, insert, drop = [
+        " ".join(statement.split()) for statement in db_session.statements
+    ]
+    assert create == (
+        "CREATE TEMPORARY TABLE upsert_blocks (LIKE blocks INCLUDING DEFAULTS)"
+    )
+    assert "NOT EXISTS" in delete
+    assert "staged.block_number = existing.block_number" in delete
+    assert insert.endswith(
+        "ON CONFLICT (block_number) DO UPDATE SET "
+        "block_timestamp = EXCLUDED.block_timestamp "
+        "WHERE (blocks.block_timestamp::text) IS DISTINCT FROM "
+        "(EXCLUDED.block_timestamp::text)"
+    )
+    assert drop == "DROP TABLE upsert_blocks"
+    assert db_session.commits == 0
+
+
+def test_upsert_classified_traces_conflicts_on_primary_key():
+    db_session = _CopySession()
+
+    upsert_classified_traces_for_blocks(db_session, 1, 2, [])
+
+    insert = " ".join(db_session.statements[2].split())
+    assert f"ON CONFLICT ({', '.join(CLASSIFIED_TRACE_KEY_COLUMNS)})" in insert
+    assert "classified_at" not in insert
+
+
+def test_lazy_and_eager_classified_traces_write_the_same_rows():
+    # an ERC20 approve, which has no classifier, cut short
+    trace = Trace(
+        action={
+            "from": "0xfrom",
+            "to": "0xtoken",
+            "input": "0x095ea7b3" + "00" * 20,
+            "value": "0x0",
+            "gas": "0x1",
+        },
+        block_hash="0xblock",
+        block_number=100,
+        result={"gasUsed": "0x1", "output": "0x"},
+        subtraces=0,
+        trace_address=[],
+        transaction_hash="0xabc",
+        transaction_position=0,
+        type=TraceType.call,
+        error=None,
+    )
+    written_rows = []
+
+    for lazy_decode in [False, True]:
+        db_session = _CopySession()
+        write_classified_traces(
+            db_session, TraceClassifier(lazy_decode=lazy_decode).classify([trace])
+        )
+        [(_, _, text)] = db_session.copies
+        written_rows.append(text)
+
+    eager_row, lazy_row = written_rows
+    assert lazy_row == eager_row
+
+
+def test_update_summary_looks_up_prices_once_per_block():
+    db_session = _CopySession()
+
+    update_summary_for_block_range(db_session, 1, 10001)
+
+    _, arbitrage_insert, liquidation_insert = db_session.statements
+
+    for insert in (arbitrage_insert, liquidation_insert):
+        assert insert.count("FROM prices") == 1
+        assert "LATERAL" in insert
+        assert "classified_traces" not in insert
+        assert "mp.error" in insert
+
+    assert db_session.commits == 0
+
+
+class _CopySession:
+    """
+    Records what would be sent with COPY instead of using a database
+    """
+
+    def __init__(self):
+        self.copies = []
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def connection(self):
+        # the raw DBAPI connection is wrapped by SQLAlchemy's
+        return SimpleNamespace(connection=self)
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def copy_from(self, file, table_name, sep, columns=None):
+        assert sep == "|"
+        self.copies.append((table_name, columns, file.read()))
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return []
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
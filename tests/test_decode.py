@@ -67,3 +67,35 @@ def test_decode_function_with_tuple_argument():
     assert call_data.function_name == test_function_name
     assert call_data.function_signature == "testFunction((uint256))"
     assert call_data.inputs == {test_tuple_name: (1,)}
+
+
+def test_decode_function_lazily():
+    test_function_name = "testFunction"
+    test_parameter_name = "testParameter"
+    test_abi = pydantic.parse_obj_as(
+        abi.ABI,
+        [
+            {
+                "name": test_function_name,
+                "type": "function",
+                "inputs": [{"name": test_parameter_name, "type": "uint256"}],
+            }
+        ],
+    )
+    test_function_selector = "350c530b"
+    test_function_argument = (
+        "0000000000000000000000000000000000000000000000000000000000000001"
+    )
+    abi_decoder = decode.ABIDecoder(test_abi)
+    call_data = abi_decoder.decode(
+        "0x" + test_function_selector + test_function_argument, lazy=True
+    )
+    assert call_data.function_signature == "testFunction(uint256)"
+    assert not call_data.inputs.is_decoded
+    assert call_data.inputs == {test_parameter_name: 1}
+    assert call_data.inputs.is_decoded
+
+    truncated_call_data = abi_decoder.decode(
+        "0x" + test_function_selector + test_function_argument[:10], lazy=True
+    )
+    assert truncated_call_data.inputs == {}
@@ -0,0 +1,76 @@
+import asyncio
+
+from mev_inspect.fees import (
+    FEE_HISTORY_MAX_BLOCKS,
+    BaseFeeFetcher,
+    fetch_base_fees_per_gas,
+)
+
+
+def test_fetch_base_fees_per_gas_by_window():
+    w3 = _FakeWeb3()
+
+    base_fees_per_gas = asyncio.run(fetch_base_fees_per_gas(w3, 1000, 3500))
+
+    assert base_fees_per_gas == [_get_base_fee(i) for i in range(1000, 3500)]
+    assert w3.eth.requests == [
+        (FEE_HISTORY_MAX_BLOCKS, 1000 + FEE_HISTORY_MAX_BLOCKS - 1),
+        (FEE_HISTORY_MAX_BLOCKS, 1000 + 2 * FEE_HISTORY_MAX_BLOCKS - 1),
+        (3500 - 1000 - 2 * FEE_HISTORY_MAX_BLOCKS, 3499),
+    ]
+
+
+def test_base_fee_fetcher_shares_windows():
+    w3 = _FakeWeb3()
+    base_fee_fetcher = BaseFeeFetcher(w3, 1000, 1100)
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                base_fee_fetcher.get_base_fee_per_gas(block_number)
+                for block_number in range(1000, 1100)
+            )
+        )
+
+    assert asyncio.run(run()) == [_get_base_fee(i) for i in range(1000, 1100)]
+    assert w3.eth.requests == [(100, 1099)]
+
+
+def test_base_fee_fetcher_reads_block_header():
+    w3 = _FakeWeb3()
+    base_fee_fetcher = BaseFeeFetcher(w3, 1000, 1100)
+
+    base_fee_per_gas = asyncio.run(
+        base_fee_fetcher.get_base_fee_per_gas(1000, {"baseFeePerGas": 7})
+    )
+
+    assert base_fee_per_gas == 7
+    assert w3.eth.requests == []
+
+
+def _get_base_fee(block_number: int) -> int:
+    return block_number * 10
+
+
+class _FakeEth:
+    def __init__(self):
+        self.requests = []
+
+    async def fee_history(self, block_count, newest_block):
+        self.requests.append((block_count, newest_block))
+        await asyncio.sleep(0.001)
+
+        oldest_block = newest_block - block_count + 1
+        return {
+            "oldestBlock": oldest_block,
+            "baseFeePerGas": [
+                _get_base_fee(block_number)
+                for block_number in range(oldest_block, newest_block + 2)
+            ],
+            "gasUsedRatio": [0.5] * block_count,
+        }
+
+
+class _FakeWeb3:
+    def __init__(self):
+        self.eth = _FakeEth()
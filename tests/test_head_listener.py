@@ -0,0 +1,294 @@
+import asyncio
+import time
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from mev_inspect import head_listener
+from mev_inspect.head_listener import (
+    BlockHashBuffer,
+    BlockHead,
+    HeadListener,
+    catch_up,
+    subscribe_new_heads,
+)
+
+
+def test_subscribe_new_heads():
+    async def run():
+        async with _FakeNode([100, 101]) as ws_url:
+            async with ClientSession() as session:
+                return [head async for head in subscribe_new_heads(session, ws_url)]
+
+    heads = asyncio.run(run())
+
+    assert [head.block_number for head in heads] == [100, 101]
+    assert heads[1].parent_hash == heads[0].block_hash
+
+
+def test_head_listener_fills_gaps(monkeypatch):
+    latest_block_updates = _patch_latest_block_update(monkeypatch)
+
+    inspector = _Inspector()
+
+    async def run():
+        async with _FakeNode([100, 101, 110]) as ws_url:
+            listener = HeadListener(
+                inspector,
+                _Session(),
+                None,
+                block_number_lag=5,
+                gap_batch_size=3,
+            )
+
+            try:
+                assert await listener.listen(ws_url)
+            finally:
+                await inspector.rpc_session.close()
+
+            return listener.latencies.get_metrics()
+
+    latency_metrics = asyncio.run(run())
+
+    assert inspector.inspected == [
+        (95, 96),
+        (96, 97),
+        # missed blocks, in ranges
+        (97, 100),
+        (100, 103),
+        (103, 106),
+    ]
+    assert latest_block_updates == [95, 96, 99, 102, 105]
+
+    # blocks 100 and 101 were seen as heads and written
+    assert latency_metrics.blocks == 2
+    assert latency_metrics.p95_seconds is not None
+
+
+def test_head_listener_inspects_reorged_blocks_again(monkeypatch):
+    latest_block_updates = _patch_latest_block_update(monkeypatch)
+    deleted = []
+    monkeypatch.setattr(
+        head_listener,
+        "delete_inspections",
+        lambda db_session, after_block, before_block: deleted.append(
+            (after_block, before_block)
+        ),
+    )
+
+    inspector = _Inspector(
+        # blocks of the new chain not seen as heads
+        blocks_by_hash={
+            "0x102b": {"parentHash": "0x101b"},
+            "0x101b": {"parentHash": "0x100"},
+        }
+    )
+    listener = HeadListener(inspector, _Session(), None)
+
+    async def run():
+        for head in [
+            _create_head(100, "0x100", "0x99"),
+            _create_head(101, "0x101", "0x100"),
+            _create_head(102, "0x102", "0x101"),
+            # replaces 102 only
+            _create_head(102, "0x102a", "0x101"),
+            # replaces 101 and 102, with its parent unseen
+            _create_head(103, "0x103b", "0x102b"),
+        ]:
+            assert await listener.on_head(head)
+
+    asyncio.run(run())
+
+    assert inspector.inspected == [
+        (100, 101),
+        (101, 102),
+        (102, 103),
+        (102, 103),
+        (101, 104),
+    ]
+    assert deleted == [(102, 103), (101, 103)]
+    assert latest_block_updates == [100, 101, 102, 101, 102, 100, 103]
+    assert listener.block_hashes.block_numbers == [100, 103]
+
+
+def test_head_listener_skips_failed_blocks(monkeypatch):
+    latest_block_updates = _patch_latest_block_update(monkeypatch)
+    latest_block_updates.append(96)
+
+    inspector = _Inspector(failing_after_blocks={97})
+    listener = HeadListener(inspector, _Session(), None, gap_batch_size=3)
+
+    assert asyncio.run(listener.on_head(_create_head(101, "0x101", "0x100")))
+
+    # the failed range is inspected again a block at a time
+    assert inspector.inspected == [
+        (97, 100),
+        (97, 98),
+        (98, 99),
+        (99, 100),
+        (100, 102),
+    ]
+    assert latest_block_updates == [96, 97, 98, 99, 101]
+
+
+def test_catch_up(monkeypatch):
+    latest_block_updates = _patch_latest_block_update(monkeypatch)
+    inspector = _Inspector()
+
+    assert asyncio.run(catch_up(inspector, _Session(), None, 100, 350, batch_size=100))
+
+    assert inspector.inspected == [(100, 200), (200, 300), (300, 350)]
+    assert latest_block_updates == [199, 299, 349]
+
+
+def test_catch_up_inspects_failed_batch_by_block(monkeypatch):
+    latest_block_updates = _patch_latest_block_update(monkeypatch)
+    inspector = _Inspector(failing_after_blocks={200})
+
+    assert asyncio.run(catch_up(inspector, _Session(), None, 100, 350, batch_size=100))
+
+    # past the failed batch, blocks are batched again
+    assert inspector.inspected == (
+        [(100, 200), (200, 300)]
+        + [(block_number, block_number + 1) for block_number in range(200, 300)]
+        + [(300, 350)]
+    )
+    assert latest_block_updates == [199] + list(range(200, 300)) + [349]
+
+
+def test_block_hash_buffer():
+    block_hashes = BlockHashBuffer(size=3)
+
+    for block_number in range(5):
+        block_hashes.add(block_number, hex(block_number))
+
+    assert block_hashes.block_numbers == [2, 3, 4]
+
+    block_hashes.add(3, "0xother")
+
+    assert block_hashes.block_numbers == [2, 3]
+    assert block_hashes.get(3) == "0xother"
+    assert block_hashes.get(4) is None
+
+
+def _patch_latest_block_update(monkeypatch):
+    latest_block_updates = []
+    monkeypatch.setattr(
+        head_listener,
+        "find_latest_block_update",
+        lambda db_session: latest_block_updates[-1] if latest_block_updates else None,
+    )
+    monkeypatch.setattr(
+        head_listener,
+        "update_latest_block",
+        lambda db_session, block_number: latest_block_updates.append(block_number),
+    )
+    return latest_block_updates
+
+
+def _create_head(block_number: int, block_hash: str, parent_hash: str) -> BlockHead:
+    return BlockHead(
+        block_number=block_number,
+        block_hash=block_hash,
+        parent_hash=parent_hash,
+        timestamp=int(time.time()),
+    )
+
+
+class _FakeNode:
+    """
+    Node that sends the given heads to a newHeads subscription, then
+    disconnects
+    """
+
+    def __init__(self, block_numbers):
+        self.block_numbers = block_numbers
+        app = web.Application()
+        app.router.add_get("/", self.handle)
+        self.server = TestServer(app)
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        subscribe_request = await ws.receive_json()
+        assert subscribe_request["method"] == "eth_subscribe"
+        assert subscribe_request["params"] == ["newHeads"]
+        await ws.send_json(
+            {"jsonrpc": "2.0", "id": subscribe_request["id"], "result": "0xsub"}
+        )
+
+        for block_number in self.block_numbers:
+            await ws.send_json(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "eth_subscription",
+                    "params": {
+                        "subscription": "0xsub",
+                        "result": {
+                            "number": hex(block_number),
+                            "hash": f"0x{block_number}",
+                            "parentHash": f"0x{block_number - 1}",
+                            "timestamp": hex(int(time.time()) - 1),
+                        },
+                    },
+                }
+            )
+
+        await ws.close()
+        return ws
+
+    async def __aenter__(self):
+        await self.server.start_server()
+        return str(self.server.make_url("/"))
+
+    async def __aexit__(self, *args):
+        await self.server.close()
+
+
+class _RPCSession:
+    def __init__(self):
+        self._session = None
+
+    async def get_session(self):
+        if self._session is None:
+            self._session = ClientSession()
+
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class _BaseProvider:
+    def __init__(self, blocks_by_hash):
+        self.blocks_by_hash = blocks_by_hash
+
+    async def make_request(self, method, params):
+        assert method == "eth_getBlockByHash"
+        return {"jsonrpc": "2.0", "id": 1, "result": self.blocks_by_hash[params[0]]}
+
+
+class _Inspector:
+    def __init__(self, blocks_by_hash=None, failing_after_blocks=()):
+        self.base_provider = _BaseProvider(blocks_by_hash or {})
+        self.rpc_session = _RPCSession()
+        self.price_oracle = None
+        self.failing_after_blocks = failing_after_blocks
+        self.inspected = []
+
+    async def inspect_many_blocks(
+        self, inspect_db_session, trace_db_session, after_block, before_block
+    ) -> bool:
+        self.inspected.append((after_block, before_block))
+
+        if after_block in self.failing_after_blocks:
+            raise RuntimeError("Node is down")
+
+        return True
+
+
+class _Session:
+    def commit(self):
+        pass
@@ -0,0 +1,294 @@
+import asyncio
+import random
+
+import pytest
+
+from mev_inspect import inspect_block
+from mev_inspect.classifiers.trace import TraceClassifier
+from mev_inspect.crud import partitions
+from mev_inspect.schemas.blocks import Block
+from mev_inspect.utils import WriteMode
+
+from .utils import load_test_block
+
+
+def test_inspect_many_blocks_writes_batches_in_order(
+    trace_classifier: TraceClassifier, monkeypatch
+):
+    written = []
+
+    async def fetch_block(
+        base_provider,
+        w3,
+        type,
+        block_number,
+        trace_db_session,
+        block_archive=None,
+        base_fee_fetcher=None,
+    ):
+        # finish out of order
+        await asyncio.sleep(random.random() / 100)
+        return _empty_block(block_number)
+
+    def write_inspections(
+        inspect_db_session, after_block_number, before_block_number, inspections, *args
+    ):
+        written.append(
+            (
+                after_block_number,
+                before_block_number,
+                [inspection.block.block_number for inspection in inspections],
+            )
+        )
+
+    monkeypatch.setattr(inspect_block, "create_from_block_number", fetch_block)
+    monkeypatch.setattr(inspect_block, "_write_inspections", write_inspections)
+
+    asyncio.run(
+        inspect_block.inspect_many_blocks(
+            None,
+            None,
+            None,
+            None,
+            trace_classifier,
+            100,
+            123,
+            None,
+            fetch_concurrency=5,
+            inspect_concurrency=2,
+            write_batch_size=10,
+            queue_size=2,
+        )
+    )
+
+    assert written == [
+        (100, 110, list(range(100, 110))),
+        (110, 120, list(range(110, 120))),
+        (120, 123, list(range(120, 123))),
+    ]
+
+
+def test_inspect_many_blocks_fetches_within_window_of_writes(
+    trace_classifier: TraceClassifier, monkeypatch
+):
+    fetched_while_stuck = []
+
+    async def fetch_block(
+        base_provider,
+        w3,
+        type,
+        block_number,
+        trace_db_session,
+        block_archive=None,
+        base_fee_fetcher=None,
+    ):
+        fetched_while_stuck.append(block_number)
+
+        if block_number == 100:
+            # retried for a while
+            await asyncio.sleep(0.05)
+            fetched_while_stuck.append(None)
+
+        return _empty_block(block_number)
+
+    monkeypatch.setattr(inspect_block, "create_from_block_number", fetch_block)
+    monkeypatch.setattr(inspect_block, "_write_inspections", lambda *args: None)
+
+    asyncio.run(
+        inspect_block.inspect_many_blocks(
+            None,
+            None,
+            None,
+            None,
+            trace_classifier,
+            100,
+            200,
+            None,
+            fetch_concurrency=5,
+            write_batch_size=5,
+            queue_size=2,
+        )
+    )
+
+    # the first batch and queue_size blocks past it
+    assert fetched_while_stuck[: fetched_while_stuck.index(None)] == list(
+        range(100, 107)
+    )
+
+
+def test_inspect_many_blocks_swaps_partitions_once_written(
+    trace_classifier: TraceClassifier, monkeypatch
+):
+    written = []
+
+    async def fetch_block(
+        base_provider,
+        w3,
+        type,
+        block_number,
+        trace_db_session,
+        block_archive=None,
+        base_fee_fetcher=None,
+    ):
+        return _empty_block(block_number)
+
+    def write_inspections(
+        inspect_db_session, after_block_number, before_block_number, *args
+    ):
+        written.append((after_block_number, before_block_number))
+
+    def swap_staged_partition(inspect_db_session, partition_start, table_names):
+        written.append((f"swap {partition_start}", table_names))
+
+    monkeypatch.setattr(partitions, "PARTITION_SIZE", 10)
+    monkeypatch.setattr(inspect_block, "PARTITION_SIZE", 10)
+    monkeypatch.setattr(inspect_block, "create_from_block_number", fetch_block)
+    monkeypatch.setattr(inspect_block, "_write_inspections", write_inspections)
+    monkeypatch.setattr(
+        inspect_block, "_stage_partitions", lambda *args: {"swaps": [10, 20]}
+    )
+    monkeypatch.setattr(inspect_block, "_swap_staged_partition", swap_staged_partition)
+
+    asyncio.run(
+        inspect_block.inspect_many_blocks(
+            None,
+            None,
+            None,
+            None,
+            trace_classifier,
+            5,
+            35,
+            None,
+            write_batch_size=6,
+            write_mode=WriteMode.upsert,
+        )
+    )
+
+    assert written == [
+        (5, 10),
+        (10, 16),
+        (16, 20),
+        ("swap 10", ["swaps"]),
+        (20, 26),
+        (26, 30),
+        ("swap 20", ["swaps"]),
+        (30, 35),
+    ]
+
+
+def test_inspect_many_blocks_raises_fetch_errors(
+    trace_classifier: TraceClassifier, monkeypatch
+):
+    async def fetch_block(
+        base_provider,
+        w3,
+        type,
+        block_number,
+        trace_db_session,
+        block_archive=None,
+        base_fee_fetcher=None,
+    ):
+        if block_number == 105:
+            raise ValueError("fetch failed")
+
+        await asyncio.sleep(0)
+        return _empty_block(block_number)
+
+    monkeypatch.setattr(inspect_block, "create_from_block_number", fetch_block)
+
+    with pytest.raises(ValueError, match="fetch failed"):
+        asyncio.run(
+            inspect_block.inspect_many_blocks(
+                None,
+                None,
+                None,
+                None,
+                trace_classifier,
+                100,
+                110,
+                None,
+                fetch_concurrency=3,
+            )
+        )
+
+
+def test_inspect_many_blocks_in_process_pool(
+    trace_classifier: TraceClassifier, monkeypatch
+):
+    block_number = 12914944
+    inspections_by_pool = {}
+
+    async def fetch_block(
+        base_provider,
+        w3,
+        type,
+        block_number,
+        trace_db_session,
+        block_archive=None,
+        base_fee_fetcher=None,
+    ):
+        return load_test_block(block_number)
+
+    monkeypatch.setattr(inspect_block, "create_from_block_number", fetch_block)
+
+    with inspect_block.get_inspect_process_pool(2) as process_pool:
+        for pool in [None, process_pool]:
+
+            def write_inspections(
+                inspect_db_session,
+                after_block_number,
+                before_block_number,
+                inspections,
+                *args,
+                pool=pool,
+            ):
+                inspections_by_pool[pool] = inspections
+
+            monkeypatch.setattr(inspect_block, "_write_inspections", write_inspections)
+
+            asyncio.run(
+                inspect_block.inspect_many_blocks(
+                    None,
+                    None,
+                    None,
+                    None,
+                    trace_classifier,
+                    block_number,
+                    block_number + 1,
+                    None,
+                    inspect_process_pool=pool,
+                )
+            )
+
+    [expected] = inspections_by_pool[None]
+    [actual] = inspections_by_pool[process_pool]
+
+    assert actual.swaps == expected.swaps
+    assert actual.arbitrages == expected.arbitrages
+    assert actual.miner_payments == expected.miner_payments
+    assert len(actual.classified_traces) == len(expected.classified_traces)
+
+
+def test_get_write_batches_splits_at_block_numbers():
+    assert inspect_block._get_write_batches(95, 125, 10) == [
+        (95, 105),
+        (105, 115),
+        (115, 125),
+    ]
+    assert inspect_block._get_write_batches(95, 125, 10, [100, 120, 200]) == [
+        (95, 100),
+        (100, 110),
+        (110, 120),
+        (120, 125),
+    ]
+
+
+def _empty_block(block_number: int) -> Block:
+    return Block(
+        block_number=block_number,
+        block_timestamp=0,
+        miner="0x0000000000000000000000000000000000000000",
+        base_fee_per_gas=0,
+        traces=[],
+        receipts=[],
+    )
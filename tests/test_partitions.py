@@ -0,0 +1,110 @@
+import pytest
+
+from mev_inspect.crud.partitions import (
+    PARTITION_SIZE,
+    PARTITIONED_TABLES,
+    create_partitions_for_blocks,
+    create_staging_table,
+    get_covered_partition_starts,
+    get_partition_starts,
+    is_partition_covered,
+    parse_partition_bound,
+    swap_staging_table,
+)
+
+
+def test_parse_partition_bound():
+    assert parse_partition_bound("FOR VALUES FROM (100000) TO (200000)") == (
+        100000,
+        200000,
+    )
+    assert parse_partition_bound("FOR VALUES FROM ('0') TO ('100000')") == (
+        0,
+        100000,
+    )
+    assert parse_partition_bound("FOR VALUES FROM (MINVALUE) TO (14000000)") == (
+        None,
+        14000000,
+    )
+
+    with pytest.raises(ValueError):
+        parse_partition_bound("DEFAULT")
+
+
+def test_get_partition_starts():
+    assert get_partition_starts(150_000, 400_001) == [
+        100_000,
+        200_000,
+        300_000,
+        400_000,
+    ]
+    assert get_covered_partition_starts(150_000, 400_001) == [200_000, 300_000]
+    assert get_covered_partition_starts(200_000, 300_000) == [200_000]
+    assert get_covered_partition_starts(200_000, 299_999) == []
+
+
+def test_is_partition_covered():
+    legacy_bound = (None, 14_000_000)
+    bounds = [legacy_bound, (14_000_000, 14_000_000 + PARTITION_SIZE)]
+
+    assert is_partition_covered(13_900_000, bounds)
+    assert is_partition_covered(14_000_000, bounds)
+    assert not is_partition_covered(14_100_000, bounds)
+
+
+def test_staging_table_keeps_primary_key_through_swap():
+    db_session = _Session(primary_key="PRIMARY KEY (block_number, transaction_hash)")
+
+    create_staging_table(db_session, "swaps", 100_000)
+    swap_staging_table(db_session, "swaps", 100_000)
+
+    assert (
+        "ALTER TABLE swaps_100000_staging ADD CONSTRAINT swaps_100000_staging_pkey "
+        "PRIMARY KEY (block_number, transaction_hash)"
+    ) in db_session.statements
+    assert (
+        "ALTER TABLE swaps_100000 "
+        "RENAME CONSTRAINT swaps_100000_staging_pkey TO swaps_100000_pkey"
+    ) in db_session.statements
+
+
+def test_create_partitions_for_blocks_under_lock():
+    db_session = _Session(primary_key=None)
+
+    create_partitions_for_blocks(db_session, 100_000, 200_000)
+
+    for table_name in PARTITIONED_TABLES:
+        lock_index = db_session.statements.index(f"lock {table_name} 100000")
+        assert db_session.statements[lock_index + 1] == (
+            f"CREATE TABLE IF NOT EXISTS {table_name}_100000 "
+            f"PARTITION OF {table_name} FOR VALUES FROM (100000) TO (200000)"
+        )
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+    def __iter__(self):
+        # no partitions
+        return iter([])
+
+
+class _Session:
+    def __init__(self, primary_key):
+        self.primary_key = primary_key
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        if params is not None:
+            if "partition_start" in params:
+                self.statements.append(
+                    f"lock {params['table_name']} {params['partition_start']}"
+                )
+
+            return _Result(self.primary_key)
+
+        self.statements.append(" ".join(statement.split()))
@@ -0,0 +1,142 @@
+from datetime import datetime
+from decimal import Decimal
+
+from mev_inspect.price_oracle import PriceOracle
+from mev_inspect.schemas.arbitrages import Arbitrage
+from mev_inspect.schemas.miner_payments import MinerPayment
+from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS
+
+TOKEN_ADDRESS = "0x6b175474e89094c44da98b954eedeac495271d0f"
+
+
+def test_get_price_at_timestamp():
+    db_session = _PricesSession(
+        [
+            (TOKEN_ADDRESS, datetime.utcfromtimestamp(100), Decimal("1.0")),
+            (TOKEN_ADDRESS, datetime.utcfromtimestamp(200), Decimal("2.0")),
+        ]
+    )
+    price_oracle = PriceOracle()
+
+    assert price_oracle.refresh(db_session) == 2
+
+    assert price_oracle.get_price(TOKEN_ADDRESS, 99) is None
+    assert price_oracle.get_price(TOKEN_ADDRESS, 100) == 1.0
+    assert price_oracle.get_price(TOKEN_ADDRESS, 199) == 1.0
+    assert price_oracle.get_price(TOKEN_ADDRESS, 10_000) == 2.0
+    assert price_oracle.get_price(TOKEN_ADDRESS.upper(), 10_000) == 2.0
+    assert price_oracle.get_price(ETH_TOKEN_ADDRESS, 10_000) is None
+
+
+def test_refresh_only_loads_new_prices():
+    db_session = _PricesSession(
+        [(TOKEN_ADDRESS, datetime.utcfromtimestamp(100), Decimal("1.0"))]
+    )
+    price_oracle = PriceOracle()
+    price_oracle.refresh(db_session)
+
+    db_session.prices.append(
+        (TOKEN_ADDRESS, datetime.utcfromtimestamp(300), Decimal("3.0"))
+    )
+
+    assert price_oracle.refresh(db_session) == 1
+    assert db_session.afters == [
+        (TOKEN_ADDRESS, None),
+        (TOKEN_ADDRESS, datetime.utcfromtimestamp(100)),
+    ]
+    assert price_oracle.get_price(TOKEN_ADDRESS, 300) == 3.0
+
+    # nothing new
+    assert price_oracle.refresh(db_session) == 0
+    assert len(db_session.afters) == 2
+
+
+def test_refresh_loads_prices_backfilled_for_new_tokens():
+    db_session = _PricesSession(
+        [(ETH_TOKEN_ADDRESS, datetime.utcfromtimestamp(300), Decimal("3000.0"))]
+    )
+    price_oracle = PriceOracle()
+    price_oracle.refresh(db_session)
+    price_oracle.refresh(db_session)
+
+    assert db_session.token_loads == 1
+
+    # older than every price loaded
+    db_session.prices.append(
+        (TOKEN_ADDRESS, datetime.utcfromtimestamp(100), Decimal("1.0"))
+    )
+
+    assert price_oracle.refresh(db_session) == 1
+    assert price_oracle.get_price(TOKEN_ADDRESS, 200) == 1.0
+    assert db_session.token_loads == 2
+
+
+def test_usd_values():
+    db_session = _PricesSession(
+        [
+            (TOKEN_ADDRESS, datetime.utcfromtimestamp(100), Decimal("2.0")),
+            (ETH_TOKEN_ADDRESS, datetime.utcfromtimestamp(100), Decimal("3000.0")),
+        ]
+    )
+    price_oracle = PriceOracle()
+    price_oracle.refresh(db_session)
+
+    arbitrage = Arbitrage(
+        swaps=[],
+        block_number=1,
+        transaction_hash="0xabc",
+        account_address="0x1",
+        profit_token_address=TOKEN_ADDRESS,
+        start_amount=10**18,
+        end_amount=6 * 10**18,
+        profit_amount=5 * 10**18,
+        error=None,
+    )
+    miner_payment = MinerPayment(
+        block_number=1,
+        transaction_hash="0xabc",
+        transaction_index=0,
+        miner_address="0x2",
+        coinbase_transfer=10**17,
+        base_fee_per_gas=0,
+        gas_price=10**9,
+        gas_price_with_coinbase_transfer=0,
+        gas_used=10**8,
+        transaction_to_address=None,
+        transaction_from_address=None,
+        error=None,
+    )
+
+    assert price_oracle.get_arbitrage_profit_usd(arbitrage, 150) == 10.0
+    assert price_oracle.get_miner_payment_usd(miner_payment, 150) == 600.0
+    assert price_oracle.get_arbitrage_profit_usd(arbitrage, 50) is None
+
+
+class _PricesSession:
+    def __init__(self, prices):
+        self.prices = prices
+        self.afters = []
+        self.token_loads = 0
+
+    def execute(self, statement, params=None):
+        if "FROM tokens" in statement:
+            self.token_loads += 1
+            return [(TOKEN_ADDRESS, 18), (ETH_TOKEN_ADDRESS, 18)]
+
+        if "MAX(timestamp)" in statement:
+            latest_timestamps = {}
+
+            for token_address, timestamp, _ in self.prices:
+                latest_timestamps[token_address] = max(
+                    timestamp, latest_timestamps.get(token_address, timestamp)
+                )
+
+            return list(latest_timestamps.items())
+
+        token_address, after = params["token_address"], params["after"]
+        self.afters.append((token_address, after))
+        return [
+            price
+            for price in sorted(self.prices, key=lambda price: price[1])
+            if price[0] == token_address and (after is None or price[1] > after)
+        ]
@@ -0,0 +1,36 @@
+import time
+from datetime import datetime
+
+from mev_inspect import prices
+from mev_inspect.prices import fetch_prices
+from mev_inspect.schemas.prices import TOKEN_ADDRESSES
+
+
+def test_fetch_prices_uses_utc(monkeypatch):
+    requested_ranges = []
+
+    class _CoinGeckoAPI:
+        def get_coin_market_chart_range_by_id(
+            self, coingecko_id, vs_currency, after, before
+        ):
+            requested_ranges.append(after)
+            return {"prices": [[86_400_000, 1.0]]}
+
+    monkeypatch.setattr(prices, "CoinGeckoAPI", _CoinGeckoAPI)
+    # a host far from UTC
+    monkeypatch.setenv("TZ", "America/Los_Angeles")
+    time.tzset()
+
+    try:
+        fetched_prices = fetch_prices(
+            {
+                token_address.lower(): datetime.utcfromtimestamp(3_600)
+                for token_address in TOKEN_ADDRESSES
+            }
+        )
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert requested_ranges == [3_600] * len(TOKEN_ADDRESSES)
+    assert {price.timestamp for price in fetched_prices} == {datetime(1970, 1, 2)}
@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from hexbytes import HexBytes
+
+from mev_inspect.block import geth_get_tx_receipts_async
+from mev_inspect.provider import get_base_provider, make_batch_request
+from mev_inspect.utils import RPCType
+
+
+def test_make_batch_request_orders_responses():
+    async def run():
+        received = []
+
+        async with _FakeNode(received) as url:
+            base_provider = get_base_provider(url, type=RPCType.geth)
+            return received, await make_batch_request(
+                base_provider,
+                [("eth_getTransactionReceipt", [str(i)]) for i in range(5)],
+                batch_size=2,
+            )
+
+    received, responses = asyncio.run(run())
+
+    assert [len(request) for request in received] == [2, 2, 1]
+    assert [response["result"]["transactionHash"] for response in responses] == [
+        str(i) for i in range(5)
+    ]
+
+
+def test_geth_receipts_fall_back_to_batches():
+    transactions = [HexBytes(i.to_bytes(32, "big")) for i in range(150)]
+
+    async def run():
+        received = []
+
+        async with _FakeNode(received) as url:
+            base_provider = get_base_provider(url, type=RPCType.geth)
+
+            for _ in range(2):
+                receipts = await geth_get_tx_receipts_async(
+                    base_provider, 1, transactions, batch_size=100
+                )
+                assert [
+                    receipt["result"]["transactionHash"] for receipt in receipts
+                ] == [tx.hex() for tx in transactions]
+
+        return received
+
+    received = asyncio.run(run())
+
+    # eth_getBlockReceipts is only tried once
+    assert [
+        len(request) if isinstance(request, list) else request["method"]
+        for request in received
+    ] == ["eth_getBlockReceipts", 100, 50, 100, 50]
+
+
+def test_geth_receipts_fall_back_for_missing_block():
+    transactions = [HexBytes(i.to_bytes(32, "big")) for i in range(150)]
+
+    async def run():
+        received = []
+        error = {"code": -32000, "message": "header not found"}
+
+        async with _FakeNode(received, error) as url:
+            base_provider = get_base_provider(url, type=RPCType.geth)
+
+            for _ in range(2):
+                await geth_get_tx_receipts_async(
+                    base_provider, 1, transactions, batch_size=100
+                )
+
+        return received
+
+    received = asyncio.run(run())
+
+    # eth_getBlockReceipts is tried again for the next block
+    assert [
+        len(request) if isinstance(request, list) else request["method"]
+        for request in received
+    ] == ["eth_getBlockReceipts", 100, 50, "eth_getBlockReceipts", 100, 50]
+
+
+def test_geth_receipts_requested_one_at_a_time_when_batches_rejected():
+    transactions = [HexBytes(i.to_bytes(32, "big")) for i in range(3)]
+
+    async def run():
+        received = []
+
+        async with _FakeNode(received, rejects_batches=True) as url:
+            base_provider = get_base_provider(url, type=RPCType.geth)
+            receipts = await geth_get_tx_receipts_async(
+                base_provider, 1, transactions, batch_size=100
+            )
+
+        return received, receipts
+
+    received, receipts = asyncio.run(run())
+
+    assert [receipt["result"]["transactionHash"] for receipt in receipts] == [
+        tx.hex() for tx in transactions
+    ]
+    assert [
+        len(request) if isinstance(request, list) else request["method"]
+        for request in received
+    ] == ["eth_getBlockReceipts", 3] + ["eth_getTransactionReceipt"] * 3
+
+
+def test_geth_receipts_raise_for_missing_receipt():
+    transactions = [HexBytes(i.to_bytes(32, "big")) for i in range(3)]
+
+    async def run():
+        async with _FakeNode(
+            [], rejects_batches=True, missing_transactions={transactions[1].hex()}
+        ) as url:
+            base_provider = get_base_provider(url, type=RPCType.geth)
+            await geth_get_tx_receipts_async(
+                base_provider, 1, transactions, batch_size=100
+            )
+
+    with pytest.raises(KeyError):
+        asyncio.run(run())
+
+
+class _FakeNode:
+    """
+    Node that answers eth_getBlockReceipts with an error, method not found
+    by default, and batches in reverse order, or with a single error if
+    it rejects batches
+    """
+
+    def __init__(
+        self, received, error=None, rejects_batches=False, missing_transactions=()
+    ):
+        self.received = received
+        self.error = error or {"code": -32601, "message": "method not found"}
+        self.rejects_batches = rejects_batches
+        self.missing_transactions = missing_transactions
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.server = TestServer(app)
+
+    async def handle(self, request):
+        body = await request.json()
+        self.received.append(body)
+
+        if not isinstance(body, list):
+            if (
+                body["method"] == "eth_getTransactionReceipt"
+                and body["params"][0] not in self.missing_transactions
+            ):
+                return web.json_response(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": body["id"],
+                        "result": {"transactionHash": body["params"][0]},
+                    }
+                )
+
+            return web.json_response(
+                {
+                    "jsonrpc": "2.0",
+                    "id": body["id"],
+                    "error": self.error,
+                }
+            )
+
+        if self.rejects_batches:
+            return web.json_response(
+                {
+                    "jsonrpc": "2.0",
+                    "id": None,
+                    "error": {"code": -32600, "message": "batch not supported"},
+                }
+            )
+
+        return web.json_response(
+            [
+                {
+                    "jsonrpc": "2.0",
+                    "id": item["id"],
+                    "result": {"transactionHash": item["params"][0]},
+                }
+                for item in reversed(body)
+            ]
+        )
+
+    async def __aenter__(self):
+        await self.server.start_server()
+        return str(self.server.make_url("/"))
+
+    async def __aexit__(self, *args):
+        await self.server.close()
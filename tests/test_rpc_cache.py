@@ -0,0 +1,138 @@
+import asyncio
+
+from mev_inspect.rpc_cache import RPCCache
+
+HEAD_BLOCK_NUMBER = 10_000
+
+
+def test_rpc_cache_keeps_final_blocks():
+    node = _FakeNode()
+    rpc_cache = RPCCache(reorg_depth=64)
+
+    async def run():
+        for block_number in [100, 100, hex(100), HEAD_BLOCK_NUMBER, HEAD_BLOCK_NUMBER]:
+            response = await rpc_cache.make_request(
+                node.make_request, "trace_block", [block_number]
+            )
+            assert response["result"] == [{"blockNumber": _to_hex(block_number)}]
+
+    asyncio.run(run())
+
+    # the head is fetched to tell if blocks are final
+    assert node.requests == [
+        ("trace_block", [100]),
+        ("eth_blockNumber", []),
+        ("trace_block", [HEAD_BLOCK_NUMBER]),
+        ("trace_block", [HEAD_BLOCK_NUMBER]),
+    ]
+    assert rpc_cache.get_metrics().hits == 2
+
+
+def test_rpc_cache_joins_requests_in_flight():
+    node = _FakeNode()
+    rpc_cache = RPCCache()
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                rpc_cache.make_request(
+                    node.make_request, "eth_getBlockByNumber", ["latest", False]
+                )
+                for _ in range(5)
+            )
+        )
+
+    responses = asyncio.run(run())
+
+    assert len(responses) == 5
+    assert node.requests == [("eth_getBlockByNumber", ["latest", False])]
+    assert rpc_cache.get_metrics().coalesced == 4
+    assert rpc_cache.get_metrics().entries == 0
+
+
+def test_rpc_cache_fetches_fee_history_by_window():
+    node = _FakeNode()
+    rpc_cache = RPCCache(fee_history_window=100)
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                rpc_cache.make_request(
+                    node.make_request,
+                    "eth_feeHistory",
+                    [hex(1), hex(block_number), None],
+                )
+                for block_number in range(150, 250)
+            )
+        )
+
+    responses = asyncio.run(run())
+
+    assert [response["result"] for response in responses] == [
+        {
+            "oldestBlock": hex(block_number),
+            "baseFeePerGas": [hex(block_number), hex(block_number + 1)],
+            "gasUsedRatio": [0.5],
+        }
+        for block_number in range(150, 250)
+    ]
+    assert node.requests == [
+        ("eth_blockNumber", []),
+        ("eth_feeHistory", [hex(100), hex(199), None]),
+        ("eth_feeHistory", [hex(100), hex(299), None]),
+    ]
+
+
+def test_rpc_cache_evicts_least_recently_used():
+    node = _FakeNode()
+    rpc_cache = RPCCache(max_entries=2)
+
+    async def run():
+        for block_number in [1, 2, 1, 3, 1, 2]:
+            await rpc_cache.make_request(
+                node.make_request, "eth_getBlockReceipts", [block_number]
+            )
+
+    asyncio.run(run())
+
+    block_requests = [
+        params for method, params in node.requests if method != "eth_blockNumber"
+    ]
+    assert block_requests == [[1], [2], [3], [2]]
+    assert rpc_cache.get_metrics().entries == 2
+
+
+def _to_hex(value) -> str:
+    return value if isinstance(value, str) else hex(value)
+
+
+class _FakeNode:
+    def __init__(self):
+        self.requests = []
+
+    async def make_request(self, method, params):
+        self.requests.append((method, params))
+        await asyncio.sleep(0.001)
+
+        if method == "eth_blockNumber":
+            result = hex(HEAD_BLOCK_NUMBER)
+        elif method == "eth_getBlockByNumber":
+            result = {"number": hex(HEAD_BLOCK_NUMBER)}
+        elif method == "eth_feeHistory":
+            block_count = int(params[0], 16)
+            newest_block_number = int(params[1], 16)
+            oldest_block_number = newest_block_number - block_count + 1
+            result = {
+                "oldestBlock": hex(oldest_block_number),
+                "baseFeePerGas": [
+                    hex(block_number)
+                    for block_number in range(
+                        oldest_block_number, newest_block_number + 2
+                    )
+                ],
+                "gasUsedRatio": [0.5] * block_count,
+            }
+        else:
+            result = [{"blockNumber": _to_hex(params[0])}]
+
+        return {"jsonrpc": "2.0", "id": 1, "result": result}
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.client_exceptions import ClientResponseError
+from aiohttp.test_utils import TestServer
+
+from mev_inspect.provider import get_base_provider, make_batch_request
+from mev_inspect.rpc_limiter import MIN_ROUND_SIZE, AdaptiveRPCLimiter
+from mev_inspect.rpc_session import RPCSession
+
+
+def test_rpc_limiter_keeps_to_its_limit():
+    rpc_limiter = AdaptiveRPCLimiter(max_limit=3)
+    in_flight = []
+
+    async def make_request():
+        in_flight.append(rpc_limiter.get_metrics().in_flight)
+        await asyncio.sleep(0.001)
+
+    async def run():
+        await asyncio.gather(*(rpc_limiter.run(make_request) for _ in range(30)))
+
+    asyncio.run(run())
+
+    assert len(in_flight) == 30
+    assert max(in_flight) == 3
+    assert rpc_limiter.get_metrics().in_flight == 0
+    assert rpc_limiter.get_metrics().waiting == 0
+
+
+def test_rpc_limiter_cuts_limit_once_for_requests_failing_together():
+    rpc_limiter = AdaptiveRPCLimiter(max_limit=16)
+
+    async def make_request():
+        await asyncio.sleep(0.001)
+        raise asyncio.TimeoutError()
+
+    async def run():
+        return await asyncio.gather(
+            *(rpc_limiter.run(make_request) for _ in range(16)),
+            return_exceptions=True,
+        )
+
+    assert all(
+        isinstance(result, asyncio.TimeoutError) for result in asyncio.run(run())
+    )
+    assert rpc_limiter.limit == 8
+    assert rpc_limiter.get_metrics().decreases == 1
+
+    # other errors aren't the node's load
+    async def make_failing_request():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        asyncio.run(rpc_limiter.run(make_failing_request))
+
+    assert rpc_limiter.limit == 8
+
+
+def test_rpc_limiter_raises_limit_while_latency_is_stable():
+    rpc_limiter = AdaptiveRPCLimiter(max_limit=4, initial_limit=1)
+
+    for _ in range(3 * MIN_ROUND_SIZE):
+        rpc_limiter._record_latency(0.1)
+
+    assert rpc_limiter.limit == 4
+
+    # slower than the baseline, so it's kept where it is
+    for _ in range(MIN_ROUND_SIZE):
+        rpc_limiter._record_latency(1.0)
+
+    assert rpc_limiter.limit == 4
+    assert rpc_limiter.get_metrics().p95_latency_seconds == 1.0
+    assert rpc_limiter.get_metrics().increases == 3
+
+
+def test_rpc_limiter_backs_off_rate_limiting_node():
+    received = []
+
+    async def handle(request):
+        body = await request.json()
+        received.append(body)
+        await asyncio.sleep(0.01)
+
+        # rate limited until the first requests are through
+        if len(received) <= 4:
+            raise web.HTTPTooManyRequests()
+
+        if isinstance(body, list):
+            return web.json_response(
+                [{"jsonrpc": "2.0", "id": item["id"], "result": "0x1"} for item in body]
+            )
+
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": "0x1"})
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/", handle)
+        server = TestServer(app)
+        await server.start_server()
+
+        base_provider = get_base_provider(str(server.make_url("/")))
+        rpc_limiter = AdaptiveRPCLimiter(max_limit=4)
+        rpc_limiter.install(base_provider)
+        rpc_session = RPCSession(base_provider, max_concurrency=1)
+        await rpc_session.get_session()
+
+        try:
+            rate_limited_responses = await asyncio.gather(
+                *(base_provider.make_request("eth_chainId", []) for _ in range(4)),
+                return_exceptions=True,
+            )
+            responses = await asyncio.gather(
+                *(base_provider.make_request("eth_chainId", []) for _ in range(4)),
+            )
+            batch_responses = await make_batch_request(
+                base_provider, [("eth_chainId", [])] * 3
+            )
+            return rate_limited_responses, responses + batch_responses, rpc_limiter
+        finally:
+            await rpc_session.close()
+            await server.close()
+
+    rate_limited_responses, responses, rpc_limiter = asyncio.run(run())
+
+    assert all(
+        isinstance(response, ClientResponseError) and response.status == 429
+        for response in rate_limited_responses
+    )
+    assert [response["result"] for response in responses] == ["0x1"] * 7
+    assert rpc_limiter.limit == 2
+    assert rpc_limiter.get_metrics().decreases == 1
@@ -0,0 +1,42 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from mev_inspect.provider import get_base_provider
+from mev_inspect.rpc_session import CONNECTIONS_PER_BLOCK, RPCSession
+
+
+def test_rpc_session_reuses_connections():
+    async def handle(request):
+        body = await request.json()
+        await asyncio.sleep(0.01)
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": "0x1"})
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/", handle)
+        server = TestServer(app)
+        await server.start_server()
+
+        base_provider = get_base_provider(str(server.make_url("/")))
+        rpc_session = RPCSession(base_provider, max_concurrency=2)
+        await rpc_session.get_session()
+
+        try:
+            responses = await asyncio.gather(
+                *(base_provider.make_request("eth_chainId", []) for _ in range(50))
+            )
+            return responses, rpc_session.get_pool_metrics()
+        finally:
+            await rpc_session.close()
+            await server.close()
+
+    responses, metrics = asyncio.run(run())
+
+    assert [response["result"] for response in responses] == ["0x1"] * 50
+    assert metrics.limit == 2 * CONNECTIONS_PER_BLOCK
+    assert metrics.created <= metrics.limit
+    assert metrics.created + metrics.reused == 50
+    assert metrics.waiting == 0
+    assert metrics.open == metrics.idle
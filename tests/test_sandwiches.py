@@ -0,0 +1,326 @@
+import random
+from typing import List, Optional
+
+from mev_inspect.classifiers.specs.uniswap import UNISWAP_V2_PAIR_ABI_NAME
+from mev_inspect.sandwiches import SandwichWindow, get_sandwiches
+from mev_inspect.schemas.sandwiches import Sandwich
+from mev_inspect.schemas.swaps import Swap
+from mev_inspect.schemas.traces import Protocol
+
+
+def test_get_sandwiches_matches_scan():
+    # sandwiches found before indexing, by scanning every later swap
+    rng = random.Random(1)
+
+    for _ in range(300):
+        swaps = _create_random_swaps(rng, n_transactions=rng.randint(1, 30))
+
+        assert get_sandwiches(swaps) == _get_sandwiches_by_scan(swaps)
+
+
+def test_get_sandwiches_with_many_swaps():
+    n_transactions = 5000
+    n_pools = 100
+    sandwiched_pool_address = "0xpool0"
+    sandwicher_address = "0xsandwicher"
+
+    swaps = [
+        _create_swap(
+            transaction_position,
+            contract_address=f"0xpool{transaction_position % n_pools}",
+            from_address=f"0x{transaction_position}",
+            to_address=f"0x{transaction_position}",
+        )
+        for transaction_position in range(n_transactions)
+    ]
+
+    front_swap = _create_swap(
+        n_transactions,
+        contract_address=sandwiched_pool_address,
+        from_address=sandwicher_address,
+        to_address=sandwicher_address,
+    )
+    sandwiched_swap = _create_swap(
+        n_transactions + 1,
+        contract_address=sandwiched_pool_address,
+        from_address="0xvictim",
+        to_address="0xvictim",
+    )
+    backrun_swap = _create_swap(
+        n_transactions + 2,
+        contract_address=sandwiched_pool_address,
+        from_address=sandwicher_address,
+        to_address=sandwicher_address,
+        reverse=True,
+    )
+
+    sandwiches = get_sandwiches(
+        [backrun_swap, sandwiched_swap, front_swap] + swaps,
+    )
+
+    assert len(sandwiches) == 1
+    [sandwich] = sandwiches
+    assert sandwich.frontrun_swap == front_swap
+    assert sandwich.sandwiched_swaps == [sandwiched_swap]
+    assert sandwich.backrun_swap == backrun_swap
+
+
+def test_sandwich_window_finds_sandwiches_across_blocks():
+    sandwicher_address = "0xsandwicher"
+    front_swap = _create_swap(
+        0,
+        contract_address="0xpool",
+        from_address=sandwicher_address,
+        to_address=sandwicher_address,
+        block_number=1,
+    )
+    sandwiched_swap = _create_swap(
+        1,
+        contract_address="0xpool",
+        from_address="0xvictim",
+        to_address="0xvictim",
+        block_number=1,
+    )
+    backrun_swap = _create_swap(
+        0,
+        contract_address="0xpool",
+        from_address=sandwicher_address,
+        to_address=sandwicher_address,
+        block_number=2,
+        reverse=True,
+    )
+
+    sandwich_window = SandwichWindow(window_size=2)
+
+    assert get_sandwiches([front_swap, sandwiched_swap]) == []
+    assert sandwich_window.add_block(1, [front_swap, sandwiched_swap]) == []
+
+    assert get_sandwiches([backrun_swap]) == []
+    [sandwich] = sandwich_window.add_block(2, [backrun_swap])
+
+    assert sandwich.block_number == 2
+    assert sandwich.frontrun_swap == front_swap
+    assert sandwich.sandwiched_swaps == [sandwiched_swap]
+    assert sandwich.backrun_swap == backrun_swap
+
+
+def test_sandwich_window_evicts_old_blocks():
+    sandwicher_address = "0xsandwicher"
+    sandwich_window = SandwichWindow(window_size=2)
+
+    sandwich_window.add_block(
+        1,
+        [
+            _create_swap(
+                0,
+                contract_address="0xpool",
+                from_address=sandwicher_address,
+                to_address=sandwicher_address,
+                block_number=1,
+            ),
+            _create_swap(
+                1,
+                contract_address="0xpool",
+                from_address="0xvictim",
+                to_address="0xvictim",
+                block_number=1,
+            ),
+        ],
+    )
+    sandwich_window.add_block(2, [])
+
+    backrun_swap = _create_swap(
+        0,
+        contract_address="0xpool",
+        from_address=sandwicher_address,
+        to_address=sandwicher_address,
+        block_number=3,
+        reverse=True,
+    )
+    assert sandwich_window.add_block(3, [backrun_swap]) == []
+
+    rng = random.Random(3)
+
+    for block_number in range(4, 100):
+        sandwich_window.add_block(
+            block_number,
+            _create_random_swaps(rng, n_transactions=10, block_number=block_number),
+        )
+
+    swap_index = sandwich_window._swap_index
+    window_swaps = [
+        swap_index.get_swap(position)
+        for position in range(swap_index.first_position, swap_index.end_position)
+    ]
+    assert {swap.block_number for swap in window_swaps} == {98, 99}
+    assert all(
+        position >= swap_index.first_position
+        for positions in swap_index.positions_by_direction_and_sender.values()
+        for position in positions
+    )
+
+
+def test_sandwich_window_matches_scan_of_all_blocks():
+    rng = random.Random(4)
+
+    for _ in range(50):
+        n_blocks = rng.randint(1, 5)
+        swaps_by_block = [
+            _create_random_swaps(
+                rng,
+                n_transactions=rng.randint(0, 8),
+                block_number=block_number,
+            )
+            for block_number in range(n_blocks)
+        ]
+
+        # positions increase across blocks, so one scan orders all swaps
+        all_swaps = []
+        for block_swaps in swaps_by_block:
+            for swap in block_swaps:
+                swap.transaction_position += len(all_swaps)
+            all_swaps += block_swaps
+
+        sandwich_window = SandwichWindow(window_size=n_blocks)
+        sandwiches = []
+
+        for block_number, block_swaps in enumerate(swaps_by_block):
+            sandwiches += get_sandwiches(block_swaps)
+            sandwiches += sandwich_window.add_block(block_number, block_swaps)
+
+        assert _get_legs(sandwiches) == _get_legs(_get_sandwiches_by_scan(all_swaps))
+
+
+def _get_legs(sandwiches: List[Sandwich]):
+    return sorted(
+        (
+            sandwich.frontrun_swap.transaction_position,
+            sandwich.frontrun_swap.trace_address,
+            sandwich.backrun_swap.transaction_position,
+            sandwich.backrun_swap.trace_address,
+            len(sandwich.sandwiched_swaps),
+        )
+        for sandwich in sandwiches
+    )
+
+
+def _get_sandwiches_by_scan(swaps: List[Swap]) -> List[Sandwich]:
+    ordered_swaps = list(
+        sorted(
+            swaps,
+            key=lambda swap: (swap.transaction_position, swap.trace_address),
+        )
+    )
+
+    sandwiches: List[Sandwich] = []
+
+    for index, swap in enumerate(ordered_swaps):
+        sandwich = _get_sandwich_by_scan(swap, ordered_swaps[index + 1 :])
+
+        if sandwich is not None:
+            sandwiches.append(sandwich)
+
+    return sandwiches
+
+
+def _get_sandwich_by_scan(
+    front_swap: Swap,
+    rest_swaps: List[Swap],
+) -> Optional[Sandwich]:
+    sandwicher_address = front_swap.to_address
+    sandwiched_swaps = []
+
+    for other_swap in rest_swaps:
+        if other_swap.transaction_hash == front_swap.transaction_hash:
+            continue
+
+        if other_swap.contract_address == front_swap.contract_address:
+            if (
+                other_swap.token_in_address == front_swap.token_in_address
+                and other_swap.token_out_address == front_swap.token_out_address
+                and other_swap.from_address != sandwicher_address
+            ):
+                sandwiched_swaps.append(other_swap)
+            elif (
+                other_swap.token_out_address == front_swap.token_in_address
+                and other_swap.token_in_address == front_swap.token_out_address
+                and other_swap.from_address == sandwicher_address
+            ):
+                if len(sandwiched_swaps) > 0:
+                    return Sandwich(
+                        block_number=front_swap.block_number,
+                        sandwicher_address=sandwicher_address,
+                        frontrun_swap=front_swap,
+                        backrun_swap=other_swap,
+                        sandwiched_swaps=sandwiched_swaps,
+                        profit_token_address=front_swap.token_in_address,
+                        profit_amount=other_swap.token_out_amount
+                        - front_swap.token_in_amount,
+                    )
+
+    return None
+
+
+def _create_swap(
+    transaction_position: int,
+    contract_address: str,
+    from_address: str,
+    to_address: str,
+    block_number: int = 0,
+    reverse: bool = False,
+) -> Swap:
+    token_in_address, token_out_address = ("0xb", "0xa") if reverse else ("0xa", "0xb")
+
+    return Swap(
+        abi_name=UNISWAP_V2_PAIR_ABI_NAME,
+        transaction_hash=f"0x{block_number}_{transaction_position}",
+        transaction_position=transaction_position,
+        block_number=block_number,
+        trace_address=[],
+        contract_address=contract_address,
+        protocol=Protocol.uniswap_v2,
+        from_address=from_address,
+        to_address=to_address,
+        token_in_address=token_in_address,
+        token_in_amount=100,
+        token_out_address=token_out_address,
+        token_out_amount=100,
+    )
+
+
+def _create_random_swaps(
+    rng: random.Random,
+    n_transactions: int,
+    block_number: int = 0,
+) -> List[Swap]:
+    # some transactions swap more than once
+    return [
+        _create_random_swap(rng, transaction_position, [trace_index], block_number)
+        for transaction_position in range(n_transactions)
+        for trace_index in range(rng.choice([1, 1, 2]))
+    ]
+
+
+def _create_random_swap(
+    rng: random.Random,
+    transaction_position: int,
+    trace_address: List[int],
+    block_number: int = 0,
+) -> Swap:
+    token_in_address, token_out_address = rng.sample(["0xa", "0xb"], 2)
+
+    return Swap(
+        abi_name=UNISWAP_V2_PAIR_ABI_NAME,
+        transaction_hash=f"0x{block_number}_{transaction_position}",
+        transaction_position=transaction_position,
+        block_number=block_number,
+        trace_address=trace_address,
+        contract_address=rng.choice(["0xpool1", "0xpool2"]),
+        protocol=Protocol.uniswap_v2,
+        from_address=rng.choice(["0x1", "0x2", "0x3"]),
+        to_address=rng.choice(["0x1", "0x2", "0x3"]),
+        token_in_address=token_in_address,
+        token_in_amount=rng.randint(1, 100),
+        token_out_address=token_out_address,
+        token_out_amount=rng.randint(1, 100),
+    )
@@ -0,0 +1,94 @@
+import os
+from typing import Optional, Tuple
+
+from mev_inspect.abi import get_abi
+from mev_inspect.classifiers.specs import ALL_CLASSIFIER_SPECS
+from mev_inspect.classifiers.trace import TraceClassifier
+from mev_inspect.decode import ABIDecoder
+from mev_inspect.schemas.blocks import CallAction
+from mev_inspect.schemas.traces import DecodedCallTrace, Protocol, TraceType
+
+from .utils import TEST_BLOCKS_DIRECTORY, load_test_block
+
+
+def test_classify_matches_linear_spec_scan(trace_classifier: TraceClassifier):
+    block = load_test_block(12914944)
+    decoders = {
+        spec.abi_name: ABIDecoder(get_abi(spec.abi_name, spec.protocol))
+        for spec in ALL_CLASSIFIER_SPECS
+    }
+
+    call_traces = [trace for trace in block.traces if trace.type == TraceType.call]
+    classified_traces = trace_classifier.classify(call_traces)
+
+    assert len(classified_traces) == len(call_traces)
+
+    for trace, classified_trace in zip(call_traces, classified_traces):
+        expected = _get_first_decoding_spec(decoders, CallAction(**trace.action))
+
+        if expected is None:
+            assert not isinstance(classified_trace, DecodedCallTrace)
+        else:
+            assert isinstance(classified_trace, DecodedCallTrace)
+            assert (classified_trace.abi_name, classified_trace.protocol) == expected
+
+
+def test_classified_traces_are_valid(trace_classifier: TraceClassifier):
+    block = load_test_block(12914944)
+
+    for classified_trace in trace_classifier.classify(block.traces):
+        # built without validation, so check it would have passed
+        validated = type(classified_trace)(**classified_trace.dict())
+
+        assert validated == classified_trace
+
+
+def test_classify_decodes_each_call_at_most_once(
+    trace_classifier: TraceClassifier, monkeypatch
+):
+    call_traces = [
+        trace
+        for file_name in sorted(os.listdir(TEST_BLOCKS_DIRECTORY))
+        for trace in load_test_block(int(file_name.split(".")[0])).traces
+        if trace.type == TraceType.call
+    ]
+    decoders = {
+        spec.abi_name: ABIDecoder(get_abi(spec.abi_name, spec.protocol))
+        for spec in ALL_CLASSIFIER_SPECS
+    }
+
+    decode_attempts = []
+    decode = ABIDecoder.decode
+
+    def count_decode(self, data, lazy=False):
+        decode_attempts.append(data)
+        return decode(self, data, lazy=lazy)
+
+    monkeypatch.setattr(ABIDecoder, "decode", count_decode)
+
+    trace_classifier.classify(call_traces)
+    indexed_decode_attempts = len(decode_attempts)
+
+    decode_attempts.clear()
+    for trace in call_traces:
+        _get_first_decoding_spec(decoders, CallAction(**trace.action))
+    linear_decode_attempts = len(decode_attempts)
+
+    # 11,675 against 336,151 over the 23,782 calls in tests/blocks
+    assert indexed_decode_attempts <= len(call_traces)
+    assert indexed_decode_attempts * 20 < linear_decode_attempts
+
+
+def _get_first_decoding_spec(
+    decoders, action: CallAction
+) -> Optional[Tuple[str, Optional[Protocol]]]:
+    for spec in ALL_CLASSIFIER_SPECS:
+        if spec.valid_contract_addresses is not None and action.to not in {
+            address.lower() for address in spec.valid_contract_addresses
+        }:
+            continue
+
+        if decoders[spec.abi_name].decode(action.input) is not None:
+            return spec.abi_name, spec.protocol
+
+    return None
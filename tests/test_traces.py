@@ -1,9 +1,11 @@
+import json
 from typing import List
 
-from mev_inspect.schemas.traces import ClassifiedTrace
+from mev_inspect.schemas.traces import ClassifiedTrace, Trace
+from mev_inspect.trace_tree import TraceTree
 from mev_inspect.traces import get_child_traces, is_child_trace_address
 
-from .helpers import make_many_unknown_traces
+from .helpers import make_many_unknown_traces, make_transfer_trace
 
 
 def test_is_child_trace_address():
@@ -75,6 +77,80 @@ def test_get_child_traces(get_transaction_hashes):
     )
 
 
+def test_trace_tree(get_transaction_hashes):
+    block_number = 123
+    [transaction_hash] = get_transaction_hashes(1)
+
+    trace_addresses = [
+        [1, 2],
+        [],
+        [1],
+        [0, 0],
+        [1, 0, 1],
+        [0],
+        [1, 0],
+        [1, 1],
+        [1, 0, 0],
+    ]
+    traces = make_many_unknown_traces(
+        block_number,
+        transaction_hash,
+        trace_addresses,
+    )
+    trace_tree = TraceTree(traces)
+
+    for trace in traces:
+        assert trace_tree.get_child_traces(trace) == get_child_traces(
+            transaction_hash, trace.trace_address, traces
+        )
+
+    [trace_1_0_1] = [trace for trace in traces if trace.trace_address == [1, 0, 1]]
+    [root_trace] = [trace for trace in traces if trace.trace_address == []]
+
+    assert trace_tree.get_parent(trace_1_0_1).trace_address == [1, 0]
+    assert trace_tree.get_parent(root_trace) is None
+
+
+def test_trace_tree_transfers(get_transaction_hashes, get_addresses):
+    block_number = 123
+    [transaction_hash] = get_transaction_hashes(1)
+    [first_address, second_address, token_address] = get_addresses(3)
+
+    def make_transfer(trace_address, amount):
+        return make_transfer_trace(
+            block_number,
+            transaction_hash,
+            trace_address,
+            first_address,
+            second_address,
+            token_address,
+            amount,
+        )
+
+    [root_trace, swap_trace] = make_many_unknown_traces(
+        block_number, transaction_hash, [[], [1]]
+    )
+    traces = [
+        root_trace,
+        make_transfer([0], 1),
+        make_transfer([0, 0], 2),
+        swap_trace,
+        make_transfer([1, 0], 3),
+        make_transfer([2], 4),
+    ]
+    trace_tree = TraceTree(traces)
+
+    assert [
+        transfer.amount for transfer in trace_tree.get_prior_transfers(swap_trace)
+    ] == [1, 2]
+    assert [
+        transfer.amount for transfer in trace_tree.get_child_transfers(swap_trace)
+    ] == [3]
+    assert [
+        transfer.amount for transfer in trace_tree.get_child_transfers(root_trace)
+    ] == [1, 2, 3, 4]
+
+
 def has_expected_child_traces(
     transaction_hash: str,
     parent_trace_address: List[int],
@@ -110,3 +186,37 @@ def distinct_lists(list_of_lists: List[List[int]]) -> List[List[int]]:
             distinct_so_far.append(list_of_values)
 
     return distinct_so_far
+
+
+def test_trace_fields_are_normalized_on_parse():
+    address = "0x" + "Ab" * 20
+    trace_json = {
+        "action": {
+            "callType": "call",
+            "from": address,
+            "to": address.upper().replace("0X", "0x"),
+            "gas": "0x5208",
+            "input": "0x",
+            "value": "0x0",
+        },
+        "blockHash": "0x" + "12" * 32,
+        "blockNumber": 1,
+        "result": {"gasUsed": "0x10", "output": "0x"},
+        "subtraces": 0,
+        "traceAddress": [],
+        "transactionHash": "0x" + "34" * 32,
+        "transactionPosition": 0,
+        "type": "call",
+    }
+
+    first_trace = Trace(**trace_json)
+    # separately parsed, so none of the strings are shared
+    second_trace = Trace(**json.loads(json.dumps(trace_json)))
+
+    assert first_trace.action["gas"] == 21000
+    assert first_trace.action["value"] == 0
+    assert first_trace.result == {"gasUsed": 16, "output": "0x"}
+    assert first_trace.action["from"] == address.lower()
+    assert first_trace.action["from"] is second_trace.action["to"]
+    assert first_trace.transaction_hash is second_trace.transaction_hash
+    assert trace_json["action"]["gas"] == "0x5208"